@@ -0,0 +1,200 @@
+# cache.py
+"""Response cache for the TermAI backend.
+
+Generated commands are cached under a key built from the normalized
+instruction, the shell type and the platform. Two backends are available:
+an in-process LRU dict and a SQLite file that survives restarts. Both
+honour a TTL and an entry/byte bound.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def normalize_instruction(instruction: str) -> str:
+    """Fold case and collapse whitespace so trivially different prompts share a key."""
+    return " ".join(instruction.casefold().split())
+
+
+def make_key(*parts: Optional[str]) -> str:
+    """Build a stable cache key from the request parameters."""
+    normalized = [normalize_instruction(str(part)) if part is not None else "" for part in parts]
+    return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store bounded by entry count and approximate size in bytes."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        self._data.move_to_end(key)
+        value, expires_at, _ = item
+        return value, expires_at
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        size = len(json.dumps(value))
+        if key in self._data:
+            self._bytes -= self._data.pop(key)[2]
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= item[2]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+class SQLiteBackend:
+    """SQLite store that survives restarts; LRU order is tracked by last access time."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+
+    def get(self, key: str):
+        row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), expires_at, time.time()),
+        )
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache").fetchone()[0]
+
+
+class ResponseCache:
+    """TTL cache in front of a backend, with hit/miss counters."""
+
+    def __init__(self, backend, ttl: float = 24 * 60 * 60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self.backend.get(key)
+            if item is not None and item[1] < time.time():
+                self.backend.delete(key)
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.backend.set(key, value, time.time() + self.ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "entries": len(self.backend),
+                "bytes": self.backend.size_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.backend.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "ttl_seconds": self.ttl,
+            }
+
+
+def create_cache(prefix: str = "TERMAI_CACHE") -> Optional[ResponseCache]:
+    """Build a cache from environment variables; returns None when disabled.
+
+    `<prefix>_BACKEND` is `memory` (default), `sqlite` or `off`. `<prefix>_TTL`,
+    `<prefix>_MAX_ENTRIES`, `<prefix>_MAX_BYTES` and `<prefix>_PATH` tune it.
+    """
+    kind = os.getenv(f"{prefix}_BACKEND", "memory").lower()
+    if kind in ("off", "none", "0", "false"):
+        return None
+
+    ttl = float(os.getenv(f"{prefix}_TTL", 24 * 60 * 60))
+    max_entries = int(os.getenv(f"{prefix}_MAX_ENTRIES", 10000))
+
+    if kind == "sqlite":
+        default_path = os.path.join(tempfile.gettempdir(), f"{prefix.lower()}.sqlite3")
+        backend = SQLiteBackend(os.getenv(f"{prefix}_PATH", default_path), max_entries=max_entries)
+    else:
+        max_bytes = int(os.getenv(f"{prefix}_MAX_BYTES", 32 * 1024 * 1024))
+        backend = MemoryBackend(max_entries=max_entries, max_bytes=max_bytes)
+
+    return ResponseCache(backend, ttl=ttl)
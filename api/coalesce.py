@@ -0,0 +1,131 @@
+# coalesce.py
+"""Single-flight deduplication of identical in-flight upstream calls."""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class _Broadcast:
+    """Items of one upstream stream, kept so that late subscribers can replay them."""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+    def publish(self, item: Any = None, done: bool = False) -> None:
+        if not done:
+            self.items.append(item)
+        self.done = self.done or done
+        # Wake everyone waiting on the current event; later waits use a new one
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """Concurrent callers with the same key share one upstream call.
+
+    The upstream coroutine runs in its own task, so a caller that is
+    cancelled (client disconnect) does not cancel the call for the others;
+    the task is only cancelled once every waiter has gone. Exceptions are
+    propagated to every waiter. `stream()` does the same for upstreams that
+    yield items, such as a streamed LLM reply.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, tuple] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+
+        self._waiters[task] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters.get(task) == 1:
+                self.cancelled += 1
+                task.cancel()
+            raise
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Yield every item of `fn()`, sharing one upstream iteration with concurrent callers of the same key.
+
+        Callers that join late first get the items produced so far.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            self.upstream_calls += 1
+            broadcast = _Broadcast()
+
+            async def pump():
+                try:
+                    async for item in fn():
+                        broadcast.publish(item)
+                except Exception as e:
+                    broadcast.error = e
+                finally:
+                    broadcast.publish(done=True)
+
+            task = asyncio.ensure_future(pump())
+            flight = self._streams[key] = (task, broadcast)
+            self._waiters[task] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+
+        task, broadcast = flight
+        self._waiters[task] += 1
+        try:
+            position = 0
+            while True:
+                if position < len(broadcast.items):
+                    position += 1
+                    yield broadcast.items[position - 1]
+                elif broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                else:
+                    await broadcast.changed.wait()
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+                if not task.done() and self._waiters[task] == 0:
+                    self.cancelled += 1
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if self._streams.get(key, (None,))[0] is task:
+            del self._streams[key]
+        self._waiters.pop(task, None)
+        # Mark the exception as retrieved when nobody is left to await it
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        total = self.upstream_calls + self.coalesced
+        return {
+            "in_flight": len(self._inflight) + len(self._streams),
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "coalesced_rate": round(self.coalesced / total, 4) if total else 0.0,
+        }
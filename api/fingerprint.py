@@ -0,0 +1,88 @@
+# fingerprint.py
+"""Error fingerprints for caching explanations.
+
+"permission denied: /home/ana/app.log" and "permission denied:
+/var/log/nginx/error.log" deserve the same explanation. An error's
+fingerprint is its diagnostic tail (the last few meaningful lines of
+stderr) with volatile tokens such as paths, URLs, addresses, hashes,
+timestamps and large numbers replaced by numbered placeholders. Errors
+with the same fingerprint share a cached explanation.
+
+The explanation is cached as a template: the specifics of the error it was
+written for are swapped for the same placeholders, and a later hit fills in
+its own values, so the user sees their paths and ports rather than someone
+else's.
+"""
+import hashlib
+import re
+from typing import Dict
+
+MAX_TAIL_LINES = 20
+MAX_TAIL_CHARS = 2000
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+# (kind, pattern); earlier patterns win, so URLs are taken before paths and
+# timestamps before plain numbers
+VOLATILE = [
+    ("TIME", r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?\b"
+             r"|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"),
+    ("URL", r"\b[a-z][a-z0-9+.-]*://[^\s'\"<>]+"),
+    ("UUID", r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"),
+    # Ports are left to N, since explanations mention them on their own
+    ("ADDR", r"\b\d{1,3}(?:\.\d{1,3}){3}\b|\[[0-9a-fA-F:]+\]"),
+    ("PATH", r"(?:\b[A-Za-z]:\\|~/|\.{1,2}/|/)[^\s'\"`:,;()<>\[\]]*[^\s'\"`:,;()<>\[\].]"),
+    ("HASH", r"\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{7,64}\b"),
+    # Short numbers (exit codes, signals, small line numbers) are kept: they
+    # often change the diagnosis, and are too ambiguous to template back
+    ("N", r"\b\d{3,}\b"),
+]
+VOLATILE_RE = re.compile("|".join(f"(?P<{kind}>{pattern})" for kind, pattern in VOLATILE))
+PLACEHOLDER_RE = re.compile(r"<(TIME|URL|UUID|ADDR|PATH|HASH|N)(\d+)>")
+
+
+def diagnostic_tail(error_msg: str, max_lines: int = MAX_TAIL_LINES, max_chars: int = MAX_TAIL_CHARS) -> str:
+    """The part of stderr worth explaining: colour codes and progress redraws removed, last lines kept."""
+    lines = []
+    for line in ANSI_RE.sub("", error_msg).replace("\r\n", "\n").split("\n"):
+        # Progress bars redraw with \r; only the final state of the line matters
+        line = line.rsplit("\r", 1)[-1].rstrip()
+        if line.strip():
+            lines.append(line)
+    return "\n".join(lines[-max_lines:])[-max_chars:]
+
+
+class Fingerprint:
+    """A normalized error and the specifics that were taken out of it."""
+
+    def __init__(self, error_msg: str):
+        self.values: Dict[str, str] = {}  # placeholder -> original text
+        counts: Dict[str, int] = {}
+        seen: Dict[str, str] = {}
+
+        def replace(match: re.Match) -> str:
+            value = match.group(0)
+            if value not in seen:
+                kind = match.lastgroup
+                counts[kind] = counts.get(kind, 0) + 1
+                seen[value] = f"<{kind}{counts[kind]}>"
+                self.values[seen[value]] = value
+            return seen[value]
+
+        self.template = VOLATILE_RE.sub(replace, error_msg)
+        self.key = hashlib.sha256(" ".join(self.template.split()).encode("utf-8")).hexdigest()
+
+    def templatize(self, explanation: str) -> str:
+        """Swap this error's specifics in an explanation for their placeholders."""
+        # Longest first, so a path is replaced before a number inside it
+        for placeholder, value in sorted(self.values.items(), key=lambda item: -len(item[1])):
+            explanation = re.sub(rf"(?<![\w/.-]){re.escape(value)}(?![\w/-])", placeholder, explanation)
+        return explanation
+
+    def render(self, template: str) -> str:
+        """Fill a cached explanation template in with this error's specifics."""
+        return PLACEHOLDER_RE.sub(lambda match: self.values.get(match.group(0), match.group(0)), template)
+
+
+def fingerprint(error_msg: str) -> Fingerprint:
+    return Fingerprint(diagnostic_tail(error_msg))
+
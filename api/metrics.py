@@ -0,0 +1,261 @@
+# metrics.py
+"""Prometheus metrics and structured request logs for the TermAI backend.
+
+A small in-process registry rendered in the Prometheus text format, so no
+client library is needed. Counters and histograms are updated as requests
+run; collectors turn snapshot dicts (cache, coalescing, parsing, prompt
+stats) into gauges at scrape time. `MetricsMiddleware` times every request
+until its body is fully sent, streamed responses included, and writes one
+JSON log line per request when TERMAI_JSON_LOGS=1.
+"""
+import contextvars
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+# Per-request accumulator for time spent waiting on the LLM: [seconds, calls]
+llm_time: contextvars.ContextVar = contextvars.ContextVar("llm_time", default=None)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[tuple]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One slot per bucket, then sum and count
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def samples(self) -> Iterable[tuple]:
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in items:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative
+            yield f"{self.name}_sum", labels, counts[-2]
+            yield f"{self.name}_count", labels, counts[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[tuple]]) -> None:
+        """Register fn() -> [(name, labels, value), ...], exposed as gauges at scrape time."""
+        self.collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collect in self.collectors:
+            seen = set()
+            for name, labels, value in collect():
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def flatten_stats(prefix: str, stats: dict) -> Iterable[tuple]:
+    """Turn a nested stats dict into (name, {}, value) samples for its numeric leaves."""
+    for key, value in stats.items():
+        name = NAME_RE.sub("_", f"{prefix}_{key}")
+        if isinstance(value, dict):
+            yield from flatten_stats(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, {}, value
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "termai_http_requests_total", "HTTP requests by route and status.", ("method", "path", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "termai_http_request_duration_seconds", "Time to send the full response, by route.", ("method", "path"))
+LLM_LATENCY = REGISTRY.histogram(
+    "termai_llm_call_duration_seconds", "Upstream LLM call duration by mode, model tier and outcome.",
+    ("mode", "tier", "outcome"))
+LLM_TOKENS = REGISTRY.counter(
+    "termai_llm_tokens_total", "LLM tokens by direction; estimated when the provider reports none.",
+    ("direction", "source"))
+PROMPT_TOKENS = REGISTRY.histogram(
+    "termai_llm_prompt_tokens", "Input tokens per LLM call.", (),
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000))
+
+
+def record_llm_call(mode: str, outcome: str, seconds: float, tier: str = "strong") -> None:
+    LLM_LATENCY.observe(seconds, mode=mode, tier=tier, outcome=outcome)
+    accumulated = llm_time.get()
+    if accumulated is not None:
+        accumulated[0] += seconds
+        accumulated[1] += 1
+
+
+def record_tokens(prompt_tokens: int, output_tokens: int, reported: bool) -> None:
+    source = "reported" if reported else "estimated"
+    LLM_TOKENS.inc(prompt_tokens, direction="input", source=source)
+    LLM_TOKENS.inc(output_tokens, direction="output", source=source)
+    PROMPT_TOKENS.observe(prompt_tokens)
+
+
+def usage_tokens(message) -> Optional[Tuple[int, int]]:
+    """(input, output) tokens reported by the provider on a langchain message, if any."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+access_log = logging.getLogger("termai.access")
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "logger": record.name}
+        entry.update(getattr(record, "fields", {"message": record.getMessage()}))
+        return json.dumps(entry)
+
+
+def configure_logging() -> bool:
+    """Send one JSON line per request to stderr when TERMAI_JSON_LOGS=1."""
+    if os.getenv("TERMAI_JSON_LOGS", "0").lower() not in ("1", "true", "on"):
+        return False
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JSONFormatter())
+    access_log.addHandler(handler)
+    access_log.setLevel(logging.INFO)
+    access_log.propagate = False
+    return True
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request until its last body chunk is sent."""
+
+    def __init__(self, app, json_logs: bool = False):
+        self.app = app
+        self.json_logs = json_logs
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+        token = llm_time.set([0.0, 0])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            accumulated = llm_time.get()
+            llm_time.reset(token)
+            route = scope.get("route")
+            # Route templates, not raw paths, keep label cardinality bounded
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(method=scope["method"], path=path, status=str(status[0]))
+            HTTP_LATENCY.observe(elapsed, method=scope["method"], path=path)
+            if self.json_logs:
+                client = scope.get("client")
+                access_log.info("request", extra={"fields": {
+                    "method": scope["method"],
+                    "path": path,
+                    "status": status[0],
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "llm_ms": round(accumulated[0] * 1000, 2),
+                    "llm_calls": accumulated[1],
+                    "client": client[0] if client else None,
+                }})
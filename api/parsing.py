@@ -0,0 +1,218 @@
+# parsing.py
+"""Tolerant parsing of LLM replies into a list of shell commands.
+
+The model is asked for `{"commands": [...]}`, but replies arrive wrapped in
+code fences, as numbered lists, surrounded by prose or cut off mid-JSON.
+`parse_commands` recovers the commands locally so the LLM only has to be
+asked again when nothing usable can be salvaged.
+"""
+import json
+import re
+from typing import Any, List, Optional
+
+
+class CommandParseError(ValueError):
+    """Raised when no commands can be recovered from a reply."""
+
+
+FENCE_RE = re.compile(r"```[ \t]*([\w+-]*)[ \t]*\n?(.*?)(?:```|$)", re.S)
+JSON_STRING_RE = re.compile(r'"((?:[^"\\\n]|\\.)*)"\s*(?=[,\]])')
+COMMANDS_ARRAY_RE = re.compile(r'"commands"\s*:\s*\[', re.I)
+LIST_MARKER_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•]|\$|>|PS [^>]*>)\s+")
+INLINE_CODE_RE = re.compile(r"`([^`]+)`")
+PROSE_START_RE = re.compile(
+    r"^(?:here(?:'s| is| are)|this|these|the |note|to |you |sure|i |i'|explanation|output|"
+    r"first|then|next|finally|alternatively|make sure|if you|it will|this will|okay|ok,|certainly|use the|run the|in order)",
+    re.I,
+)
+# What the first word of a command looks like: a lowercase program or path,
+# a Windows path, a PowerShell Verb-Noun cmdlet or a variable assignment
+PROGRAM_RE = re.compile(
+    r"^(?:[a-z0-9_.~/\\$&(][^\s,;:!?]*|[A-Za-z]:\\\S*|[A-Z][a-z]+-[A-Za-z]\w*|[A-Za-z_]\w*=\S*)(?:\s|$)"
+)
+SENTENCE_END_RE = re.compile(r"[A-Za-z]{2}[.!?]$")
+SHELL_LANGS = {"", "sh", "bash", "zsh", "shell", "console", "powershell", "ps1", "pwsh", "cmd", "bat", "batch"}
+
+
+def message_text(message: Any) -> str:
+    """Return the text of a chat model reply whether content is a string or a list of parts."""
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, str):
+                parts.append(part)
+            elif isinstance(part, dict) and part.get("type", "text") == "text":
+                parts.append(part.get("text", ""))
+        return "".join(parts)
+    return str(content)
+
+
+def _from_json_value(value: Any) -> Optional[List[str]]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key.lower() in ("commands", "command", "result"):
+                return _from_json_value(item)
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return [value] if value else None
+    if isinstance(value, list):
+        cmds = [item.strip() for item in value if isinstance(item, str) and item.strip()]
+        return cmds or None
+    return None
+
+
+def _try_json(text: str) -> Optional[List[str]]:
+    """Parse the outermost JSON object or array embedded in the text."""
+    for opener, closer in (("{", "}"), ("[", "]")):
+        start = text.find(opener)
+        end = text.rfind(closer)
+        if start == -1 or end <= start:
+            continue
+        try:
+            cmds = _from_json_value(json.loads(text[start:end + 1]))
+        except ValueError:
+            continue
+        if cmds:
+            return cmds
+    return None
+
+
+def _try_partial_json(text: str) -> Optional[List[str]]:
+    """Salvage the complete string elements of a truncated `"commands": [` array."""
+    match = COMMANDS_ARRAY_RE.search(text)
+    if not match:
+        return None
+    cmds = []
+    for raw in JSON_STRING_RE.findall(text[match.end():]):
+        try:
+            cmd = json.loads(f'"{raw}"').strip()
+        except ValueError:
+            continue
+        if cmd:
+            cmds.append(cmd)
+    return cmds or None
+
+
+def _looks_like_prose(line: str) -> bool:
+    return line.endswith(":") or line.startswith("#") or bool(PROSE_START_RE.match(line))
+
+
+def _looks_like_command(line: str) -> bool:
+    return bool(PROGRAM_RE.match(line)) and not SENTENCE_END_RE.search(line)
+
+
+def _try_lines(text: str, code: bool = False) -> Optional[List[str]]:
+    """Treat the reply as one command per line, dropping list markers and prose.
+
+    Outside a code block (`code=False`) a line only counts when it is quoted
+    as code or starts like a command, so a refusal is not run as one.
+    """
+    cmds = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("```"):
+            continue
+        line = LIST_MARKER_RE.sub("", line, count=1).strip()
+        if _looks_like_prose(line):
+            # Prose often still quotes the command inline
+            inline = INLINE_CODE_RE.findall(line)
+            cmds.extend(code.strip() for code in inline if code.strip())
+            continue
+        if line.startswith("`") and line.endswith("`") and len(line) > 1:
+            line = line.strip("`").strip()
+        elif not code and not _looks_like_command(line):
+            continue
+        if line:
+            cmds.append(line)
+    return cmds or None
+
+
+def parse_commands(text: str) -> List[str]:
+    """Extract the command list from an LLM reply, raising CommandParseError on failure."""
+    text = (text or "").strip()
+    if not text:
+        raise CommandParseError("empty reply")
+
+    cmds = _try_json(text) or _try_partial_json(text)
+    if cmds:
+        return cmds
+    try:
+        json.loads(text)
+    except ValueError:
+        pass
+    else:
+        # Well-formed JSON without commands (e.g. an empty list) is not a
+        # line-based answer either
+        raise CommandParseError(f"no commands in JSON reply: {text[:200]!r}")
+
+    fences = FENCE_RE.findall(text)
+    for lang, body in fences:
+        if lang.lower() == "json":
+            cmds = _try_json(body) or _try_partial_json(body)
+            if cmds:
+                return cmds
+    shell_blocks = [body for lang, body in fences if lang.lower() in SHELL_LANGS and body.strip()]
+    if shell_blocks:
+        cmds = _try_lines("\n".join(shell_blocks), code=True)
+        if cmds:
+            return cmds
+
+    cmds = _try_lines(text)
+    if cmds:
+        return cmds
+    raise CommandParseError(f"no commands found in reply: {text[:200]!r}")
+
+
+ARRAY_NEXT_RE = re.compile(r"\s*,?\s*")
+
+
+class CommandStream:
+    """Pull commands out of a streamed `{"commands": [...]}` reply as soon as each is complete."""
+
+    def __init__(self):
+        self.text = ""
+        self.commands: List[str] = []
+        self._pos: Optional[int] = None  # just past the last complete array element
+
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk of the reply and return the commands it completed."""
+        self.text += chunk
+        if self._pos is None:
+            match = COMMANDS_ARRAY_RE.search(self.text)
+            if not match:
+                return []
+            self._pos = match.end()
+        new = []
+        while True:
+            start = ARRAY_NEXT_RE.match(self.text, self._pos).end()
+            # Anchored so an escaped quote inside an unfinished element can't match
+            match = JSON_STRING_RE.match(self.text, start)
+            if not match:
+                break
+            self._pos = match.end()
+            try:
+                cmd = json.loads(f'"{match.group(1)}"').strip()
+            except ValueError:
+                continue
+            if cmd:
+                new.append(cmd)
+        self.commands.extend(new)
+        return new
+
+    def finish(self) -> List[str]:
+        """Parse the whole reply once it has ended and return any commands not yet emitted."""
+        try:
+            cmds = parse_commands(self.text)
+        except CommandParseError:
+            if self.commands:
+                return []
+            raise
+        emitted = len(self.commands)
+        # Commands already sent are final; only a consistent tail is added
+        rest = cmds[emitted:] if cmds[:emitted] == self.commands else []
+        self.commands.extend(rest)
+        return rest
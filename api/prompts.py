@@ -0,0 +1,233 @@
+# prompts.py
+"""Prompt templates for the TermAI backend.
+
+The command prompt is assembled from guideline sections tagged with the
+platform and shell they apply to. The static part (everything except the
+tools line and the instruction) is rendered once per (platform, shell) and
+reused, so every request for the same platform starts with a byte-identical
+prefix that providers can cache. The instruction always goes last.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Above this many estimated input tokens the optional sections are dropped
+PROMPT_TOKEN_BUDGET = int(os.getenv("TERMAI_PROMPT_TOKEN_BUDGET", 0)) or None
+
+JSON_OUTPUT_INSTRUCTIONS = (
+    'Respond with ONLY a JSON object of the form {"commands": ["<command 1>", "<command 2>"]} '
+    "and no other text, explanations or code fences."
+)
+
+REPAIR_PROMPT = """Your previous reply could not be read as a list of shell commands:
+
+{reply}
+
+""" + JSON_OUTPUT_INSTRUCTIONS
+
+# (title, platforms, shells, optional, body). `platforms`/`shells` of None
+# mean "always"; optional sections are the first to go over the token budget.
+SECTIONS: List[Tuple[str, Optional[set], Optional[set], bool, str]] = [
+    ("Safety First", None, None, False, """\
+- Only generate **non-destructive** commands.
+- Avoid commands that delete files, modify system settings, or execute unknown scripts."""),
+    ("System-Specific Commands", {"windows"}, None, False, """\
+- Prefer `dir` over `ls`, and `cd` for navigation."""),
+    ("System-Specific Commands", {"unix"}, None, False, """\
+- Prefer `ls` over `dir`."""),
+    ("Structured Output", None, None, False, """\
+- If a single command is enough, return a **single command**.
+- DO NOT RETURN EMPTY ARRAY, NEVER.
+- If multiple steps are required, return a **list of commands** in the correct execution order."""),
+    ("No Dangerous Commands", None, None, False, """\
+- **Forbidden commands:** `rm -rf`, `del /s`, `mv *`, `sudo`, `curl | sh`, `format`, `shutdown`, etc."""),
+    ("Minimal Output", None, None, False, """\
+- **Return only the shell command(s)** without explanations or additional text.
+- Use only commands valid for {shell} shell."""),
+    ("Mandatory Use of Non-Interactive Flags (`--yes`, `--force`, `-y`, etc.)", None, None, False, """\
+- Always use `--yes`, `--force`, `-y`, or equivalent to prevent user interaction.
+- Ensure every command that may require confirmation (like `npm create next-app`, `npx shadcn-ui init`) includes `--yes`, `--force`, `-y`, or equivalent.
+- **For `npx create-next-app`, always include `--use-npm` (or `--use-yarn` / `--use-pnpm` based on context) along with `--yes` to prevent package manager selection prompts.**"""),
+    ("PowerShell Here-String Handling", None, {"powershell"}, False, """\
+- If generating a PowerShell script that writes multiline text (e.g., `main.go` file creation), ensure:
+    - Use `@'` and `'@` syntax correctly (each on its own line).
+    - Do **not** place extra characters before or after the here-string declaration.
+    - Ensure correct file encoding (`utf8`).
+    - Apply this approach to any `npx` commands that prompt for package installation."""),
+    ("Strict Rule: Always Use Version Commands to Detect Software Instead of Path Lookups", None, None, True, """\
+- **Use `flutter --version` instead of `where flutter` or `which flutter`.**
+- **Use `kubectl version --client` instead of `Get-Service kubernetes`.**
+- **Use `docker ps` instead of `Get-Service docker`.**
+- **Use `node -v`, `python --version`, or `go version` instead of checking the system PATH with `where` or `which`.**
+- **Only fall back to `where` (Windows) or `which` (Linux/macOS) if there is no version command available.**"""),
+    ("For system hardware queries, always provide comprehensive information", {"windows"}, None, True, """\
+- Use commands like these:
+    - For System & CPU: `Get-CimInstance Win32_ComputerSystem | Select-Object Manufacturer,Model,SystemType,TotalPhysicalMemory`
+    - For CPU Details: `Get-CimInstance Win32_Processor | Select-Object Name,NumberOfCores,NumberOfLogicalProcessors,MaxClockSpeed`
+    - For Memory: `Get-CimInstance Win32_PhysicalMemory | Select-Object Capacity,Speed,Manufacturer`
+    - For GPU: `Get-CimInstance Win32_VideoController | Select-Object Name,VideoMemoryType,AdapterRAM,DriverVersion`
+    - For Storage: `Get-CimInstance Win32_LogicalDisk | Select-Object DeviceID,Size,FreeSpace`
+    - For OS Details: `Get-CimInstance Win32_OperatingSystem | Select-Object Caption,Version,OSArchitecture`
+- Prefer Get-CimInstance over legacy commands, structured as Get-CimInstance [Component] | Select-Object [Details] | Format-Table
+- Format output for readability using Format-Table or Format-List
+- Include units where applicable (GB, MHz, etc.)"""),
+    ("For system hardware queries, always provide comprehensive information", {"unix"}, None, True, """\
+- Use commands like these:
+    - For CPU: `lscpu`
+    - For Memory: `free -h`
+    - For GPU: `lspci | grep -i vga`
+    - For Storage: `df -h`
+    - For OS: `uname -a`
+    - For System Overview: `hostnamectl`
+- Combine standard tools (lscpu, dmidecode, free, lspci, df) and use distribution-specific tools when available
+- Prefer human-readable flags (-h) when available"""),
+    ("For dynamic system monitoring", {"windows"}, None, True, """\
+- CPU Usage: `Get-Counter '\\Processor(_Total)\\% Processor Time'`
+- Memory Usage: `Get-Counter '\\Memory\\Available MBytes'`
+- Disk I/O: `Get-Counter '\\PhysicalDisk(_Total)\\Disk Reads/sec','\\PhysicalDisk(_Total)\\Disk Writes/sec'`"""),
+    ("For dynamic system monitoring", {"unix"}, None, True, """\
+- Real-time stats: `top` or `htop`
+- Disk I/O: `iostat`
+- Network: `netstat -i`"""),
+]
+
+SHELL_ALIASES = {"pwsh": "powershell", "powershell.exe": "powershell", "cmd.exe": "cmd"}
+SHELL_NAME_RE = re.compile(r"^[a-z0-9_.-]{1,20}$")
+# Rough BPE-like split: short word pieces and single punctuation marks
+TOKEN_ESTIMATE_RE = re.compile(r"\w{1,8}|[^\w\s]")
+
+prompt_stats: Dict[str, dict] = {}
+
+
+class Prompt(str):
+    """Prompt text that remembers its estimated token count."""
+
+    tokens: int
+
+    def __new__(cls, text: str, tokens: int):
+        prompt = super().__new__(cls, text)
+        prompt.tokens = tokens
+        return prompt
+
+
+def normalize_platform(system_info: Optional[str]) -> str:
+    """Map the client's system_info onto windows, unix or any (unknown: include both)."""
+    value = (system_info or "").strip().lower()
+    if not value:
+        return "any"
+    return "windows" if value.startswith("win") else "unix"
+
+
+def normalize_shell(shell_type: Optional[str]) -> str:
+    value = (shell_type or "").strip().lower()
+    value = SHELL_ALIASES.get(value, value)
+    return value if SHELL_NAME_RE.match(value) else "any"
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the model's input token count without a network round trip."""
+    return len(TOKEN_ESTIMATE_RE.findall(text))
+
+
+def _applies(values: Optional[set], value: str) -> bool:
+    return values is None or value == "any" or value in values
+
+
+@lru_cache(maxsize=64)
+def render_prefix(platform: str, shell: str, compact: bool = False) -> str:
+    """Render the static part of the command prompt for one platform and shell."""
+    shell_name = shell if shell != "any" else "the user's"
+    system = {"windows": "Windows", "unix": "Unix/Linux"}.get(platform, "Windows or Unix/Linux")
+    sections = [
+        (title, body) for title, platforms, shells, optional, body in SECTIONS
+        if _applies(platforms, platform) and _applies(shells, shell) and not (compact and optional)
+    ]
+    lines = [
+        f"You are an AI assistant that converts natural language instructions into **safe and precise shell commands** for {system} systems.",
+        f"The user is currently using {shell_name} shell.",
+        "",
+        "### **Guidelines:**",
+    ]
+    for number, (title, body) in enumerate(sections, start=1):
+        lines += ["", f"{number}. **{title}:**", body.replace("{shell}", shell_name)]
+    lines += [
+        "",
+        "### **Expected Output:**",
+        f"A **single valid shell command** or an **array of shell commands** for a {system} system.",
+        "DO NOT RETURN EMPTY ARRAY, NEVER.",
+        JSON_OUTPUT_INSTRUCTIONS,
+        "",
+    ]
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=64)
+def prefix_tokens(platform: str, shell: str, compact: bool = False) -> int:
+    return estimate_tokens(render_prefix(platform, shell, compact))
+
+
+def precompile() -> None:
+    """Render the prefixes for the common platform/shell pairs up front."""
+    for platform, shells in (("windows", ("powershell", "cmd", "bash")), ("unix", ("bash", "zsh", "sh", "fish"))):
+        for shell in shells:
+            prefix_tokens(platform, shell)
+            prefix_tokens(platform, shell, compact=True)
+
+
+def _record(kind: str, tokens: int, trimmed: bool = False) -> None:
+    stats = prompt_stats.setdefault(kind, {"requests": 0, "input_tokens": 0, "max_input_tokens": 0, "trimmed": 0})
+    stats["requests"] += 1
+    stats["input_tokens"] += tokens
+    stats["max_input_tokens"] = max(stats["max_input_tokens"], tokens)
+    stats["trimmed"] += trimmed
+
+
+def build_query_prompt(instruction: str, shell_type: Optional[str], system_info: Optional[str],
+                       tools: Optional[str] = None) -> Prompt:
+    """Build the command generation prompt: cached static prefix, then tools and instruction."""
+    platform, shell = normalize_platform(system_info), normalize_shell(shell_type)
+    shell_name = shell if shell != "any" else "shell"
+    suffix = ""
+    if tools:
+        suffix += f"Tools installed on the user's machine: {tools}.\n"
+    suffix += (
+        f"### **Instruction:**\n"
+        f"Convert the following instruction into a {shell_name} command or a list of {shell_name} commands:\n"
+        f'**Instruction:** "{instruction}"\n'
+    )
+    suffix_tokens = estimate_tokens(suffix)
+    compact = bool(PROMPT_TOKEN_BUDGET) and prefix_tokens(platform, shell) + suffix_tokens > PROMPT_TOKEN_BUDGET
+    tokens = prefix_tokens(platform, shell, compact) + suffix_tokens
+    _record("query", tokens, trimmed=compact)
+    return Prompt(render_prefix(platform, shell, compact) + suffix, tokens)
+
+
+def build_error_prompt(error_msg: str) -> Prompt:
+    prompt = f"""You are an AI assistant that explains shell command errors in **simple terms** for a user.
+- Explain the error clearly and provide potential fixes.
+- Format the response in a short and concise way.
+- Error Message: "{error_msg}"
+"""
+    tokens = estimate_tokens(prompt)
+    _record("error", tokens)
+    return Prompt(prompt, tokens)
+
+
+def build_repair_prompt(reply: str) -> Prompt:
+    prompt = REPAIR_PROMPT.replace("{reply}", reply[:2000])
+    tokens = estimate_tokens(prompt)
+    _record("repair", tokens)
+    return Prompt(prompt, tokens)
+
+
+def stats() -> dict:
+    info = render_prefix.cache_info()
+    return {
+        "prefixes": {"rendered": info.currsize, "hits": info.hits, "misses": info.misses},
+        "token_budget": PROMPT_TOKEN_BUDGET,
+        **{
+            kind: dict(values, mean_input_tokens=round(values["input_tokens"] / values["requests"], 1))
+            for kind, values in prompt_stats.items()
+        },
+    }
@@ -0,0 +1,155 @@
+# providers.py
+"""LLM providers for the TermAI backend.
+
+`create_llm()` picks the model behind the server from TERMAI_LLM_PROVIDER:
+
+- `gemini` (default): langchain's ChatGoogleGenerativeAI, imported on first
+  use so the server module loads without the Google client libraries.
+- `fake`: a deterministic local stand-in with configurable latency, failure
+  rate and malformed-reply rate, for benchmarks and offline development.
+
+Each provider offers two tiers (see routing.py): `strong` for the general
+model and `fast` for a smaller, quicker one used on simple requests.
+
+Providers only need the two langchain runnable methods the server calls:
+`ainvoke(prompt)` returning a message with `.content`, and `astream(prompt)`
+yielding such messages.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import shlex
+import threading
+import zlib
+from typing import Dict, Optional
+
+INSTRUCTION_RE = re.compile(r'\*\*Instruction:\*\* "(.*)"', re.S)
+
+
+class FakeMessage:
+    def __init__(self, content: str, usage_metadata: Optional[dict] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+class FakeLLMError(RuntimeError):
+    """Injected upstream failure."""
+
+
+class FakeLLM:
+    """Deterministic local LLM.
+
+    Replies echo the instruction back as a command (`echo '<instruction>'`),
+    explain errors with a fixed sentence and answer repair prompts with valid
+    JSON. A `tail_rate` share of calls are stragglers that take
+    `tail_latency` seconds, like requests stuck on an overloaded replica.
+    Whether a call is slow, fails or returns an unparseable reply is drawn
+    from a generator seeded with the seed, the prompt and how often that
+    prompt was seen, so a run is reproducible regardless of request order.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, failure_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = 0, chunk_size: int = 8,
+                 tail_rate: float = 0.0, tail_latency: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.calls = 0
+        self._seen: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _plan(self, prompt: str):
+        """Decide latency, failure and reply for one call."""
+        key = zlib.crc32(str(prompt).encode("utf-8"))
+        with self._lock:
+            self.calls += 1
+            attempt = self._seen[key] = self._seen.get(key, 0) + 1
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        latency = max(self.latency + rng.uniform(-self.jitter, self.jitter), 0.0)
+        fail = rng.random() < self.failure_rate
+        malformed = rng.random() < self.malformed_rate
+        if rng.random() < self.tail_rate:
+            latency = self.tail_latency
+        return latency, fail, self._reply(str(prompt), malformed)
+
+    @staticmethod
+    def _reply(prompt: str, malformed: bool) -> str:
+        if "could not be read as a list of shell commands" in prompt:
+            return json.dumps({"commands": ["echo 'repaired'"]})
+        match = INSTRUCTION_RE.search(prompt)
+        if match is None:
+            return "The command failed because the path does not exist. Check the spelling or create it first."
+        if malformed:
+            return "I'm sorry, I can't help with that right now."
+        return json.dumps({"commands": [f"echo {shlex.quote(match.group(1))}"]})
+
+    async def ainvoke(self, prompt):
+        latency, fail, reply = self._plan(prompt)
+        await asyncio.sleep(latency)
+        if fail:
+            raise FakeLLMError("injected failure")
+        return FakeMessage(reply)
+
+    async def astream(self, prompt):
+        latency, fail, reply = self._plan(prompt)
+        chunks = [reply[i:i + self.chunk_size] for i in range(0, len(reply), self.chunk_size)]
+        # The latency is spread over the reply, like tokens arriving over time
+        delay = latency / max(len(chunks), 1)
+        for index, chunk in enumerate(chunks):
+            await asyncio.sleep(delay)
+            if fail and index == len(chunks) // 2:
+                raise FakeLLMError("injected failure mid-stream")
+            yield FakeMessage(chunk)
+
+
+def create_fake_llm(tier: str = "strong") -> FakeLLM:
+    """Build the fake from TERMAI_FAKE_LATENCY, _JITTER, _FAILURE_RATE, _MALFORMED_RATE, _SEED,
+    _TAIL_RATE and _TAIL_LATENCY.
+
+    The fast tier reads TERMAI_FAKE_FAST_<NAME> first and falls back to the
+    same settings.
+    """
+    def setting(name: str, default: float) -> str:
+        value = os.getenv(f"TERMAI_FAKE_{name}", default)
+        return os.getenv(f"TERMAI_FAKE_FAST_{name}", value) if tier == "fast" else value
+
+    return FakeLLM(
+        latency=float(setting("LATENCY", 0.5)),
+        jitter=float(setting("JITTER", 0)),
+        failure_rate=float(setting("FAILURE_RATE", 0)),
+        malformed_rate=float(setting("MALFORMED_RATE", 0)),
+        seed=int(setting("SEED", 0)),
+        tail_rate=float(setting("TAIL_RATE", 0)),
+        tail_latency=float(setting("TAIL_LATENCY", 0)),
+    )
+
+
+def create_gemini_llm(tier: str = "strong"):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    if tier == "fast":
+        model = os.getenv("TERMAI_GEMINI_FAST_MODEL", "gemini-1.5-flash")
+    else:
+        model = os.getenv("TERMAI_GEMINI_MODEL", "gemini-1.5-pro")
+    return ChatGoogleGenerativeAI(model=model, google_api_key=os.getenv("GOOGLE_API_KEY"))
+
+
+PROVIDERS = {
+    "gemini": create_gemini_llm,
+    "fake": create_fake_llm,
+}
+
+
+def create_llm(provider: Optional[str] = None, tier: str = "strong"):
+    """Return the `tier` model of the provider named by `provider` or TERMAI_LLM_PROVIDER (default gemini)."""
+    name = (provider or os.getenv("TERMAI_LLM_PROVIDER", "gemini")).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown TERMAI_LLM_PROVIDER {name!r}; expected one of {', '.join(PROVIDERS)}")
+    return PROVIDERS[name](tier)
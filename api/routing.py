@@ -0,0 +1,265 @@
+# routing.py
+"""Model tiering and hedged requests for the TermAI backend.
+
+Most instructions ("show disk usage", "list docker containers") and nearly
+all error explanations are easy enough for a small, fast model; multi-step
+plans, scripting and unusual platforms go to the strong one. `classify()`
+decides from cheap text cues, so routing adds microseconds, not a model
+call.
+
+Each tier also hedges: when a call has not finished after the tier's recent
+p95 latency (or, for streams, no chunk has arrived by then), a second
+identical call is started and whichever answers first wins; the other is
+cancelled. This cuts the tail left by slow replicas and stuck connections
+for a few percent more upstream calls. Hedges are capped at a share of
+calls and skipped when the server has no free LLM slot, so they never
+amplify an overload.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from providers import create_llm
+
+FAST = "fast"
+STRONG = "strong"
+
+QUERY = "query"
+ERROR = "error"
+REPAIR = "repair"
+
+FAST_MAX_WORDS = int(os.getenv("TERMAI_ROUTE_FAST_MAX_WORDS", 14))
+ACTIONS = (r"create|make|install|run|start|stop|restart|build|delete|remove|copy|move|rename|push|pull|commit"
+           r"|deploy|download|upload|set|configure|add|update|upgrade|open|kill|compress|extract|clone|activate"
+           r"|initiali[sz]e|init|mount|write|edit|replace|enable|disable|backup|back up|test|spin up")
+MULTI_STEP_RE = re.compile(
+    rf"\b(?:then|afterwards?|followed by|finally)\b"
+    rf"|\b(?:and|also)\s+(?:also\s+)?(?:{ACTIONS})\b|,\s*(?:{ACTIONS})\b"
+    r"|[;\n]|&&|\|\|?|(?:^|\s)\d+[.)]\s",
+    re.I,
+)
+COMPLEX_RE = re.compile(
+    r"\b(?:if|unless|until|while|each|loop|recursive(?:ly)?|script|schedule|cron(?:tab)?|regex"
+    r"|docker[- ]compose|kubernetes|kubectl|k8s|helm|terraform|ansible|systemd|systemctl|iptables"
+    r"|firewall|awk|sed|tunnel|rsync|migrat\w*|pipeline|ci|certificate|ssl|tls)\b",
+    re.I,
+)
+# Small models are weakest on shells they saw little of
+FAST_SHELLS = {"bash", "zsh", "sh", "dash", "ksh", "fish"}
+
+
+def classify(instruction: str, shell_type: Optional[str] = None, system_info: Optional[str] = None) -> tuple:
+    """Pick the tier for an instruction; returns (tier, reason)."""
+    if len(instruction.split()) > FAST_MAX_WORDS:
+        return STRONG, "long"
+    if MULTI_STEP_RE.search(instruction):
+        return STRONG, "multi-step"
+    if COMPLEX_RE.search(instruction):
+        return STRONG, "complex"
+    if (shell_type and shell_type.lower() not in FAST_SHELLS) or "windows" in (system_info or "").lower():
+        return STRONG, "platform"
+    return FAST, "simple"
+
+
+class LatencyTracker:
+    """Recent latencies of one tier, for the hedge delay."""
+
+    def __init__(self, percentile: float = 95, window: int = 200, min_samples: int = 20,
+                 initial: float = 2.0, floor: float = 0.05):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial = initial
+        self.floor = floor
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def threshold(self) -> float:
+        """Seconds to wait before hedging: the tracked percentile, or `initial` until there is enough data."""
+        if len(self._samples) < self.min_samples:
+            return self.initial
+        ordered = sorted(self._samples)
+        value = ordered[min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)]
+        return max(value, self.floor)
+
+
+class Tier:
+    """One model and its latency history and hedging counters."""
+
+    def __init__(self, name: str, llm: Any, **tracker_options):
+        self.name = name
+        self.llm = llm
+        self.latency = LatencyTracker(**tracker_options)
+        self.first_chunk = LatencyTracker(**tracker_options)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(self.latency.threshold() * 1000, 1),
+            "stream_hedge_delay_ms": round(self.first_chunk.threshold() * 1000, 1),
+        }
+
+
+async def _aclose(chunks) -> None:
+    aclose = getattr(chunks, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+_EMPTY = object()
+
+
+class Router:
+    """Routes LLM calls to a tier and hedges slow ones.
+
+    `tiers` maps FAST and/or STRONG to a model; a missing tier falls back to
+    the other. With `routing` off every request uses the strong model, and
+    with `hedging` off every call is made exactly once.
+    """
+
+    def __init__(self, tiers: Dict[str, Any], routing: bool = True, hedging: bool = True,
+                 hedge_budget: float = 0.1, **tracker_options):
+        self.tiers = {name: Tier(name, llm, **tracker_options) for name, llm in tiers.items()}
+        self.routing = routing and FAST in self.tiers
+        self.hedging = hedging
+        self.hedge_budget = hedge_budget
+        self.routes: Dict[str, int] = {}
+
+    def tier(self, name: str) -> Tier:
+        return self.tiers.get(name) or self.tiers.get(STRONG) or self.tiers[FAST]
+
+    def route(self, kind: str, instruction: str = "", shell_type: Optional[str] = None,
+              system_info: Optional[str] = None) -> Tier:
+        """The tier for a request: error explanations and repairs are fast, queries are classified."""
+        if not self.routing:
+            name, reason = STRONG, "routing-off"
+        elif kind == QUERY:
+            name, reason = classify(instruction, shell_type, system_info)
+        else:
+            name, reason = FAST, kind
+        self.routes[reason] = self.routes.get(reason, 0) + 1
+        return self.tier(name)
+
+    async def invoke(self, tier: Tier, prompt: str, slots: Optional[asyncio.Semaphore] = None):
+        """`ainvoke` the tier's model, hedged."""
+        return await self._hedged(tier, lambda: tier.llm.ainvoke(prompt), tier.latency, slots)
+
+    async def stream(self, tier: Tier, prompt: str, slots: Optional[asyncio.Semaphore] = None):
+        """`astream` the tier's model; the hedge races on the first chunk, then one stream continues."""
+
+        async def open_stream():
+            chunks = tier.llm.astream(prompt).__aiter__()
+            try:
+                return chunks, await chunks.__anext__()
+            except StopAsyncIteration:
+                return chunks, _EMPTY
+            except BaseException:
+                await _aclose(chunks)
+                raise
+
+        def discard(opened):
+            asyncio.ensure_future(_aclose(opened[0]))
+
+        chunks, first = await self._hedged(tier, open_stream, tier.first_chunk, slots, discard)
+        try:
+            if first is _EMPTY:
+                return
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await _aclose(chunks)
+
+    def _may_hedge(self, tier: Tier, slots: Optional[asyncio.Semaphore]) -> bool:
+        if not self.hedging or tier.hedged >= self.hedge_budget * tier.calls:
+            return False
+        return slots is None or not slots.locked()
+
+    async def _hedged(self, tier: Tier, attempt: Callable[[], Awaitable], tracker: LatencyTracker,
+                      slots: Optional[asyncio.Semaphore], discard: Optional[Callable] = None):
+        """Run `attempt`, plus a backup once it is slower than the tracker's threshold; first success wins."""
+
+        async def timed():
+            started = time.perf_counter()
+            result = await attempt()
+            tracker.observe(time.perf_counter() - started)
+            return result
+
+        async def backup():
+            # The backup holds a concurrency slot of its own while it races
+            if slots is not None:
+                await slots.acquire()
+            try:
+                return await timed()
+            finally:
+                if slots is not None:
+                    slots.release()
+
+        tier.calls += 1
+        primary = asyncio.ensure_future(timed())
+        tasks = [primary]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=tracker.threshold())
+            if not done and self._may_hedge(tier, slots):
+                tier.hedged += 1
+                tasks.append(asyncio.ensure_future(backup()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is None:
+                        winner = task
+                        if task is not primary:
+                            tier.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and discard is not None and not task.cancelled() and task.exception() is None:
+                    discard(task.result())
+
+    def stats(self) -> dict:
+        return {
+            "routing": self.routing,
+            "hedging": self.hedging,
+            "routes": dict(self.routes),
+            **{name: tier.stats() for name, tier in self.tiers.items()},
+        }
+
+
+def create_router(provider: Optional[str] = None) -> Router:
+    """Build the router and its models from environment variables.
+
+    TERMAI_ROUTING=0 sends everything to the strong model and TERMAI_HEDGE=0
+    turns hedging off. TERMAI_HEDGE_PERCENTILE (default 95), TERMAI_HEDGE_DELAY
+    (the delay until enough latencies are known, default 2s),
+    TERMAI_HEDGE_MIN_DELAY and TERMAI_HEDGE_BUDGET (largest share of calls
+    that may be hedged, default 0.1) tune hedging.
+    """
+    routing = os.getenv("TERMAI_ROUTING", "1").lower() not in ("0", "false", "off")
+    hedging = os.getenv("TERMAI_HEDGE", "1").lower() not in ("0", "false", "off")
+    tiers = {STRONG: create_llm(provider, STRONG)}
+    if routing:
+        tiers[FAST] = create_llm(provider, FAST)
+    return Router(
+        tiers,
+        routing=routing,
+        hedging=hedging,
+        hedge_budget=float(os.getenv("TERMAI_HEDGE_BUDGET", 0.1)),
+        percentile=float(os.getenv("TERMAI_HEDGE_PERCENTILE", 95)),
+        initial=float(os.getenv("TERMAI_HEDGE_DELAY", 2.0)),
+        floor=float(os.getenv("TERMAI_HEDGE_MIN_DELAY", 0.05)),
+    )
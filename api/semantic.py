@@ -0,0 +1,288 @@
+# semantic.py
+"""Similarity cache for near-duplicate instructions.
+
+"list docker containers" and "show the running docker containers" should
+not cost two LLM calls. Instructions are embedded (hashed word and
+character n-grams by default, or a sentence-transformers model when one is
+configured) and stored per (shell_type, system_info) partition in a NumPy
+matrix. A lookup returns the cached commands of the most similar stored
+instruction when its cosine similarity clears the threshold.
+
+Large partitions are not scanned in full: an inverted index from words to
+rows picks candidates sharing the query's rarest words, and only those rows
+are scored, which keeps lookups well under a millisecond at hundreds of
+thousands of entries.
+"""
+import itertools
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+WORD_RE = re.compile(r"[a-z0-9_][a-z0-9_./:-]*")
+# Numbers, paths, file names, URLs and flags must match exactly for a hit:
+# "kill process 1234" must never reuse the commands for process 4321
+ANCHOR_RE = re.compile(r"\d|[./\\:]|^-")
+# Verbs that change what a command does; like anchors they must match exactly
+ACTION_WORDS = {
+    "delete", "kill", "stop", "start", "restart", "create", "make", "install", "uninstall", "update",
+    "upgrade", "move", "rename", "copy", "write", "overwrite", "add", "push", "pull", "build", "deploy",
+    "run", "clean", "prune", "reset", "enable", "disable", "mount", "unmount", "chmod", "chown", "compress",
+    "extract", "download", "upload", "count", "sort", "compare", "edit", "replace", "open", "close",
+}
+# Quantifiers, negations and time ranges narrow or widen what a command
+# selects: "list all containers" is `docker ps -a`, "files changed last week"
+# differs from "files changed today", so they are anchors too
+SCOPE_WORDS = {
+    "all", "every", "any", "only", "except", "excluding", "but", "without", "not", "no", "none", "never",
+    "last", "past", "recent", "latest", "oldest", "newest", "older", "newer", "since", "before", "after",
+    "today", "yesterday", "tomorrow", "minute", "hour", "day", "week", "month", "year",
+}
+SYNONYMS = {
+    "show": "list", "display": "list", "view": "list", "print": "list", "get": "list", "see": "list",
+    "remove": "delete", "rm": "delete", "erase": "delete", "terminate": "kill",
+    "folder": "directory", "dir": "directory", "setup": "install", "generate": "create", "new": "create",
+}
+STOPWORDS = {
+    "a", "an", "the", "please", "me", "my", "of", "in", "on", "for", "to", "and",
+    "what", "which", "are", "is", "that", "this", "with", "can", "you", "i", "how", "do",
+}
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def terms(text: str) -> List[str]:
+    """Content words of an instruction, lower-cased and lightly stemmed."""
+    words = (_stem(word) for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS)
+    return [SYNONYMS.get(word, word) for word in words]
+
+
+def anchors(words: List[str]) -> frozenset:
+    return frozenset(word for word in words
+                     if word in ACTION_WORDS or word in SCOPE_WORDS or ANCHOR_RE.search(word))
+
+
+class HashingEmbedder:
+    """Feature-hashed bag of words, word bigrams and character trigrams, L2-normalized."""
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, words: List[str]):
+        for word in words:
+            yield word, 1.0
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                # Trigrams make typos and inflections still overlap
+                yield "#" + padded[i:i + 3], 0.3
+        for first, second in zip(words, words[1:]):
+            yield f"{first} {second}", 0.5
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(terms(text)):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class ModelEmbedder:
+    """Sentence-transformers model, loaded lazily; better at synonyms than hashing."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, text: str) -> np.ndarray:
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+class Partition:
+    """Vectors and cached values for one (shell_type, system_info) pair."""
+
+    def __init__(self, dim: int, max_entries: int):
+        self.max_entries = max_entries
+        self.vectors = np.zeros((min(1024, max_entries), dim), dtype=np.float32)
+        self.expires = np.zeros(len(self.vectors), dtype=np.float64)
+        self.values: List[Any] = []
+        self.row_terms: List[Set[str]] = []
+        self.row_anchors: List[frozenset] = []
+        self.postings: Dict[str, Set[int]] = {}
+        self.next_row = 0  # ring position once full
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _grow(self) -> None:
+        size = min(len(self.vectors) * 2, self.max_entries)
+        vectors = np.zeros((size, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:len(self.vectors)] = self.vectors
+        expires = np.zeros(size, dtype=np.float64)
+        expires[:len(self.expires)] = self.expires
+        self.vectors, self.expires = vectors, expires
+
+    def add(self, vector: np.ndarray, words: List[str], value: Any, expires_at: float) -> bool:
+        """Store an entry, overwriting the oldest one when full; returns True if one was evicted."""
+        evicted = False
+        if len(self.values) < self.max_entries:
+            row = len(self.values)
+            if row >= len(self.vectors):
+                self._grow()
+            self.values.append(value)
+            self.row_terms.append(set())
+            self.row_anchors.append(frozenset())
+        else:
+            row = self.next_row
+            self.next_row = (row + 1) % self.max_entries
+            for term in self.row_terms[row]:
+                self.postings[term].discard(row)
+            self.values[row] = value
+            evicted = True
+        self.vectors[row] = vector
+        self.expires[row] = expires_at
+        self.row_terms[row] = set(words)
+        self.row_anchors[row] = anchors(words)
+        for term in self.row_terms[row]:
+            self.postings.setdefault(term, set()).add(row)
+        return evicted
+
+    def candidates(self, words: List[str], full_scan: int, max_candidates: int) -> Optional[np.ndarray]:
+        """Rows worth scoring: all of them for small partitions, else rows sharing the rarest words."""
+        if len(self.values) <= full_scan:
+            return None
+        lists = sorted((self.postings[term] for term in set(words) if self.postings.get(term)), key=len)
+        rows: Set[int] = set()
+        for posting in lists:
+            if rows and len(rows) + len(posting) > max_candidates:
+                break
+            rows |= posting
+        # Only very common words: score an arbitrary bounded subset
+        return np.fromiter(itertools.islice(rows, max_candidates), dtype=np.int64)
+
+
+class SemanticCache:
+    """Cosine-similarity cache partitioned by shell and platform."""
+
+    def __init__(self, embedder=None, threshold: float = 0.8, ttl: float = 24 * 60 * 60,
+                 max_entries: int = 200000, full_scan: int = 2048, max_candidates: int = 4096):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.full_scan = full_scan
+        self.max_candidates = max_candidates
+        self.partitions: Dict[tuple, Partition] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lookup_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _partition_key(shell_type: Optional[str], system_info: Optional[str]) -> tuple:
+        return ((shell_type or "").lower(), (system_info or "").lower())
+
+    def get(self, instruction: str, shell_type: Optional[str], system_info: Optional[str]) -> Optional[Any]:
+        """Return the value stored for the most similar instruction above the threshold, if any."""
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                value = self._lookup(instruction, shell_type, system_info)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                return value
+        finally:
+            self._lookup_seconds += time.perf_counter() - started
+
+    def _lookup(self, instruction: str, shell_type: Optional[str], system_info: Optional[str]) -> Optional[Any]:
+        partition = self.partitions.get(self._partition_key(shell_type, system_info))
+        if not partition:
+            return None
+        words = terms(instruction)
+        if not words:
+            return None
+        query = self.embedder.embed(instruction)
+        rows = partition.candidates(words, self.full_scan, self.max_candidates)
+        if rows is None:
+            scores = partition.vectors[:len(partition)] @ query
+            rows = np.arange(len(partition))
+        elif len(rows):
+            scores = partition.vectors[rows] @ query
+        else:
+            return None
+
+        scores = np.where(partition.expires[rows] > time.time(), scores, -1.0)
+        query_anchors = anchors(words)
+        # Best few in order; the anchor check may reject the very best one
+        for index in np.argsort(scores)[::-1][:8]:
+            if scores[index] < self.threshold:
+                break
+            row = int(rows[index])
+            if partition.row_anchors[row] == query_anchors:
+                return partition.values[row]
+        return None
+
+    def add(self, instruction: str, shell_type: Optional[str], system_info: Optional[str], value: Any) -> None:
+        words = terms(instruction)
+        if not words:
+            return
+        vector = self.embedder.embed(instruction)
+        with self._lock:
+            key = self._partition_key(shell_type, system_info)
+            partition = self.partitions.get(key)
+            if partition is None:
+                partition = self.partitions[key] = Partition(self.embedder.dim, self.max_entries)
+            if partition.add(vector, words, value, time.time() + self.ttl):
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "embedder": self.embedder.name,
+                "threshold": self.threshold,
+                "partitions": len(self.partitions),
+                "entries": sum(len(p) for p in self.partitions.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "mean_lookup_ms": round(self._lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+            }
+
+
+def create_semantic_cache(prefix: str = "TERMAI_SEMANTIC") -> Optional[SemanticCache]:
+    """Build the similarity cache from environment variables; returns None unless enabled.
+
+    `<prefix>_CACHE=1` turns it on. `<prefix>_THRESHOLD`, `<prefix>_TTL`,
+    `<prefix>_MAX_ENTRIES` (per partition) and `<prefix>_DIM` tune it, and
+    `<prefix>_MODEL` names a sentence-transformers model to embed with.
+    """
+    if os.getenv(f"{prefix}_CACHE", "0").lower() not in ("1", "true", "on"):
+        return None
+    model = os.getenv(f"{prefix}_MODEL")
+    embedder = ModelEmbedder(model) if model else HashingEmbedder(int(os.getenv(f"{prefix}_DIM", 256)))
+    return SemanticCache(
+        embedder,
+        threshold=float(os.getenv(f"{prefix}_THRESHOLD", 0.8)),
+        ttl=float(os.getenv(f"{prefix}_TTL", os.getenv("TERMAI_CACHE_TTL", 24 * 60 * 60))),
+        max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", 200000)),
+    )
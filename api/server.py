@@ -1,170 +1,439 @@
 # server.py
-from fastapi import FastAPI, Query
+import asyncio
+import json
+import time
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from typing import Optional
 import uvicorn
 from pydantic import BaseModel, Field
 
 import os
 
-from typing import Optional, List
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import AsyncIterator, Optional, List
 
 from dotenv import load_dotenv
+from cache import create_cache, make_key
+from semantic import create_semantic_cache
+from coalesce import SingleFlight
+from fingerprint import Fingerprint, diagnostic_tail
+from parsing import CommandParseError, CommandStream, message_text, parse_commands
+import prompts
+from prompts import build_error_prompt, build_query_prompt, build_repair_prompt, estimate_tokens
+from metrics import REGISTRY, MetricsMiddleware, configure_logging, flatten_stats, record_llm_call, \
+    record_tokens, usage_tokens
+from routing import ERROR, QUERY, REPAIR, Tier, create_router
 
 dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
 load_dotenv()  # Explicitly load the .env file
 
-# Access the API key from the environment
-api_key = os.getenv("GOOGLE_API_KEY")
+# Gemini by default (GOOGLE_API_KEY); TERMAI_LLM_PROVIDER=fake runs fully offline.
+# Simple requests go to the fast model and slow calls are hedged (routing.py).
+router = create_router()
 
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", google_api_key = api_key)
+# Upstream LLM calls are bounded per worker: at most MAX_CONCURRENCY run at
+# once, a request waits up to QUEUE_TIMEOUT seconds for a slot before being
+# rejected with 429, and each call is abandoned after LLM_TIMEOUT seconds.
+LLM_TIMEOUT = float(os.getenv("TERMAI_LLM_TIMEOUT", 30))
+MAX_CONCURRENCY = int(os.getenv("TERMAI_MAX_CONCURRENCY", 64))
+QUEUE_TIMEOUT = float(os.getenv("TERMAI_QUEUE_TIMEOUT", 2))
+# Batches fan out at most BATCH_CONCURRENCY instructions at a time
+BATCH_MAX_ITEMS = int(os.getenv("TERMAI_BATCH_MAX_ITEMS", 100))
+BATCH_CONCURRENCY = int(os.getenv("TERMAI_BATCH_CONCURRENCY", 8))
+
+llm_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+def record_usage(prompt: str, reply: str, usage) -> None:
+    """Count tokens for one LLM call, as reported by the provider or else estimated."""
+    if usage is not None:
+        record_tokens(usage[0], usage[1], reported=True)
+    else:
+        prompt_tokens = getattr(prompt, "tokens", None) or estimate_tokens(prompt)
+        record_tokens(prompt_tokens, estimate_tokens(reply), reported=False)
+
+
+async def call_llm(tier: Tier, prompt: str):
+    """Invoke a tier's model asynchronously under the concurrency limit and timeout."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(llm_slots.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        record_llm_call("call", "busy", time.perf_counter() - started, tier.name)
+        raise HTTPException(status_code=429, detail="Server is busy, please retry", headers={"Retry-After": "1"})
+    outcome = "error"
+    try:
+        response = await asyncio.wait_for(router.invoke(tier, prompt, llm_slots), LLM_TIMEOUT)
+        outcome = "ok"
+        record_usage(prompt, message_text(response), usage_tokens(response))
+        return response
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise HTTPException(status_code=504, detail="LLM request timed out")
+    except Exception as e:
+        # Same status the streaming and batch endpoints report for upstream failures
+        raise HTTPException(status_code=502, detail=f"LLM request failed: {type(e).__name__}") from e
+    finally:
+        llm_slots.release()
+        record_llm_call("call", outcome, time.perf_counter() - started, tier.name)
+
+
+async def stream_llm(tier: Tier, prompt: str) -> AsyncIterator[str]:
+    """Stream a tier's reply text under the concurrency limit; LLM_TIMEOUT bounds the whole reply."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(llm_slots.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        record_llm_call("stream", "busy", time.perf_counter() - started, tier.name)
+        raise HTTPException(status_code=429, detail="Server is busy, please retry", headers={"Retry-After": "1"})
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LLM_TIMEOUT
+    chunks = router.stream(tier, prompt, llm_slots).__aiter__()
+    parts, usage, outcome = [], None, "error"
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise HTTPException(status_code=504, detail="LLM request timed out")
+            # Providers report usage on the last chunk, if at all
+            usage = usage_tokens(chunk) or usage
+            text = message_text(chunk)
+            if text:
+                parts.append(text)
+                yield text
+        outcome = "ok"
+    finally:
+        llm_slots.release()
+        record_llm_call("stream", outcome, time.perf_counter() - started, tier.name)
+        record_usage(prompt, "".join(parts), usage)
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
 
 class QueryChecker(BaseModel):
     commands: List[str] = Field(
         description="The list of shell commands generated by the LLM"
     )
 
+class BatchQuery(BaseModel):
+    instructions: List[str] = Field(description="Instructions to generate commands for")
+    shell_type: Optional[str] = None
+    system_info: Optional[str] = None
+    tools: Optional[str] = None
+
 app = FastAPI(title="TermAI Backend")
+app.add_middleware(MetricsMiddleware, json_logs=configure_logging())
+
+response_cache = create_cache()
+semantic_cache = create_semantic_cache()
+query_flights = SingleFlight()
+# Explanations keyed by error fingerprint, stored as templates (see fingerprint.py)
+error_cache = create_cache("TERMAI_ERROR_CACHE")
+error_flights = SingleFlight()
+parse_stats = {"parsed": 0, "repaired": 0, "failed": 0}
+prompts.precompile()
+
+
+def cached_commands(cache_key: str, instruction: str, shell_type: Optional[str],
+                    system_info: Optional[str]) -> Optional[List[str]]:
+    """Look the instruction up in the exact cache, then among similar instructions."""
+    if response_cache is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    if semantic_cache is not None:
+        return semantic_cache.get(instruction, shell_type, system_info)
+    return None
+
+
+def store_commands(cache_key: str, instruction: str, shell_type: Optional[str], system_info: Optional[str],
+                   cmds: List[str]) -> None:
+    if not cmds:
+        return
+    if response_cache is not None:
+        response_cache.set(cache_key, cmds)
+    if semantic_cache is not None:
+        semantic_cache.add(instruction, shell_type, system_info, cmds)
+
+
+async def generate_commands(instruction: str, shell_type: Optional[str], system_info: Optional[str],
+                            tools: Optional[str] = None) -> List[str]:
+    """Generate commands for an instruction, sharing identical in-flight and cached requests."""
+    cache_key = make_key(instruction, shell_type, system_info, tools)
+    cached = cached_commands(cache_key, instruction, shell_type, system_info)
+    if cached is not None:
+        return cached
+
+    async def upstream():
+        cmds = await ask_llm_for_commands(instruction, shell_type, system_info, tools)
+        store_commands(cache_key, instruction, shell_type, system_info, cmds)
+        return cmds
+
+    return await query_flights.do(cache_key, upstream)
+
+
+async def repair_commands(reply: str) -> List[str]:
+    """Ask the LLM once more, with a short repair prompt, for a reply that couldn't be parsed."""
+    repair_prompt = build_repair_prompt(reply)
+    try:
+        cmds = parse_commands(message_text(await call_llm(router.route(REPAIR), repair_prompt)))
+        parse_stats["repaired"] += 1
+    except CommandParseError:
+        parse_stats["failed"] += 1
+        cmds = []
+    return cmds
+
+
+async def ask_llm_for_commands(instruction: str, shell_type: Optional[str], system_info: Optional[str],
+                               tools: Optional[str] = None) -> List[str]:
+    """Build the prompt and ask the LLM for the command list."""
+    prompt = build_query_prompt(instruction, shell_type, system_info, tools)
+    # One call, parsed locally; the model is only asked again (with a short
+    # repair prompt) when nothing can be recovered from its reply.
+    tier = router.route(QUERY, instruction, shell_type, system_info)
+    reply = message_text(await call_llm(tier, prompt))
+    try:
+        cmds = parse_commands(reply)
+        parse_stats["parsed"] += 1
+    except CommandParseError:
+        cmds = await repair_commands(reply)
+
+    return QueryChecker(commands=cmds).commands
+
+
+def ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+def error_event(e: Exception) -> dict:
+    # Headers are already sent when a stream fails, so failures travel in-band
+    if isinstance(e, HTTPException):
+        return {"type": "error", "status": e.status_code, "detail": e.detail}
+    return {"type": "error", "status": 502, "detail": f"LLM request failed: {type(e).__name__}"}
+
+
+async def command_events(cache_key: str, instruction: str, shell_type: Optional[str], system_info: Optional[str],
+                         tools: Optional[str] = None) -> AsyncIterator[dict]:
+    """Stream one upstream generation: a `command` event per command as soon as it is complete, then `done`."""
+    parser = CommandStream()
+    try:
+        tier = router.route(QUERY, instruction, shell_type, system_info)
+        async for text in stream_llm(tier, build_query_prompt(instruction, shell_type, system_info, tools)):
+            emitted = len(parser.commands)
+            for index, cmd in enumerate(parser.feed(text), start=emitted):
+                yield {"type": "command", "index": index, "command": cmd}
+        try:
+            new = parser.finish()
+            parse_stats["parsed"] += 1
+        except CommandParseError:
+            new = await repair_commands(parser.text)
+            parser.commands.extend(new)
+        for index, cmd in enumerate(new, start=len(parser.commands) - len(new)):
+            yield {"type": "command", "index": index, "command": cmd}
+    except Exception as e:
+        yield error_event(e)
+        return
+
+    cmds = parser.commands
+    store_commands(cache_key, instruction, shell_type, system_info, cmds)
+    yield {"type": "done", "result": cmds, "cached": False}
+
+
+async def stream_command_events(instruction: str, shell_type: Optional[str], system_info: Optional[str],
+                                tools: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield NDJSON events: one per command as soon as it is complete, then `done` (or `error`).
+
+    Identical concurrent requests share one upstream stream; a request that
+    joins late first gets the commands already generated.
+    """
+    cache_key = make_key(instruction, shell_type, system_info, tools)
+    cached = cached_commands(cache_key, instruction, shell_type, system_info)
+    if cached is not None:
+        for index, cmd in enumerate(cached):
+            yield ndjson({"type": "command", "index": index, "command": cmd})
+        yield ndjson({"type": "done", "result": cached, "cached": True})
+        return
+
+    events = query_flights.stream(
+        cache_key, lambda: command_events(cache_key, instruction, shell_type, system_info, tools))
+    async for event in events:
+        yield ndjson(event)
+
 
 @app.get("/api/query")
 async def handle_query(
     instruction: str = Query(..., description="The query to process"),
     shell_type: Optional[str] = Query(None, description="Optional parameter 1"),
-    system_info: Optional[str] = Query(False, description="Optional parameter 2")
+    system_info: Optional[str] = Query(None, description="Optional parameter 2"),
+    tools: Optional[str] = Query(None, description="Comma-separated tools available on the client")
 ):
     """Process a query using the CLI function."""
-    # Build options dictionary from query parameters
-
-    prompt = f"""
-    You are an AI assistant that converts natural language instructions into **safe and precise shell commands** for {system_info} systems.  
-    The user is currently using {shell_type} shell.  
-
-    ### **Guidelines:**  
-
-    1. **Safety First:**  
-    - Only generate **non-destructive** commands.  
-    - Avoid commands that delete files, modify system settings, or execute unknown scripts.  
-
-    2. **System-Specific Commands:**  
-    - On **Windows**, prefer `dir` over `ls`, and `cd` for navigation.  
-    - On **Unix/Linux**, prefer `ls` over `dir`.  
-
-    3. **Structured Output:**  
-    - If a single command is enough, return a **single command**.  
-    - DO NOT RETURN EMPTY ARRAY, NEVER.  
-    - If multiple steps are required, return a **list of commands** in the correct execution order.  
-
-    4. **No Dangerous Commands:**  
-    - **Forbidden commands:** `rm -rf`, `del /s`, `mv *`, `sudo`, `curl | sh`, `format`, `shutdown`, etc.  
-
-    5. **Minimal Output:**  
-    - **Return only the shell command(s)** without explanations or additional text.  
-    - Use only commands valid for {shell_type} shell.  
-
-    6. **Mandatory Use of Non-Interactive Flags (`--yes`, `--force`, `-y`, etc.)**  
-    - Always use `--yes`, `--force`, `-y`, or equivalent to prevent user interaction.  
-    - Ensure every command that may require confirmation (like `npm create next-app`, `npx shadcn-ui init`) includes `--yes`, `--force`, `-y`, or equivalent.  
-    - **For `npx create-next-app`, always include `--use-npm` (or `--use-yarn` / `--use-pnpm` based on context) along with `--yes` to prevent package manager selection prompts.**  
-
-    7. **PowerShell Here-String Handling (If Applicable)**  
-    - If generating a PowerShell script that writes multiline text (e.g., `main.go` file creation), ensure:  
-        - Use `@'` and `'@` syntax correctly (each on its own line).  
-        - Do **not** place extra characters before or after the here-string declaration.  
-        - Ensure correct file encoding (`utf8`).  
-        - Apply this approach to any `npx` commands that prompt for package installation.  
-
-    8. **Strict Rule: Always Use Version Commands to Detect Software Instead of Path Lookups:**  
-    - **Use `flutter --version` instead of `where flutter` or `which flutter`.**  
-    - **Use `kubectl version --client` instead of `Get-Service kubernetes`.**  
-    - **Use `docker ps` instead of `Get-Service docker`.**  
-    - **Use `node -v`, `python --version`, or `go version` instead of checking the system PATH with `where` or `which`.**  
-    - **Only fall back to `where` (Windows) or `which` (Linux/macOS) if there is no version command available.**  
-
-    9. **For system hardware queries, always provide comprehensive information:**
-    - **On Windows**, use these commands like these :
-        - For System & CPU: `Get-CimInstance Win32_ComputerSystem | Select-Object Manufacturer,Model,SystemType,TotalPhysicalMemory`
-        - For CPU Details: `Get-CimInstance Win32_Processor | Select-Object Name,NumberOfCores,NumberOfLogicalProcessors,MaxClockSpeed`
-        - For Memory: `Get-CimInstance Win32_PhysicalMemory | Select-Object Capacity,Speed,Manufacturer`
-        - For GPU: `Get-CimInstance Win32_VideoController | Select-Object Name,VideoMemoryType,AdapterRAM,DriverVersion`
-        - For Storage: `Get-CimInstance Win32_LogicalDisk | Select-Object DeviceID,Size,FreeSpace`
-        - For OS Details: `Get-CimInstance Win32_OperatingSystem | Select-Object Caption,Version,OSArchitecture`
-    
-    - **On Linux/macOS**, usecommands like these:
-        - For CPU: `lscpu`
-        - For Memory: `free -h`
-        - For GPU: `lspci | grep -i vga`
-        - For Storage: `df -h`
-        - For OS: `uname -a`
-        - For System Overview: `hostnamectl`
-
-    **Always follow these principles for system queries:**
-        - Use the most reliable and detailed commands available
-        - Format output for readability using Format-Table or Format-List in PowerShell
-        - Group related information together
-        - Provide multiple pieces of relevant information when querying hardware
-        - Include units where applicable (GB, MHz, etc.)
-        - Use vendor-specific tools when available (wmic, systeminfo, Get-CimInstance)
-    
-    - **For Windows systems:**
-        - Prefer Get-CimInstance over legacy commands
-        - Structure: Get-CimInstance [Component] | Select-Object [Details] | Format-Table
-        - Common components: Win32_ComputerSystem, Win32_Processor, Win32_PhysicalMemory, 
-          Win32_VideoController, Win32_LogicalDisk, Win32_OperatingSystem
-    
-    - **For Unix/Linux systems:**
-        - Combine standard tools: lscpu, dmidecode, free, lspci, df
-        - Use distribution-specific tools when available
-        - Prefer human-readable flags (-h) when available
-
-    10. **For dynamic system monitoring:**
-    - **On Windows:**
-        - CPU Usage: `Get-Counter '\Processor(_Total)\% Processor Time'`
-        - Memory Usage: `Get-Counter '\Memory\Available MBytes'`
-        - Disk I/O: `Get-Counter '\PhysicalDisk(_Total)\Disk Reads/sec','\PhysicalDisk(_Total)\Disk Writes/sec'`
-    
-    - **On Linux/macOS:**
-        - Real-time stats: `top` or `htop`
-        - Disk I/O: `iostat`
-        - Network: `netstat -i`
-
-    ### **Instruction:**  
-    Convert the following instruction into a {shell_type} command or a list of {shell_type} commands:  
-
-    **Instruction:** "{instruction}"  
-
-    ### **Expected Output:**  
-    A **single valid shell command** or an **array of shell commands** for a {system_info} system.  
-    DO NOT RETURN EMPTY ARRAY, NEVER.  
-    """
+    cmds = await generate_commands(instruction, shell_type, system_info, tools)
+    return {"result": cmds}
+
+
+@app.get("/api/query/stream")
+async def handle_query_stream(
+    instruction: str = Query(..., description="The query to process"),
+    shell_type: Optional[str] = Query(None, description="Optional parameter 1"),
+    system_info: Optional[str] = Query(None, description="Optional parameter 2"),
+    tools: Optional[str] = Query(None, description="Comma-separated tools available on the client")
+):
+    """Stream generated commands as NDJSON events while the LLM is still writing."""
+    return StreamingResponse(
+        stream_command_events(instruction, shell_type, system_info, tools),
+        media_type="application/x-ndjson",
+    )
+
+
+async def batch_events(batch: BatchQuery) -> AsyncIterator[str]:
+    """Yield one NDJSON line per instruction, in completion order, running BATCH_CONCURRENCY at a time."""
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def one(index: int, instruction: str) -> dict:
+        item = {"index": index, "instruction": instruction}
+        async with slots:
+            try:
+                item["result"] = await generate_commands(instruction, batch.shell_type, batch.system_info, batch.tools)
+            except HTTPException as e:
+                item["error"] = {"status": e.status_code, "detail": e.detail}
+            except Exception as e:
+                item["error"] = {"status": 502, "detail": f"LLM request failed: {type(e).__name__}"}
+        return item
+
+    # Duplicate instructions share one upstream call through generate_commands
+    tasks = [asyncio.ensure_future(one(index, instruction)) for index, instruction in enumerate(batch.instructions)]
     try:
-        response = llm.with_structured_output(QueryChecker).invoke(prompt)
-        cmds = response.commands
-         
-    except Exception as e:
-        response = llm.invoke(prompt)  # Fall back to normal response
-        commands = response.content.strip().split("\n")  # Try parsing manually
-        cmds = [cmd.strip() for cmd in commands if cmd.strip() and "```" not in cmd]
+        for finished in asyncio.as_completed(tasks):
+            yield ndjson(await finished)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/api/query/batch")
+async def handle_query_batch(batch: BatchQuery):
+    """Generate commands for many instructions at once, streamed back as NDJSON as each completes."""
+    if len(batch.instructions) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} instructions per batch")
+    return StreamingResponse(batch_events(batch), media_type="application/x-ndjson")
+
+
+def cached_explanation(fp: Fingerprint) -> Optional[str]:
+    return error_cache.get(fp.key) if error_cache is not None else None
 
-   
-    return {"result": cmds}
+
+def store_explanation(fp: Fingerprint, explanation: str) -> str:
+    """Cache an explanation under the error's fingerprint; returns it as a template."""
+    template = fp.templatize(explanation)
+    if error_cache is not None and explanation:
+        error_cache.set(fp.key, template)
+    return template
 
 
 @app.get("/api/error")
 async def handle_error(
     error_msg: str = Query(..., description="The error message to process"),
 ):
-    """Process a query using the CLI function."""
-    # Build options dictionary from query parameters
-    prompt = f"""
-    You are an AI assistant that explains shell command errors in **simple terms** for a user.
-    - Error Message: "{error_msg}"
-    - Explain the error clearly and provide potential fixes.
-    - Format the response in a short and concise way.
-    """
-    response = llm.invoke(prompt)
-
-   
-    return {"result": response.content.strip()}
+    """Explain an error, reusing the explanation of an earlier error with the same fingerprint."""
+    tail = diagnostic_tail(error_msg)
+    fp = Fingerprint(tail)
+    template = cached_explanation(fp)
+    if template is None:
+        async def upstream():
+            response = await call_llm(router.route(ERROR), build_error_prompt(tail))
+            return store_explanation(fp, message_text(response).strip())
+
+        # Concurrent identical failures (a broken deploy hitting every client) share one call
+        template = await error_flights.do(fp.key, upstream)
+    return {"result": fp.render(template)}
+
+
+@app.get("/api/error/stream")
+async def handle_error_stream(
+    error_msg: str = Query(..., description="The error message to process"),
+):
+    """Stream the error explanation as NDJSON `token` events followed by `done`."""
+    tail = diagnostic_tail(error_msg)
+    fp = Fingerprint(tail)
+
+    async def upstream():
+        yield {"type": "tail", "tail": tail}
+        parts = []
+        try:
+            async for text in stream_llm(router.route(ERROR), build_error_prompt(tail)):
+                parts.append(text)
+                yield {"type": "token", "text": text}
+        except Exception as e:
+            yield error_event(e)
+            return
+        explanation = "".join(parts).strip()
+        yield {"type": "done", "result": explanation, "template": store_explanation(fp, explanation)}
+
+    async def events():
+        template = cached_explanation(fp)
+        if template is not None:
+            explanation = fp.render(template)
+            yield ndjson({"type": "token", "text": explanation})
+            yield ndjson({"type": "done", "result": explanation, "cached": True})
+            return
+
+        # Failures with the same fingerprint share one upstream stream. The
+        # tokens are only relayed live when this error reads exactly like the
+        # one being explained; otherwise the finished explanation is filled in
+        # with this error's own paths and ports.
+        live = True
+        async for event in error_flights.stream(fp.key, upstream):
+            if event["type"] == "tail":
+                live = event["tail"] == tail
+            elif event["type"] == "token":
+                if live:
+                    yield ndjson(event)
+            elif event["type"] == "done":
+                explanation = event["result"] if live else fp.render(event["template"])
+                if not live:
+                    yield ndjson({"type": "token", "text": explanation})
+                yield ndjson({"type": "done", "result": explanation, "cached": False})
+            else:
+                yield ndjson(event)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def collect_stats() -> dict:
+    return {
+        "cache": response_cache.stats() if response_cache is not None else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "coalescing": query_flights.stats(),
+        "error_cache": error_cache.stats() if error_cache is not None else None,
+        "error_coalescing": error_flights.stats(),
+        "parsing": parse_stats,
+        "prompts": prompts.stats(),
+        "routing": router.stats(),
+    }
+
+
+# Cache, coalescing, parser fallback, prompt and routing counters become termai_<section>_<name> gauges
+REGISTRY.collector(lambda: (
+    sample for section, values in collect_stats().items() if values
+    for sample in flatten_stats(f"termai_{section}", values)
+))
+
+
+@app.get("/api/stats")
+async def handle_stats():
+    """Report cache and request coalescing counters."""
+    return collect_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def handle_metrics():
+    """Expose request, LLM and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
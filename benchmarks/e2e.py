@@ -0,0 +1,239 @@
+"""End-to-end benchmark: the backend under load and the termai CLI against it.
+
+Starts the real server (uvicorn in its own process, fake LLM provider) on a
+local port, then:
+
+1. drives /api/query (or /api/query/stream with --stream) with concurrent
+   clients and reports throughput, p50/p99 latency and status codes;
+2. runs `termai run` in fresh interpreters against it, first on an idle
+   server and then while the load is running, and reports CLI wall time.
+
+Nothing leaves the machine, so it runs offline in CI. With budgets set the
+exit code is 1 when one is exceeded or a CLI run fails.
+
+Usage:
+    python benchmarks/e2e.py [--clients 100] [--requests 5] [--latency 0.2] [--cli-runs 5]
+                             [--failure-rate 0] [--malformed-rate 0] [--stream]
+                             [--max-p99-ms N] [--max-cli-ms N] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def server_env(args) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "TERMAI_LLM_PROVIDER": "fake",
+        "TERMAI_FAKE_LATENCY": str(args.latency),
+        "TERMAI_FAKE_JITTER": str(args.latency / 4),
+        "TERMAI_FAKE_FAILURE_RATE": str(args.failure_rate),
+        "TERMAI_FAKE_MALFORMED_RATE": str(args.malformed_rate),
+        "TERMAI_FAKE_SEED": str(args.seed),
+        # Every request should reach the (fake) LLM
+        "TERMAI_CACHE_BACKEND": "off",
+        "TERMAI_SEMANTIC_CACHE": "0",
+    })
+    return env
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client.
+
+    httpx's pool costs more CPU per request than the server under test once
+    there are a hundred connections on a small CI machine, which would make
+    the numbers measure the load generator.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def get(self, path: str, params: dict):
+        """Send a GET and read the whole response; returns (status, body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.writer.write(f"GET {path}?{urlencode(params)} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode("ascii"))
+        await self.writer.drain()
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+        status = int(head.split(" ", 2)[1])
+        headers = dict(line.split(":", 1) for line in head.split("\r\n")[1:] if ":" in line)
+        if "chunked" in headers.get("transfer-encoding", ""):
+            body = b""
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                body += await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            body = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        return status, body
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def start_server(args):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(args.port),
+        "--log-level", "warning", cwd=os.path.join(ROOT, "api"), env=server_env(args),
+    )
+    deadline = time.perf_counter() + 20
+    while time.perf_counter() < deadline:
+        if process.returncode is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        probe = Connection(args.port)
+        try:
+            await probe.get("/", {})
+            return process
+        except OSError:
+            await asyncio.sleep(0.1)
+        finally:
+            probe.close()
+    process.kill()
+    raise RuntimeError("server did not start within 20s")
+
+
+async def generate_load(args, results: dict) -> None:
+    latencies = results["latencies"]
+    statuses = results["statuses"]
+    path = "/api/query/stream" if args.stream else "/api/query"
+
+    async def client(client_id: int):
+        connection = Connection(args.port)
+        try:
+            for n in range(args.requests):
+                params = {"instruction": f"show containers {client_id}-{n}", "shell_type": "bash", "system_info": "unix"}
+                started = time.perf_counter()
+                status, body = await connection.get(path, params)
+                if args.stream and status == 200:
+                    # Failures after the headers arrive as an in-band error event
+                    last = json.loads(body.decode("utf-8").strip().splitlines()[-1])
+                    status = last.get("status", 200)
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+    results["wall"] = time.perf_counter() - started
+
+
+async def run_cli(args, home: str, instruction: str):
+    """Run `termai run` in a fresh interpreter; returns (wall seconds, ok)."""
+    env = dict(os.environ)
+    env.update({
+        "TERMAI_BACKEND_URL": f"http://127.0.0.1:{args.port}",
+        "TERMAI_HOME": home,
+        "TERMAI_RETRIES": "0",
+        "PYTHONPATH": ROOT,
+    })
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "src.cli", "run", instruction, "--no-cache", "--no-local",
+        cwd=ROOT, env=env, stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+    )
+    output, _ = await process.communicate()
+    elapsed = time.perf_counter() - started
+    # The fake provider answers with `echo '<instruction>'`
+    ok = process.returncode == 0 and instruction in output.decode("utf-8", "replace")
+    return elapsed, ok
+
+
+async def run(args) -> int:
+    server = await start_server(args)
+    home = tempfile.mkdtemp(prefix="termai-e2e-")
+    try:
+        idle = [await run_cli(args, home, f"print idle run {n}") for n in range(args.cli_runs)]
+
+        load = {"latencies": [], "statuses": {}, "wall": 0.0}
+        load_task = asyncio.ensure_future(generate_load(args, load))
+        loaded = []
+        for n in range(args.cli_runs):
+            if load_task.done():
+                break
+            loaded.append(await run_cli(args, home, f"print loaded run {n}"))
+        await load_task
+    finally:
+        server.terminate()
+        await server.wait()
+
+    latencies = load["latencies"]
+    summary = {
+        "clients": args.clients,
+        "requests": len(latencies),
+        "endpoint": "/api/query/stream" if args.stream else "/api/query",
+        "fake_latency_ms": args.latency * 1000,
+        "throughput_rps": round(len(latencies) / load["wall"], 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "statuses": {str(status): count for status, count in sorted(load["statuses"].items(), key=str)},
+        "cli_idle_p50_ms": round(statistics.median(t for t, _ in idle) * 1000, 1),
+        "cli_loaded_p50_ms": round(statistics.median(t for t, _ in loaded) * 1000, 1) if loaded else None,
+        "cli_runs_under_load": len(loaded),
+        "cli_failures": sum(not ok for _, ok in idle + loaded),
+    }
+
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"{summary['endpoint']}: clients={args.clients} requests={summary['requests']} "
+              f"fake_latency={summary['fake_latency_ms']:.0f}ms")
+        print(f"throughput {summary['throughput_rps']} req/s, latency p50 {summary['p50_ms']:.0f}ms, "
+              f"p99 {summary['p99_ms']:.0f}ms")
+        print(f"status codes: {summary['statuses']}")
+        loaded_text = (f"{summary['cli_loaded_p50_ms']:.0f}ms under load ({len(loaded)} runs)"
+                       if loaded else "no runs finished under load")
+        print(f"termai run wall time p50: {summary['cli_idle_p50_ms']:.0f}ms idle, {loaded_text}")
+
+    failed = False
+    # With faults injected some CLI runs are expected to hit them
+    if summary["cli_failures"] and not (args.failure_rate or args.malformed_rate):
+        print(f"FAIL: {summary['cli_failures']} termai run invocation(s) failed")
+        failed = True
+    if args.max_p99_ms and summary["p99_ms"] > args.max_p99_ms:
+        print(f"FAIL: p99 {summary['p99_ms']:.0f}ms exceeds budget {args.max_p99_ms:.0f}ms")
+        failed = True
+    cli_worst = max(filter(None, (summary["cli_idle_p50_ms"], summary["cli_loaded_p50_ms"])))
+    if args.max_cli_ms and cli_worst > args.max_cli_ms:
+        print(f"FAIL: termai run p50 {cli_worst:.0f}ms exceeds budget {args.max_cli_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of fake LLM calls that fail")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="share of fake LLM replies that need the repair prompt")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="load the streaming endpoint instead")
+    parser.add_argument("--cli-runs", type=int, default=5, help="termai run invocations, idle and under load")
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--max-cli-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="print a single JSON summary line")
+    parser.add_argument("--port", type=int, default=8798)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
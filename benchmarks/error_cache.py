@@ -0,0 +1,98 @@
+"""Hit rate and cost of the error fingerprint cache on recurring failures.
+
+Generates error messages from a set of common failure shapes with random
+paths, ports, PIDs, hashes and timestamps, and reports how many distinct
+fingerprints they collapse to, the hit rate a warm cache would see, and the
+time to fingerprint one message. Fails (exit code 1) if two different
+failure shapes ever share a fingerprint, or if an explanation does not come
+back with the new error's specifics.
+
+Usage:
+    python benchmarks/error_cache.py [--errors 5000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+SHAPES = [
+    "ls: cannot access '{path}': No such file or directory",
+    "bash: {path}: Permission denied",
+    "docker: Error response from daemon: driver failed programming external connectivity on endpoint web "
+    "({hash}): Bind for 0.0.0.0:{port} failed: port is already allocated.",
+    "Error: listen EADDRINUSE: address already in use :::{port}",
+    "kill: ({pid}) - No such process",
+    "{time} ERROR could not connect to server: Connection refused\n\tIs the server running on host "
+    "\"127.0.0.1\" and accepting TCP/IP connections on port {port}?",
+    "fatal: unable to access 'https://github.com/acme/{name}.git/': Could not resolve host: github.com",
+    "npm ERR! code ENOENT\nnpm ERR! syscall open\nnpm ERR! path {path}/package.json\nnpm ERR! errno -2",
+    "error: could not lock config file {path}/.git/config: File exists",
+    "Traceback (most recent call last):\n  File \"{path}/app.py\", line 3, in <module>\n"
+    "ModuleNotFoundError: No module named 'flask'",
+]
+
+
+def random_values(rng: random.Random) -> dict:
+    name = rng.choice(["api", "web", "billing", "termai", "infra"])
+    return {
+        "path": "/" + rng.choice(["home", "srv", "var", "opt"])
+                + "".join(f"/{name}{rng.randint(1, 99)}" for _ in range(rng.randint(1, 3))),
+        "port": rng.choice([3000, 5432, 6379, 8000, 8080, 27017]),
+        "pid": rng.randint(1000, 99999),
+        "hash": "%012x" % rng.getrandbits(48),
+        "time": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 1{rng.randint(0, 9)}:2{rng.randint(0, 9)}:0{rng.randint(0, 9)}",
+        "name": name,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--errors", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from fingerprint import Fingerprint, diagnostic_tail
+
+    rng = random.Random(args.seed)
+    samples = []
+    for _ in range(args.errors):
+        shape = rng.randrange(len(SHAPES))
+        samples.append((shape, SHAPES[shape].format(**random_values(rng))))
+
+    started = time.perf_counter()
+    fingerprints = [Fingerprint(diagnostic_tail(message)) for _, message in samples]
+    elapsed = time.perf_counter() - started
+
+    shape_of = {}
+    failed = False
+    for (shape, _), fp in zip(samples, fingerprints):
+        if shape_of.setdefault(fp.key, shape) != shape:
+            print(f"FAIL: shapes {shape_of[fp.key]} and {shape} share fingerprint {fp.template!r}")
+            failed = True
+    seen = set()
+    hits = 0
+    for fp in fingerprints:
+        hits += fp.key in seen
+        seen.add(fp.key)
+
+    # An explanation written for the first error must come back with the second one's specifics
+    first = Fingerprint(SHAPES[0].format(path="/home/ana/report.csv"))
+    second = Fingerprint(SHAPES[0].format(path="/srv/data/out.csv"))
+    rendered = second.render(first.templatize("/home/ana/report.csv does not exist; check the path."))
+    if rendered != "/srv/data/out.csv does not exist; check the path.":
+        print(f"FAIL: re-templated explanation is {rendered!r}")
+        failed = True
+
+    print(f"{len(samples)} errors from {len(SHAPES)} shapes, {len({m for _, m in samples})} distinct messages, "
+          f"{len(seen)} fingerprints")
+    print(f"warm-cache hit rate {hits / len(samples):.1%}")
+    print(f"fingerprint {elapsed / len(samples) * 1e6:.1f} us per error")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Cost of the local command history: recording, flushing and full-text search.
+
+Fills a history store in a temporary TERMAI_HOME with synthetic entries,
+then reports the time `record()` adds to a run, the time the end-of-run
+flush takes, search latency over the full store, and that retention keeps
+the store at its bound. Fails (exit code 1) if a flush takes longer than
+--max-flush-ms or a search longer than --max-search-ms.
+
+Usage:
+    python benchmarks/history.py [--entries 10000] [--searches 200]
+                                 [--max-flush-ms 20] [--max-search-ms 20]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+VERBS = ["show", "list", "find", "delete", "compress", "start", "stop", "restart", "count", "download"]
+OBJECTS = ["docker containers", "log files", "node processes", "disk usage", "open ports", "git branches",
+           "python packages", "nginx config", "large files", "cron jobs", "postgres databases", "ssh keys"]
+COMMANDS = ["docker ps -a", "find . -name '*.log'", "pgrep -a node", "df -h", "ss -tulpn", "git branch -a",
+            "pip list", "nginx -t", "du -ah . | sort -rh | head", "crontab -l", "psql -l", "ls ~/.ssh"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--max-flush-ms", type=float, default=20)
+    parser.add_argument("--max-search-ms", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["TERMAI_HOME"] = tempfile.mkdtemp(prefix="termai-history-")
+    os.environ["TERMAI_HISTORY_MAX_ENTRIES"] = str(args.entries)
+    from src import history
+
+    rng = random.Random(args.seed)
+
+    def random_entry(n: int):
+        obj = rng.randrange(len(OBJECTS))
+        return (f"{rng.choice(VERBS)} the {OBJECTS[obj]} in project {n}", [COMMANDS[obj], f"echo done {n}"])
+
+    # Fill to the bound, then go past it to exercise retention
+    store = history.History()
+    batch = []
+    for n in range(int(args.entries * 1.2)):
+        instruction, commands = random_entry(n)
+        batch.append(history.Entry(instruction, commands, "bash"))
+        if len(batch) == 1000:
+            store.add(batch)
+            batch = []
+    store.add(batch)
+    store.close()
+
+    records, flushes = [], []
+    for n in range(200):
+        instruction, commands = random_entry(n)
+        started = time.perf_counter()
+        entry = history.record(instruction, commands, "bash")
+        entry.begin()
+        entry.end(0)
+        records.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        history.flush()
+        flushes.append(time.perf_counter() - started)
+
+    store = history.History()
+    queries = [[rng.choice(VERBS), rng.choice(OBJECTS).split()[0][:4]] for _ in range(args.searches)]
+    searches, found = [], 0
+    for terms in queries:
+        started = time.perf_counter()
+        found += len(store.search(terms))
+        searches.append(time.perf_counter() - started)
+    fts = store.fts
+    store.close()
+    with sqlite3.connect(store.path) as conn:
+        size = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    flush_p99 = percentile(flushes, 99) * 1000
+    search_p99 = percentile(searches, 99) * 1000
+    print(f"store: {size} entries (bound {args.entries}), fts5={'yes' if fts else 'no (LIKE fallback)'}")
+    print(f"record(): {statistics.mean(records) * 1e6:.1f} us per run")
+    print(f"flush (one entry, after the output): p50 {percentile(flushes, 50) * 1000:.2f}ms, p99 {flush_p99:.2f}ms")
+    print(f"search: p50 {percentile(searches, 50) * 1000:.2f}ms, p99 {search_p99:.2f}ms, "
+          f"{found / len(queries):.1f} results per query")
+
+    failed = False
+    if size > args.entries:
+        print(f"FAIL: retention kept {size} entries, bound is {args.entries}")
+        failed = True
+    if flush_p99 > args.max_flush_ms:
+        print(f"FAIL: flush p99 {flush_p99:.1f}ms exceeds budget {args.max_flush_ms:.0f}ms")
+        failed = True
+    if search_p99 > args.max_search_ms:
+        print(f"FAIL: search p99 {search_p99:.1f}ms exceeds budget {args.max_search_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Coverage and latency of the local intent fast path.
+
+Checks a corpus of phrasings against the built-in intents (expected intent
+id, or null when the backend should answer), verifies every built-in
+template passes the safety validator, and times lookups.
+
+Usage:
+    python benchmarks/intents.py [--iterations 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.intents import BUILTIN_INTENTS, IntentEngine  # noqa: E402
+from src.validation import check_command  # noqa: E402
+
+CORPUS = [
+    ("disk usage", "disk-usage"),
+    ("Show me the disk usage please", "disk-usage"),
+    ("how much space is left?", "disk-usage"),
+    ("check free disk space", "disk-usage"),
+    ("show memory", "memory"),
+    ("how much ram do i have", "memory"),
+    ("list files", "list-files"),
+    ("show the contents of the current folder", "list-files"),
+    ("list all files in this directory", "list-files"),
+    ("where am i", "current-directory"),
+    ("show current directory", "current-directory"),
+    ("git status", "git-status"),
+    ("show uncommitted changes", "git-status"),
+    ("what files have changed", "git-status"),
+    ("show recent commits", "git-log"),
+    ("show commit history", "git-log"),
+    ("what branch am i on", "git-current-branch"),
+    ("list branches", "git-branches"),
+    ("show cpu usage", "cpu-usage"),
+    ("what cpu do i have", "cpu-info"),
+    ("show gpu info", "gpu-info"),
+    ("what os am i running", "os-info"),
+    ("show system specs", "system-overview"),
+    ("show running processes", "processes"),
+    ("list all docker containers", "docker-containers-all"),
+    ("show running docker containers", "docker-containers"),
+    ("what containers are running", "docker-containers"),
+    ("list docker images", "docker-images"),
+    ("what's my ip", "ip-address"),
+    ("what is my public ip", None),
+    ("show open ports", "listening-ports"),
+    ("how long has the system been up", "uptime"),
+    ("whoami", "whoami"),
+    ("what is my hostname", "hostname"),
+    ("what time is it", "date-time"),
+    ("show environment variables", "environment-variables"),
+    ("node version", "tool-version"),
+    ("what version of python do i have", "tool-version"),
+    ("go version", "go-version"),
+    ("kubectl version", "kubectl-version"),
+    ("find all .py files", "find-by-extension"),
+    ("find python files", None),
+    ("list the largest files", "largest-files"),
+    ("how big is this directory", "directory-size"),
+    ("Make a Next.js project and spin up a PostgreSQL image in Docker", None),
+    ("delete all log files older than a week", None),
+    ("show log", None),
+    ("show history", None),
+    ("install requests in a new virtualenv", None),
+    ("show the last 50 lines of the nginx error log", None),
+]
+SHELLS = [("bash", "linux"), ("zsh", "darwin"), ("powershell", "win32"), ("cmd", "win32")]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    engine = IntentEngine(BUILTIN_INTENTS)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    failed = False
+    for intent in BUILTIN_INTENTS:
+        for shell, templates in intent["commands"].items():
+            for template in templates:
+                verdict = check_command(template.replace("{", "").replace("}", ""), shell)
+                if not verdict:
+                    print(f"FAIL: {intent['id']} [{shell}] blocked by the validator: {verdict.reason}")
+                    failed = True
+
+    for instruction, expected in CORPUS:
+        match = engine.match(instruction, "bash", "linux")
+        got = match.intent if match else None
+        if got != expected:
+            print(f"MISMATCH {instruction!r}: expected {expected}, got {got}")
+            failed = True
+
+    for shell, platform in SHELLS:
+        answered = sum(engine.match(text, shell, platform) is not None for text, _ in CORPUS)
+        print(f"{shell:>10}: {answered}/{len(CORPUS)} corpus instructions answered locally")
+
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        for instruction, _ in CORPUS:
+            engine.match(instruction, "bash", "linux")
+    per_lookup_us = (time.perf_counter() - started) / (args.iterations * len(CORPUS)) * 1e6
+    print(f"index build {build_ms:.2f} ms, {per_lookup_us:.1f} us per lookup (hit or miss)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
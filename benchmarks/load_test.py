@@ -0,0 +1,75 @@
+"""Load test for the TermAI backend against a local fake LLM.
+
+Drives the FastAPI app in-process through httpx's ASGI transport with many
+concurrent clients. The Gemini model is replaced by the fake provider, whose
+calls just sleep, so the numbers show how well the server overlaps upstream
+latency.
+
+Usage:
+    python benchmarks/load_test.py [--clients 200] [--requests 5] [--latency 0.5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+os.environ.setdefault("TERMAI_LLM_PROVIDER", "fake")
+# Every request should reach the (fake) LLM
+os.environ.setdefault("TERMAI_CACHE_BACKEND", "off")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+async def run(args) -> int:
+    import httpx
+    import server
+    from providers import FakeLLM
+    from routing import STRONG, Router
+
+    server.router = Router({STRONG: FakeLLM(latency=args.latency)}, hedging=False)
+
+    latencies = []
+    statuses = {}
+
+    async def client(client_id: int, http):
+        for n in range(args.requests):
+            params = {"instruction": f"show containers {client_id}-{n}", "shell_type": "bash", "system_info": "unix"}
+            started = time.perf_counter()
+            response = await http.get("/api/query", params=params)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://termai", timeout=None) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(i, http) for i in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    total = len(latencies)
+    print(f"clients={args.clients} requests={total} fake_latency={args.latency * 1000:.0f}ms "
+          f"max_concurrency={server.MAX_CONCURRENCY}")
+    print(f"wall {elapsed:.2f}s, throughput {total / elapsed:.1f} req/s")
+    print(f"latency p50 {percentile(latencies, 50) * 1000:.0f}ms, p99 {percentile(latencies, 99) * 1000:.0f}ms, "
+          f"mean {statistics.mean(latencies) * 1000:.0f}ms")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency in seconds")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Check `parse_commands` against a corpus of malformed LLM replies and time it.
+
+Each corpus entry holds a reply and the commands it should yield (`null`
+when the reply must be rejected, which triggers the repair prompt).
+Exits non-zero if any entry is parsed differently.
+
+Usage:
+    python benchmarks/parser.py [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+from parsing import CommandParseError, parse_commands  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(__file__), "parser_corpus.json")
+
+
+def parse_or_none(reply):
+    try:
+        return parse_commands(reply)
+    except CommandParseError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    mismatches = 0
+    for case in corpus:
+        got = parse_or_none(case["reply"])
+        if got != case["expected"]:
+            mismatches += 1
+            print(f"MISMATCH {case['name']}: expected {case['expected']!r}, got {got!r}")
+
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        for case in corpus:
+            parse_or_none(case["reply"])
+    per_parse_us = (time.perf_counter() - started) / (args.iterations * len(corpus)) * 1e6
+
+    print(f"{len(corpus) - mismatches}/{len(corpus)} corpus entries parsed as expected")
+    print(f"mean parse time {per_parse_us:.1f} us")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
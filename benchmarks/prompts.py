@@ -0,0 +1,43 @@
+"""Report prompt size per platform/shell and the cost of building a prompt.
+
+Usage:
+    python benchmarks/prompts.py [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+import prompts  # noqa: E402
+
+COMBOS = [("windows", "powershell"), ("windows", "cmd"), ("unix", "bash"), ("unix", "zsh"), (None, None)]
+INSTRUCTION = "Make a Next.js project and spin up a PostgreSQL image in Docker"
+TOOLS = "git,docker,node,npm,python3"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    prompts.precompile()
+    for system_info, shell_type in COMBOS:
+        full = prompts.build_query_prompt(INSTRUCTION, shell_type, system_info, TOOLS)
+        platform, shell = prompts.normalize_platform(system_info), prompts.normalize_shell(shell_type)
+        compact = prompts.render_prefix(platform, shell, compact=True)
+        print(f"{platform:>7}/{shell:<10} ~{prompts.estimate_tokens(full):>5} tokens "
+              f"({len(full)} chars), compact prefix ~{prompts.estimate_tokens(compact)} tokens")
+
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        prompts.build_query_prompt(INSTRUCTION, "bash", "unix", TOOLS)
+    per_build_us = (time.perf_counter() - started) / args.iterations * 1e6
+    print(f"build_query_prompt {per_build_us:.1f} us per call (prefix rendered once)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Latency of model tiering and hedged requests against fake fast and strong models.
+
+Drives the FastAPI app in-process with a mix of simple and multi-step
+instructions, three times over the same seeded fake models:
+
+1. one strong model for everything, no hedging (the old behaviour);
+2. routing: simple instructions go to the fast model;
+3. routing and hedging: calls slower than the tier's p95 get a backup call.
+
+Both fakes have a small share of straggler calls, so the tail is dominated
+by them, as with a real provider. Each run starts with unmeasured warm-up
+requests, as a long-running server has already seen its tiers' latencies.
+Reports p50/p99 latency and the extra upstream calls hedging cost. Fails
+(exit code 1) unless routing and hedging lower both p50 and p99.
+
+Usage:
+    python benchmarks/routing.py [--clients 50] [--requests 10] [--simple-share 0.7]
+                                 [--strong-latency 0.4] [--fast-latency 0.12]
+                                 [--tail-rate 0.02] [--tail-latency 2.0] [--warmup 100] [--stream]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+os.environ.setdefault("TERMAI_LLM_PROVIDER", "fake")
+# Every request should reach the (fake) LLM
+os.environ.setdefault("TERMAI_CACHE_BACKEND", "off")
+
+SIMPLE = [
+    "show disk usage", "list running docker containers", "show git status", "what is my ip address",
+    "kill process 4242", "show memory usage", "list files sorted by size", "print the current directory",
+]
+COMPLEX = [
+    "create a python venv, activate it and install requests",
+    "make a next.js project and spin up a postgres image in docker",
+    "compress the logs folder then upload it to the backup server",
+    "set up a cron job that rotates the nginx logs every night",
+]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+async def measure(args, routing: bool, hedging: bool) -> dict:
+    import httpx
+    import server
+    from providers import FakeLLM
+    from routing import FAST, STRONG, Router
+
+    def fake(latency):
+        return FakeLLM(latency=latency, jitter=latency / 4, seed=args.seed,
+                       tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+
+    server.router = Router({STRONG: fake(args.strong_latency), FAST: fake(args.fast_latency)},
+                           routing=routing, hedging=hedging)
+    path = "/api/query/stream" if args.stream else "/api/query"
+    rng = random.Random(args.seed)
+    latencies = []
+
+    async def client(client_id: int, requests: int, http, into: list):
+        for n in range(requests):
+            template = rng.choice(SIMPLE if rng.random() < args.simple_share else COMPLEX)
+            params = {"instruction": f"{template} #{client_id}-{n}", "shell_type": "bash", "system_info": "unix"}
+            started = time.perf_counter()
+            response = await http.get(path, params=params)
+            response.raise_for_status()
+            into.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://termai", timeout=None) as http:
+        if args.warmup:
+            warmup_clients = min(args.clients, args.warmup)
+            await asyncio.gather(*(client(-1 - i, args.warmup // warmup_clients, http, [])
+                                   for i in range(warmup_clients)))
+        await asyncio.gather(*(client(i, args.requests, http, latencies) for i in range(args.clients)))
+
+    stats = server.router.stats()
+    tiers = [stats[name] for name in (FAST, STRONG) if name in stats]
+    calls = sum(tier["calls"] for tier in tiers)
+    hedged = sum(tier["hedged"] for tier in tiers)
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "fast_share": stats[FAST]["calls"] / calls if routing else 0.0,
+        "extra_calls": hedged / calls,
+        "hedge_wins": sum(tier["hedge_wins"] for tier in tiers),
+    }
+
+
+async def run(args) -> int:
+    configs = [("single model", False, False), ("routing", True, False), ("routing + hedging", True, True)]
+    results = {}
+    print(f"{args.clients} clients x {args.requests} requests, {args.simple_share:.0%} simple; "
+          f"strong {args.strong_latency * 1000:.0f}ms, fast {args.fast_latency * 1000:.0f}ms, "
+          f"{args.tail_rate:.0%} stragglers at {args.tail_latency * 1000:.0f}ms")
+    for name, routing, hedging in configs:
+        result = results[name] = await measure(args, routing, hedging)
+        print(f"{name:18} p50 {result['p50'] * 1000:6.0f}ms  p99 {result['p99'] * 1000:6.0f}ms  "
+              f"fast model {result['fast_share']:4.0%}  extra upstream calls {result['extra_calls']:4.1%} "
+              f"({result['hedge_wins']} hedges won)")
+
+    baseline, best = results["single model"], results["routing + hedging"]
+    failed = False
+    for stat in ("p50", "p99"):
+        if best[stat] >= baseline[stat]:
+            print(f"FAIL: {stat} with routing and hedging is not below the single-model {stat}")
+            failed = True
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--simple-share", type=float, default=0.7, help="share of simple instructions")
+    parser.add_argument("--strong-latency", type=float, default=0.4, help="strong fake model latency in seconds")
+    parser.add_argument("--fast-latency", type=float, default=0.12, help="fast fake model latency in seconds")
+    parser.add_argument("--tail-rate", type=float, default=0.02, help="share of straggler calls")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="straggler latency in seconds")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests before each run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="use the streaming endpoint")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Measure similarity cache lookup latency and paraphrase hit rate at scale.
+
+Fills one partition with synthetic instructions, then looks up paraphrases
+of stored instructions (should hit), instructions whose action verb differs
+(must miss) and unrelated instructions (should miss).
+
+Usage:
+    python benchmarks/semantic_cache.py [--entries 200000] [--lookups 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+from semantic import SemanticCache  # noqa: E402
+
+TOOLS = ["docker", "git", "npm", "kubectl", "python", "node", "nginx", "postgres", "redis", "terraform",
+         "helm", "cargo", "go", "java", "maven", "gradle", "yarn", "pip", "conda", "systemd"]
+OBJECTS = ["containers", "images", "volumes", "branches", "packages", "pods", "logs", "services", "ports",
+           "processes", "files", "configs", "tags", "remotes", "secrets", "networks", "jobs", "nodes"]
+QUALIFIERS = ["running", "stopped", "old", "large", "recent", "failed", "unused", "local", "remote", "pending"]
+VERBS = ["list", "show"]
+
+
+def instruction(rng: random.Random, n: int) -> tuple:
+    words = (rng.choice(QUALIFIERS), rng.choice(TOOLS), rng.choice(OBJECTS))
+    # A project name keeps entries distinct, as real instructions are
+    return words, f"project{n}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    cache = SemanticCache(max_entries=args.entries)
+    stored = []
+    started = time.perf_counter()
+    for n in range(args.entries):
+        (qualifier, tool, obj), project = instruction(rng, n)
+        text = f"list {qualifier} {tool} {obj} for {project}"
+        cache.add(text, "bash", "unix", [f"{tool} {obj} --{qualifier}"])
+        stored.append((qualifier, tool, obj, project))
+    print(f"indexed {args.entries} entries in {time.perf_counter() - started:.1f}s")
+
+    def timed(queries):
+        hits = 0
+        started = time.perf_counter()
+        for query in queries:
+            hits += cache.get(query, "bash", "unix") is not None
+        return hits, (time.perf_counter() - started) / len(queries) * 1e6
+
+    sample = [stored[rng.randrange(len(stored))] for _ in range(args.lookups)]
+    paraphrases = [f"show the {q} {t} {o} for {p}" for q, t, o, p in sample]
+    other_verb = [f"delete {q} {t} {o} for {p}" for q, t, o, p in sample]
+    unrelated = [f"compress the folder backup{n} into an archive" for n in range(args.lookups)]
+
+    failed = False
+    for label, queries, want_hits in (("paraphrase", paraphrases, True), ("different verb", other_verb, False),
+                                      ("unrelated", unrelated, False)):
+        hits, per_lookup_us = timed(queries)
+        print(f"{label:>14}: {hits / len(queries):6.1%} hits, {per_lookup_us:7.1f} us per lookup")
+        if (hits == 0) if want_hits else (hits > 0):
+            failed = True
+    if failed:
+        print("FAIL: unexpected hit rate")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
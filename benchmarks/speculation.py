@@ -0,0 +1,81 @@
+"""Perceived latency of read-only plans with and without speculative execution.
+
+For each plan, waits --think seconds as a user reading the commands would,
+then measures the time from answering "y" until the last command's result
+is available: once running the commands only after confirmation (the old
+behaviour), once replaying a Speculation started before the wait. Also
+reports how many of the plans the read-only classifier accepts. Fails
+(exit code 1) if speculation does not lower the median perceived latency.
+
+Usage:
+    python benchmarks/speculation.py [--think 0.5] [--rounds 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+PLANS = [
+    ["df -h"],
+    ["ls -la"],
+    ["free -h"],
+    ["uname -a", "whoami"],
+    ["ps aux | sort -rk 3 | head -n 10"],
+    ["du -sh /usr/share 2>/dev/null"],
+    ["find /usr/lib -name '*.so' | wc -l"],
+    ["cat /proc/cpuinfo | grep 'model name' | head -n 1"],
+]
+WRITES = [["rm -rf build"], ["mkdir logs"], ["ls > files.txt"], ["git commit -m wip"], ["tail -f app.log"]]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--think", type=float, default=0.5, help="seconds spent reading the plan before 'y'")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--shell", default="bash")
+    args = parser.parse_args()
+
+    from src.executor import stream_command
+    from src.speculation import Speculation, is_read_only
+
+    accepted = [plan for plan in PLANS if all(is_read_only(cmd, args.shell) for cmd in plan)]
+    rejected = [plan for plan in WRITES if not all(is_read_only(cmd, args.shell) for cmd in plan)]
+    print(f"classifier: {len(accepted)}/{len(PLANS)} read-only plans accepted, "
+          f"{len(rejected)}/{len(WRITES)} writing or unbounded plans rejected")
+
+    after, ahead = [], []
+    for _ in range(args.rounds):
+        for plan in accepted:
+            time.sleep(args.think)
+            started = time.perf_counter()
+            for cmd in plan:
+                stream_command(cmd, args.shell, on_line=lambda stream, line: None)
+            after.append(time.perf_counter() - started)
+
+            speculation = Speculation(plan, args.shell)
+            time.sleep(args.think)
+            started = time.perf_counter()
+            for _result in speculation.take(lambda stream, line: None):
+                pass
+            ahead.append(time.perf_counter() - started)
+
+    print(f"{len(after)} runs, {args.think * 1000:.0f}ms think time")
+    for name, values in (("run after confirmation", after), ("speculative", ahead)):
+        print(f"{name:24} median {statistics.median(values) * 1000:7.2f}ms  max {max(values) * 1000:7.2f}ms")
+
+    failed = False
+    if len(rejected) != len(WRITES):
+        print("FAIL: the classifier accepted a plan that writes or never finishes")
+        failed = True
+    if statistics.median(ahead) >= statistics.median(after):
+        print("FAIL: speculation did not lower the perceived latency")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
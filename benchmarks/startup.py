@@ -0,0 +1,85 @@
+"""Cold-start benchmark for the `termai` entry point.
+
+Runs `python -X importtime -c "import src.cli"` a few times in fresh
+interpreters and fails (exit code 1) if the import time of the CLI module
+exceeds the budget, or if one of the heavy modules that must stay off the
+startup path gets imported eagerly.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--budget-ms 250]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Modules that only specific subcommands need; importing them at load time
+# is a regression.
+DEFERRED_MODULES = [
+    "requests",
+    "rich.console",
+    "langchain_google_genai",
+    "google.generativeai",
+    "pydantic",
+]
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_once(module: str):
+    """Import `module` in a fresh interpreter and return (total_us, imported)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+    imported = set()
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        imported.add(name)
+        if name == module:
+            total_us = int(match.group(2))
+    return total_us, imported
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("TERMAI_STARTUP_BUDGET_MS", "250")))
+    parser.add_argument("--module", default="src.cli")
+    args = parser.parse_args()
+
+    timings = []
+    imported = set()
+    for _ in range(args.runs):
+        total_us, imported = measure_once(args.module)
+        timings.append(total_us / 1000)
+
+    best = min(timings)
+    print(f"{args.module}: best {best:.1f} ms, worst {max(timings):.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    eager = [m for m in DEFERRED_MODULES if m in imported]
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if best > args.budget_ms:
+        print(f"FAIL: cold start {best:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
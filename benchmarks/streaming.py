@@ -0,0 +1,107 @@
+"""Compare time-to-first-command for /api/query and /api/query/stream.
+
+The Gemini model is replaced by a fake that writes a long multi-step plan a
+few characters at a time, like a real token stream. The non-streaming
+endpoint can only answer once the whole reply is in; the streaming one
+sends each command as soon as its JSON string is complete.
+
+Usage:
+    python benchmarks/streaming.py [--steps 8] [--chunk-delay 0.02]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+os.environ.setdefault("TERMAI_LLM_PROVIDER", "fake")
+os.environ.setdefault("TERMAI_CACHE_BACKEND", "off")
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeStreamingLLM:
+    """Stand-in for ChatGoogleGenerativeAI that emits its reply in small chunks."""
+
+    def __init__(self, steps: int, chunk_size: int, chunk_delay: float):
+        commands = [f"echo 'step {n}: doing some fairly long piece of work here'" for n in range(1, steps + 1)]
+        self.reply = json.dumps({"commands": commands})
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+
+    async def astream(self, prompt):
+        for i in range(0, len(self.reply), self.chunk_size):
+            await asyncio.sleep(self.chunk_delay)
+            yield FakeMessage(self.reply[i:i + self.chunk_size])
+
+    async def ainvoke(self, prompt):
+        parts = [chunk.content async for chunk in self.astream(prompt)]
+        return FakeMessage("".join(parts))
+
+
+async def run(args) -> int:
+    import httpx
+    import uvicorn
+    import server
+    from routing import STRONG, Router
+
+    llm = FakeStreamingLLM(args.steps, args.chunk_size, args.chunk_delay)
+    server.router = Router({STRONG: llm}, hedging=False)
+    params = {"instruction": "set up the project", "shell_type": "bash", "system_info": "unix"}
+
+    # A real server: httpx's ASGI transport buffers the whole response body
+    uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(uv.serve())
+    while not uv.started:
+        await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=None) as http:
+        started = time.perf_counter()
+        response = await http.get("/api/query", params=params)
+        full = time.perf_counter() - started
+        expected = response.json()["result"]
+
+        first = None
+        received = []
+        started = time.perf_counter()
+        async with http.stream("GET", "/api/query/stream", params=params) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "command":
+                    if first is None:
+                        first = time.perf_counter() - started
+                    received.append(event["command"])
+        streamed = time.perf_counter() - started
+
+    uv.should_exit = True
+    await serving
+
+    print(f"{args.steps}-step plan, {len(llm.reply)} chars in {args.chunk_size}-char chunks")
+    print(f"/api/query        first command after {full * 1000:.0f} ms")
+    print(f"/api/query/stream first command after {first * 1000:.0f} ms, last after {streamed * 1000:.0f} ms")
+    if received != expected:
+        print(f"FAIL: streamed commands differ: {received!r} != {expected!r}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--chunk-size", type=int, default=4, help="characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between chunks")
+    parser.add_argument("--port", type=int, default=8799)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
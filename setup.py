@@ -7,11 +7,7 @@ setup(
     install_requires=[
         "typer[all]",
         "rich",
-        "pydantic",
-        "google-generativeai",
-        "python-dotenv",
-        "langchain",
-        "langchain-google-genai",
+        "requests",
     ],
     entry_points={
         "console_scripts": [
@@ -0,0 +1,280 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+from src import profiling
+
+BACKEND_URL = os.getenv("TERMAI_BACKEND_URL", "https://termai-cli.vercel.app")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class BackendError(Exception):
+    """Raised when the backend can't be reached after all retries, or a stream can't be opened."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamInterrupted(BackendError):
+    """Raised when a stream breaks off after it was opened, so what arrived may be incomplete."""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class BackendClient:
+    """Pooled, keep-alive HTTP client for the TermAI backend with timeouts and retries.
+
+    Uses httpx with HTTP/2 when `httpx` and `h2` are installed (and
+    TERMAI_HTTP2 isn't 0), otherwise a requests Session.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None, retries: Optional[int] = None):
+        self.base_url = (base_url or BACKEND_URL).rstrip("/")
+        self.connect_timeout = connect_timeout or _env_float("TERMAI_CONNECT_TIMEOUT", 5)
+        self.read_timeout = read_timeout or _env_float("TERMAI_READ_TIMEOUT", 60)
+        self.retries = retries if retries is not None else int(os.getenv("TERMAI_RETRIES", 2))
+        self.backoff = _env_float("TERMAI_RETRY_BACKOFF", 0.3)
+        # Bounded: a resident `termai daemon` keeps one client for hours
+        self.timings = deque(maxlen=1000)
+        self._requests_made = 0
+        self._lock = threading.Lock()
+        self._prewarm_thread = None
+        self.http2 = False
+        self._session = self._make_session()
+
+    def _make_session(self):
+        with profiling.span("create http session", "import") as current:
+            session = self._new_session()
+            current.set(http2=self.http2)
+        return session
+
+    def _new_session(self):
+        if os.getenv("TERMAI_HTTP2", "1") != "0":
+            try:
+                import h2  # noqa: F401
+                import httpx
+            except ImportError:
+                pass
+            else:
+                self.http2 = True
+                return httpx.Client(
+                    http2=True,
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(max_keepalive_connections=4),
+                )
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _send(self, method: str, path: str, stream: bool = False, **kwargs):
+        url = f"{self.base_url}{path}"
+        if self.http2:
+            return self._session.send(self._session.build_request(method, url, **kwargs), stream=stream)
+        return self._session.request(method, url, timeout=(self.connect_timeout, self.read_timeout),
+                                     stream=stream, **kwargs)
+
+    def _is_transient(self, error: Exception) -> bool:
+        if self.http2:
+            import httpx
+            return isinstance(error, (httpx.TransportError,))
+        import requests
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def _is_interrupted(self, error: Exception) -> bool:
+        """Whether reading a response body failed because the connection broke."""
+        if self.http2:
+            import httpx
+            return isinstance(error, httpx.HTTPError)
+        import requests
+        return isinstance(error, (requests.RequestException, OSError))
+
+    def request(self, method: str, path: str, stream: bool = False, **kwargs):
+        """Send a request, retrying 5xx/429 responses and timeouts with jittered exponential backoff."""
+        with profiling.span(f"{method} {path}", "http") as current:
+            response, attempts = self._request(method, path, stream=stream, **kwargs)
+            current.set(status=response.status_code, attempts=attempts)
+            return response
+
+    def _request(self, method: str, path: str, stream: bool = False, **kwargs) -> tuple:
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            attempt += 1
+            try:
+                response = self._send(method, path, stream=stream, **kwargs)
+            except Exception as e:
+                if not self._is_transient(e) or attempt > self.retries:
+                    self._record(path, started, attempt, None)
+                    raise BackendError(
+                        f"Could not reach {self.base_url} after {attempt} attempt(s): {type(e).__name__}"
+                    ) from e
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt > self.retries:
+                    self._record(path, started, attempt, response)
+                    return response, attempt
+                response.close()
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    time.sleep(min(float(retry_after), 10))
+                    continue
+            # Full jitter: sleep anywhere up to the exponential bound
+            time.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+
+    def get(self, path: str, params: Optional[dict] = None):
+        return self.request("GET", path, params=params)
+
+    def post(self, path: str, json: Optional[dict] = None):
+        return self.request("POST", path, json=json)
+
+    def stream_lines(self, path: str, params: Optional[dict] = None, method: str = "GET",
+                     json: Optional[dict] = None) -> Iterator[str]:
+        """Call a streaming endpoint and yield its non-empty lines as they arrive.
+
+        Only opening the stream is retried; raises BackendError (with `status`
+        set) when the backend answers with anything but 200, and
+        StreamInterrupted when the connection breaks mid-stream.
+        """
+        response = self.request(method, path, stream=True, params=params, json=json)
+        try:
+            if response.status_code != 200:
+                if self.http2:
+                    response.read()
+                raise BackendError(response.text, status=response.status_code)
+            if self.http2:
+                lines = response.iter_lines()
+            else:
+                response.encoding = response.encoding or "utf-8"
+                lines = response.iter_lines(decode_unicode=True)
+            try:
+                for line in lines:
+                    if line:
+                        yield line
+            except Exception as e:
+                if not self._is_interrupted(e):
+                    raise
+                raise StreamInterrupted(f"Stream from {path} was interrupted: {type(e).__name__}") from e
+        finally:
+            response.close()
+
+    def _record(self, path: str, started: float, attempts: int, response) -> None:
+        try:
+            elapsed = getattr(response, "elapsed", None)
+        except RuntimeError:
+            # httpx only knows the elapsed time once a streamed body is closed
+            elapsed = None
+        with self._lock:
+            self._requests_made += 1
+            self.timings.append({
+                "path": path,
+                "total": time.perf_counter() - started,
+                # Time until the response headers arrived, as measured by the HTTP library
+                "ttfb": elapsed.total_seconds() if elapsed is not None else None,
+                "attempts": attempts,
+                "status": getattr(response, "status_code", None),
+            })
+
+    @property
+    def requests_made(self) -> int:
+        return self._requests_made
+
+    def prewarm(self) -> None:
+        """Open a pooled connection in the background (DNS, TCP and TLS) before it's needed."""
+        if self._prewarm_thread is not None:
+            return
+
+        def warm():
+            try:
+                self._send("HEAD", "/")
+            except Exception:
+                pass
+
+        self._prewarm_thread = threading.Thread(target=warm, daemon=True)
+        self._prewarm_thread.start()
+
+    def close(self) -> None:
+        self._session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> BackendClient:
+    """Return the process-wide backend client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BackendClient()
+    return _client
+
+
+def prewarm_client() -> None:
+    """Open a backend connection in the background, unless the client has already made a request.
+
+    The client itself is created on that background thread too, so callers
+    that may never need the network (cached or local commands) don't pay
+    for importing and setting up the HTTP library.
+    """
+    client = _client
+    if client is not None:
+        if client.requests_made == 0:
+            client.prewarm()
+        return
+    threading.Thread(target=lambda: get_client().prewarm(), daemon=True).start()
+
+
+def measure_phases(url: Optional[str] = None, timeout: float = 10) -> dict:
+    """Time DNS, TCP connect, TLS handshake and time-to-first-byte for one fresh request."""
+    import socket
+    import ssl
+
+    parsed = urlparse(url or BACKEND_URL)
+    host = parsed.hostname
+    tls = parsed.scheme == "https"
+    port = parsed.port or (443 if tls else 80)
+    phases = {}
+
+    started = time.perf_counter()
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    phases["dns"] = time.perf_counter() - started
+
+    mark = time.perf_counter()
+    family, socktype, proto, _, address = infos[0]
+    sock = socket.socket(family, socktype, proto)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+        phases["connect"] = time.perf_counter() - mark
+
+        if tls:
+            mark = time.perf_counter()
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            phases["tls"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        sock.sendall(f"GET / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("ascii"))
+        sock.recv(1)
+        phases["ttfb"] = time.perf_counter() - mark
+    finally:
+        sock.close()
+
+    phases["total"] = time.perf_counter() - started
+    return phases
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import time
+import json
+import hashlib
+from typing import List, Optional
+
+from src.utils import termai_home
+
+
+def normalize_instruction(instruction: str) -> str:
+    """Fold case and collapse whitespace so trivially different instructions share an entry."""
+    return " ".join(instruction.casefold().split())
+
+
+class CommandCache:
+    """On-disk cache of generated commands, keyed by instruction, shell and platform."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or os.path.join(termai_home(), "cache.sqlite3")
+        self.max_entries = max_entries or int(os.getenv("TERMAI_CACHE_MAX_ENTRIES", 500))
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS commands ("
+            " key TEXT PRIMARY KEY,"
+            " instruction TEXT NOT NULL,"
+            " shell TEXT NOT NULL,"
+            " platform TEXT NOT NULL,"
+            " commands TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @staticmethod
+    def make_key(instruction: str, shell: str, system_info: str) -> str:
+        raw = "\x1f".join([normalize_instruction(instruction), shell, system_info])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _bump(self, name: str) -> None:
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, instruction: str, shell: str, system_info: str) -> Optional[List[str]]:
+        key = self.make_key(instruction, shell, system_info)
+        row = self._conn.execute("SELECT commands FROM commands WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._bump("misses")
+            return None
+        self._conn.execute("UPDATE commands SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        self._bump("hits")
+        return json.loads(row[0])
+
+    def put(self, instruction: str, shell: str, system_info: str, commands: List[str]) -> None:
+        key = self.make_key(instruction, shell, system_info)
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO commands (key, instruction, shell, platform, commands, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET commands = excluded.commands, last_used = excluded.last_used",
+            (key, instruction, shell, system_info, json.dumps(commands), now, now),
+        )
+        # Evict least recently used entries beyond the size bound
+        self._conn.execute(
+            "DELETE FROM commands WHERE key IN ("
+            " SELECT key FROM commands ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        entries = self._conn.execute("SELECT COUNT(*) FROM commands").fetchone()[0]
+        counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+    def clear(self) -> int:
+        removed = self._conn.execute("DELETE FROM commands").rowcount
+        self._conn.execute("DELETE FROM counters")
+        self._conn.execute("VACUUM")
+        return removed
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,170 +1,67 @@
-from pydantic import BaseModel, Field
-import typer
-import subprocess
-import shlex
+import time
+from src import profiling  # first, so its clock starts with the CLI import
+import json
 import os
 import platform
-from typing import Optional, List
-from langchain_google_genai import ChatGoogleGenerativeAI
-from rich.console import Console
-from rich.panel import Panel
-from rich.text import Text
-from rich.style import Style
-console = Console()
+import sys
+from typing import Callable, Iterator, Optional, List
+import typer
+from typer.core import TyperGroup
 from src.utils import detect_shell, validate_command
-from dotenv import load_dotenv
-from rich.table import Table
-app = typer.Typer()
-import google.generativeai as genai
-import requests
-
-dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
-load_dotenv(dotenv_path) 
-
-backend_url = "https://termai-cli.vercel.app"
-
-# genai.configure(api_key=api_key)
-# llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", google_api_key = api_key)
-
-class QueryChecker(BaseModel):
-    commands: List[str] = Field(
-        description="The list of shell commands generated by the LLM"
-    )
-class FinalOutput (BaseModel):
-    commands: str= Field(
-        description="The final output generated by the LLM"
-    )
-
-def get_shell_command(instruction: str) -> str:
-    """Use Gemini to generate a shell command from natural language instruction."""
-    system_info = "windows" if platform.system().lower() == "windows" else "unix"
-    shell_type = detect_shell()
-    typer.echo(f"\nDetected shell: {shell_type}\n")
-
-    # prompt = f"""
-    # You are an AI assistant that converts natural language instructions into **safe and precise shell commands** for {system_info} systems.  
-    # The user is currently using {shell_type} shell.  
-
-    # ### **Guidelines:**  
-
-    # 1. **Safety First:**  
-    # - Only generate **non-destructive** commands.  
-    # - Avoid commands that delete files, modify system settings, or execute unknown scripts.  
-
-    # 2. **System-Specific Commands:**  
-    # - On **Windows**, prefer `dir` over `ls`, and `cd` for navigation.  
-    # - On **Unix/Linux**, prefer `ls` over `dir`.  
-
-    # 3. **Structured Output:**  
-    # - If a single command is enough, return a **single command**.  
-    # - DO NOT RETURN EMPTY ARRAY, NEVER.  
-    # - If multiple steps are required, return a **list of commands** in the correct execution order.  
-
-    # 4. **No Dangerous Commands:**  
-    # - **Forbidden commands:** `rm -rf`, `del /s`, `mv *`, `sudo`, `curl | sh`, `format`, `shutdown`, etc.  
-
-    # 5. **Minimal Output:**  
-    # - **Return only the shell command(s)** without explanations or additional text.  
-    # - Use only commands valid for {shell_type} shell.  
-
-    # 6. **Mandatory Use of Non-Interactive Flags (`--yes`, `--force`, `-y`, etc.)**  
-    # - Always use `--yes`, `--force`, `-y`, or equivalent to prevent user interaction.  
-    # - Ensure every command that may require confirmation (like `npm create next-app`, `npx shadcn-ui init`) includes `--yes`, `--force`, `-y`, or equivalent.  
-    # - **For `npx create-next-app`, always include `--use-npm` (or `--use-yarn` / `--use-pnpm` based on context) along with `--yes` to prevent package manager selection prompts.**  
-
-    # 7. **PowerShell Here-String Handling (If Applicable)**  
-    # - If generating a PowerShell script that writes multiline text (e.g., `main.go` file creation), ensure:  
-    #     - Use `@'` and `'@` syntax correctly (each on its own line).  
-    #     - Do **not** place extra characters before or after the here-string declaration.  
-    #     - Ensure correct file encoding (`utf8`).  
-    #     - Apply this approach to any `npx` commands that prompt for package installation.  
-
-    # 8. **Strict Rule: Always Use Version Commands to Detect Software Instead of Path Lookups:**  
-    # - **Use `flutter --version` instead of `where flutter` or `which flutter`.**  
-    # - **Use `kubectl version --client` instead of `Get-Service kubernetes`.**  
-    # - **Use `docker ps` instead of `Get-Service docker`.**  
-    # - **Use `node -v`, `python --version`, or `go version` instead of checking the system PATH with `where` or `which`.**  
-    # - **Only fall back to `where` (Windows) or `which` (Linux/macOS) if there is no version command available.**  
-
-    # 9. **For system hardware queries, always provide comprehensive information:**
-    # - **On Windows**, use these commands like these :
-    #     - For System & CPU: `Get-CimInstance Win32_ComputerSystem | Select-Object Manufacturer,Model,SystemType,TotalPhysicalMemory`
-    #     - For CPU Details: `Get-CimInstance Win32_Processor | Select-Object Name,NumberOfCores,NumberOfLogicalProcessors,MaxClockSpeed`
-    #     - For Memory: `Get-CimInstance Win32_PhysicalMemory | Select-Object Capacity,Speed,Manufacturer`
-    #     - For GPU: `Get-CimInstance Win32_VideoController | Select-Object Name,VideoMemoryType,AdapterRAM,DriverVersion`
-    #     - For Storage: `Get-CimInstance Win32_LogicalDisk | Select-Object DeviceID,Size,FreeSpace`
-    #     - For OS Details: `Get-CimInstance Win32_OperatingSystem | Select-Object Caption,Version,OSArchitecture`
-    
-    # - **On Linux/macOS**, usecommands like these:
-    #     - For CPU: `lscpu`
-    #     - For Memory: `free -h`
-    #     - For GPU: `lspci | grep -i vga`
-    #     - For Storage: `df -h`
-    #     - For OS: `uname -a`
-    #     - For System Overview: `hostnamectl`
-
-    # **Always follow these principles for system queries:**
-    #     - Use the most reliable and detailed commands available
-    #     - Format output for readability using Format-Table or Format-List in PowerShell
-    #     - Group related information together
-    #     - Provide multiple pieces of relevant information when querying hardware
-    #     - Include units where applicable (GB, MHz, etc.)
-    #     - Use vendor-specific tools when available (wmic, systeminfo, Get-CimInstance)
-    
-    # - **For Windows systems:**
-    #     - Prefer Get-CimInstance over legacy commands
-    #     - Structure: Get-CimInstance [Component] | Select-Object [Details] | Format-Table
-    #     - Common components: Win32_ComputerSystem, Win32_Processor, Win32_PhysicalMemory, 
-    #       Win32_VideoController, Win32_LogicalDisk, Win32_OperatingSystem
-    
-    # - **For Unix/Linux systems:**
-    #     - Combine standard tools: lscpu, dmidecode, free, lspci, df
-    #     - Use distribution-specific tools when available
-    #     - Prefer human-readable flags (-h) when available
-
-    # 10. **For dynamic system monitoring:**
-    # - **On Windows:**
-    #     - CPU Usage: `Get-Counter '\Processor(_Total)\% Processor Time'`
-    #     - Memory Usage: `Get-Counter '\Memory\Available MBytes'`
-    #     - Disk I/O: `Get-Counter '\PhysicalDisk(_Total)\Disk Reads/sec','\PhysicalDisk(_Total)\Disk Writes/sec'`
-    
-    # - **On Linux/macOS:**
-    #     - Real-time stats: `top` or `htop`
-    #     - Disk I/O: `iostat`
-    #     - Network: `netstat -i`
-
-    # ### **Instruction:**  
-    # Convert the following instruction into a {shell_type} command or a list of {shell_type} commands:  
-
-    # **Instruction:** "{instruction}"  
-
-    # ### **Expected Output:**  
-    # A **single valid shell command** or an **array of shell commands** for a {system_info} system.  
-    # DO NOT RETURN EMPTY ARRAY, NEVER.  
-    # """
-    # try:
-    #     response = llm.with_structured_output(QueryChecker).invoke(prompt)
-    #     cmds = response.commands
-         
-    # except Exception as e:
-    #     console.print(f"[red]⚠️ Structured output parsing failed : trying manual parsing[/]")
-    #     response = llm.invoke(prompt)  # Fall back to normal response
-    #     commands = response.content.strip().split("\n")  # Try parsing manually
-    #     cmds = [cmd.strip() for cmd in commands if cmd.strip() and "```" not in cmd]
-
-    url = f"{backend_url}/api/query"
 
-    # Parameters
-    params = {
+
+class DefaultRunGroup(TyperGroup):
+    """Treats `termai "instruction" -e` as `termai run "instruction" -e`, as it worked before subcommands."""
+
+    def parse_args(self, ctx, args):
+        group_options = {opt for param in self.get_params(ctx) for opt in param.opts + param.secondary_opts}
+        if args and args[0] not in self.commands and args[0] not in group_options:
+            args = ["run", *args]
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(cls=DefaultRunGroup)
+_IMPORTED = time.perf_counter()
+
+# Heavy modules (rich, requests, subprocess) are imported inside the functions
+# that need them so `termai --help` and friends start fast.
+
+ERROR_TAIL_CHARS = 4000
+BATCH_SIZE = 50
+# How long exiting waits for a --revalidate refresh still in flight
+REVALIDATE_WAIT = float(os.getenv("TERMAI_REVALIDATE_WAIT", "2"))
+
+_console = None
+
+
+def get_console():
+    """Return the shared rich console, creating it on first use."""
+    global _console
+    if _console is None:
+        with profiling.span("import rich", "import"):
+            from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def query_params(instruction: str, shell_type: str, system_info: str) -> dict:
+    from src.utils import detect_environment
+
+    return {
         "instruction": instruction,
         "shell_type": shell_type,
-        "system_info": system_info
+        "system_info": system_info,
+        "tools": ",".join(detect_environment()["tools"]),
     }
 
-    response = requests.get(url, params=params)
 
+def fetch_commands(instruction: str, shell_type: str, system_info: str) -> Optional[List[str]]:
+    """Ask the backend to generate commands for the instruction."""
+    from src.backend import get_client
 
     # Send the request
+    response = get_client().get("/api/query", params=query_params(instruction, shell_type, system_info))
+
     if response.status_code != 200:
         print(f"Error: {response.status_code}")
         print(response.text)
@@ -173,156 +70,896 @@ def get_shell_command(instruction: str) -> str:
     data = response.json()
     
     if 'result' in data and isinstance(data['result'], list):
-        cmds =  data['result']
+        return data['result']
+    return []
+
+
+def stream_commands(instruction: str, shell_type: str, system_info: str,
+                    on_command: Callable[[List[str]], None]) -> Optional[List[str]]:
+    """Stream commands from the backend, calling on_command with the list so far as each one arrives.
+
+    A stream that breaks off before its `done` event is never used as a
+    (partial) plan: the commands are fetched again from the non-streaming
+    endpoint.
+    """
+    from src.backend import BackendError, StreamInterrupted, get_client
+
+    cmds = []
+    try:
+        with profiling.span("stream commands", "http") as current:
+            started = time.perf_counter()
+            for line in get_client().stream_lines("/api/query/stream", params=query_params(instruction, shell_type, system_info)):
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    raise StreamInterrupted(f"Malformed stream event: {line[:80]}")
+                if event.get("type") == "command":
+                    if not cmds:
+                        # Mostly model latency: the backend forwards each command as soon as it is complete
+                        current.set(first_command_ms=round((time.perf_counter() - started) * 1000, 1))
+                    cmds.append(event["command"])
+                    on_command(cmds)
+                elif event.get("type") == "done":
+                    current.set(commands=len(event["result"]), cached=event.get("cached", False))
+                    return event["result"]
+                elif event.get("type") == "error":
+                    print(f"Error: {event['status']}")
+                    print(event["detail"])
+                    return None
+            raise StreamInterrupted("Stream ended before the done event")
+    except BackendError as e:
+        if e.status == 404:
+            # Backend without streaming endpoints
+            return fetch_commands(instruction, shell_type, system_info)
+        if isinstance(e, StreamInterrupted):
+            # Whatever arrived may be only part of the plan
+            return fetch_commands(instruction, shell_type, system_info)
+        if e.status is None:
+            raise
+        print(f"Error: {e.status}")
+        print(e)
+        return None
+
+
+def fetch_batch(instructions: List[str], shell_type: str, system_info: str) -> Iterator[dict]:
+    """Yield {index, instruction, result | error} items from the batch endpoint as they complete."""
+    from src.backend import BackendError, get_client
+    from src.utils import detect_environment
+
+    client = get_client()
+    tools = ",".join(detect_environment()["tools"])
+    for start in range(0, len(instructions), BATCH_SIZE):
+        chunk = instructions[start:start + BATCH_SIZE]
+        payload = {"instructions": chunk, "shell_type": shell_type, "system_info": system_info, "tools": tools}
+        try:
+            for line in client.stream_lines("/api/query/batch", method="POST", json=payload):
+                item = json.loads(line)
+                item["index"] += start
+                yield item
+        except BackendError as e:
+            if e.status != 404:
+                raise
+            # Backend without the batch endpoint: one request per instruction
+            for offset, instruction in enumerate(chunk):
+                response = client.get("/api/query", params=query_params(instruction, shell_type, system_info))
+                item = {"index": start + offset, "instruction": instruction}
+                if response.status_code == 200:
+                    item["result"] = response.json().get("result", [])
+                else:
+                    item["error"] = {"status": response.status_code, "detail": response.text}
+                yield item
+
+
+def commands_panel(cmds: List[str], title: str):
+    from rich.panel import Panel
+    from rich.text import Text
+    from rich.style import Style
+
+    if cmds:
+        formatted_text = Text.from_markup("\n".join([f"[bright_yellow]{idx}. {cmd}[/]" for idx, cmd in enumerate(cmds, start=1)]))
     else:
-        cmds = []
-   
-    formatted_text = "\n".join([f"[bright_yellow]{idx}. {cmd}[/]" for idx, cmd in enumerate(cmds, start=1)])
+        formatted_text = Text("Generating...", style="dim")
 
     # Simulate a blur effect by using a dim/transparent-like background
     blur_style = Style(color="cyan", italic=True)  # Simulated blur effect
 
-    console.print(Panel(Text.from_markup(formatted_text), title="Generated Commands", expand=False, style=blur_style))
+    return Panel(formatted_text, title=title, expand=False, style=blur_style)
+
+
+def revalidate_commands(instruction: str, shell_type: str, system_info: str) -> None:
+    """Refresh a cached entry from the backend; failures are ignored."""
+    from src.cache import CommandCache
+
+    try:
+        cmds = fetch_commands(instruction, shell_type, system_info)
+    except Exception:
+        return
+    if cmds:
+        cache = CommandCache()
+        cache.put(instruction, shell_type, system_info, cmds)
+        cache.close()
+
+
+SOURCE_TITLES = {
+    "local": "Generated Commands (local)",
+    "cached": "Generated Commands (cached)",
+    "backend": "Generated Commands",
+}
+
+
+def daemon_commands(instruction: str, shell_type: str, system_info: str, use_cache: bool,
+                    use_local: bool) -> Optional[tuple]:
+    """Ask a running `termai daemon` for the commands.
+
+    Returns (commands, source), (None, None) when the daemon reported an
+    error, or None when no daemon is listening.
+    """
+    from src import daemon
+
+    try:
+        connection = daemon.connect()
+    except daemon.DaemonUnavailable:
+        return None
+    from rich.live import Live
+
+    request = {"op": "query", "instruction": instruction, "shell_type": shell_type, "system_info": system_info,
+               "use_cache": use_cache, "use_local": use_local}
+    cmds = []
+    with profiling.span("daemon query", "http") as current, \
+            Live(commands_panel([], SOURCE_TITLES["backend"]), console=get_console(), transient=True) as live:
+        for event in daemon.send(connection, request):
+            if event.get("type") == "command":
+                cmds.append(event["command"])
+                live.update(commands_panel(cmds, SOURCE_TITLES["backend"]))
+            elif event.get("type") == "done":
+                current.set(source=event["source"])
+                return event["result"], event["source"]
+            elif event.get("type") == "error":
+                live.stop()
+                print(f"Error: {event['status']}")
+                print(event["detail"])
+                return None, None
+    return cmds, "backend"
+
+
+def get_shell_command(instruction: str, use_cache: bool = True, revalidate: bool = False,
+                      use_local: bool = True, use_daemon: bool = True, show_shell: bool = True) -> str:
+    """Use Gemini to generate a shell command from natural language instruction."""
+    system_info = "windows" if platform.system().lower() == "windows" else "unix"
+    shell_type = detect_shell()
+    if show_shell:
+        typer.echo(f"\nDetected shell: {shell_type}\n")
+
+    if use_daemon and not revalidate:
+        from src import daemon
+        answer = daemon_commands(instruction, shell_type, system_info, use_cache, use_local) if daemon.enabled() else None
+        if answer is not None:
+            cmds, source = answer
+            if cmds is None:
+                return None
+            with profiling.span("render commands", "render"):
+                get_console().print(commands_panel(cmds, SOURCE_TITLES[source]))
+            return cmds
+
+    if use_local:
+        with profiling.span("local intent match") as current:
+            from src.intents import match_intent
+            local = match_intent(instruction, shell_type)
+            current.set(matched=local is not None)
+        if local is not None:
+            get_console().print(commands_panel(local.commands, "Generated Commands (local)"))
+            return local.commands
+
+    cache = None
+    cmds = None
+    if use_cache:
+        with profiling.span("cache lookup") as current:
+            from src.cache import CommandCache
+            cache = CommandCache()
+            cmds = cache.get(instruction, shell_type, system_info)
+            current.set(hit=cmds is not None)
+
+    title = "Generated Commands"
+    if cmds is not None:
+        title = "Generated Commands (cached)"
+        if revalidate:
+            # Daemon thread, so a hung backend can't keep termai alive; exiting
+            # gives it REVALIDATE_WAIT seconds to finish
+            import atexit
+            import threading
+            refresh = threading.Thread(
+                target=revalidate_commands,
+                args=(instruction, shell_type, system_info),
+                daemon=True,
+            )
+            refresh.start()
+            atexit.register(refresh.join, REVALIDATE_WAIT)
+    else:
+        with profiling.span("import rich.live", "import"):
+            from rich.live import Live
+
+        # Commands are shown as each one arrives; the transient live panel is
+        # replaced by the final one below
+        with Live(commands_panel([], title), console=get_console(), transient=True) as live:
+            cmds = stream_commands(instruction, shell_type, system_info,
+                                   on_command=lambda cmds: live.update(commands_panel(cmds, title)))
+        if cmds is None:
+            return None
+        if cmds and cache is not None:
+            cache.put(instruction, shell_type, system_info, cmds)
+    if cache is not None:
+        cache.close()
+
+    with profiling.span("render commands", "render"):
+        get_console().print(commands_panel(cmds, title))
     return cmds
 
 
-def execute_command(commands: List[str], query: str) -> None:
-    """Execute command(s) and display output in tables."""
+def explain_error(error_msg: str) -> None:
+    """Show the error output and the backend's explanation of it.
+
+    The explanation is a courtesy: when the backend can't be reached a
+    one-line notice is shown instead of aborting the run or the shell.
+    """
+    from src.backend import BackendError
+
+    with profiling.span("explain error", "http") as current:
+        try:
+            _explain_error(error_msg)
+        except BackendError as e:
+            current.set(error=str(e))
+            get_console().print(f"Explanation unavailable: {e}", style="dim", markup=False, highlight=False, soft_wrap=True)
+
+
+def _explain_error(error_msg: str) -> None:
+    from rich.live import Live
+    from rich.table import Table
+    from src.backend import BackendError, get_client
+
+    console = get_console()
+    if error_msg:
+        error_table = Table(title="Error Output", style="red")
+        error_table.add_column("Error Message", style="red")
+        error_table.add_row(error_msg)
+        console.print(error_table)
+
+    # Parameters
+    params = {
+        # Only the tail of stderr is diagnostically useful and it keeps the URL short
+        "error_msg": error_msg[-ERROR_TAIL_CHARS:],
+    }
+
+    def explanation_table(text: str):
+        table = Table(title="Error Explanation")
+        table.add_column("AI Assistant Explanation", style="yellow")
+        table.add_row(text)
+        return table
+
+    # Stream the explanation as it is written, falling back to /api/error
+    # on backends without the streaming endpoint
+    explanation = ""
+    try:
+        with Live(explanation_table(""), console=console, transient=True) as live:
+            for line in get_client().stream_lines("/api/error/stream", params=params):
+                event = json.loads(line)
+                if event.get("type") == "token":
+                    explanation += event["text"]
+                    live.update(explanation_table(explanation))
+                elif event.get("type") == "done":
+                    explanation = event["result"]
+                elif event.get("type") == "error":
+                    print(f"Error: {event['status']}")
+                    print(event["detail"])
+                    return None
+    except BackendError as e:
+        if e.status != 404:
+            raise
+        response = get_client().get("/api/error", params=params)
+        if response.status_code != 200:
+            print(f"Error: {response.status_code}")
+            print(response.text)
+            return None
+        explanation = str(response.json()['result'])
+
+    # Display error explanation
+    console.print(explanation_table(explanation))
+
+
+def execute_parallel(commands: List[str], jobs: int, entry=None) -> None:
+    """Run independent commands concurrently and show each one's output in its own pane.
+
+    A history `entry` gets the overall exit code and duration.
+    """
+    from rich.panel import Panel
+    from rich.text import Text
+    from src.parallel import build_plan, run_plan
+
+    console = get_console()
     shell = detect_shell()
-    executed_commands = []
 
     for cmd in commands:
-        cmd = cmd.strip()
-        executed_commands.append(cmd)
-
-        typer.echo(typer.style("\n >_ Executing", fg=typer.colors.BRIGHT_YELLOW) + f": {cmd}\n")
-        
-        if not validate_command(cmd):
-            typer.echo("Error: Generated command failed safety validation", err=True)
+        verdict = validate_command(cmd.strip(), shell)
+        if not verdict:
+            typer.echo(f"Error: Generated command failed safety validation: {cmd} [{verdict.reason}]", err=True)
             raise typer.Exit(1)
 
-        if cmd.lower().startswith('cd '):
-            # Handle cd command
-            path = cmd[3:].strip()
-            try:
-                os.chdir(path)
-                # table = Table(title="")
-                # table.add_column("New Location", style="green")
-                # table.add_row(os.getcwd())
-                # console.print(table)
-            except Exception as e:
-                typer.echo(f"Error changing directory: {str(e)}", err=True)
-                raise typer.Exit(1)
+    steps = build_plan(commands)
+    if entry is not None:
+        entry.begin()
+
+    def on_start(step):
+        after = f" (after {', '.join(str(d + 1) for d in sorted(step.deps))})" if step.deps else ""
+        typer.echo(typer.style(" >_ Started", fg=typer.colors.BRIGHT_YELLOW) + f" [{step.index + 1}] {step.command}{after}")
+
+    def on_done(step, result):
+        finished = time.perf_counter()
+        profiling.record(f"execute [{step.index + 1}]", finished - result.duration, finished, "exec",
+                         command=step.command, returncode=result.returncode)
+        body = Text("\n".join(result.stdout_tail))
+        if result.stderr_tail:
+            if result.stdout_tail:
+                body.append("\n")
+            body.append("\n".join(result.stderr_tail), style="red")
+        if result.cancelled:
+            status = "⏹ cancelled"
         else:
-            # Handle other commands
-            try:
-                process = None
-                if platform.system().lower() == "windows":
-                    if shell == "powershell":
-                        process = subprocess.run(
-                            ['powershell', '-Command', cmd],
-                            text=True,
-                            bufsize=1,
-                            universal_newlines=True,
-                            check=True 
-                        )
-                    else:
-                        process = subprocess.run(
-                            ['cmd', '/c', cmd],
-                      
-                            text=True,
-                            bufsize=1,
-                            universal_newlines=True,
-                            check=True 
-                        )
-                else:
-                    process = subprocess.run(
-                        cmd,
-                        shell=True,
-                        text=True,
-                        bufsize=1,
-                        universal_newlines=True,
-                        check=True 
-                    )
-
-                typer.echo(typer.style(" >_ Command executed successfully ✅", fg=typer.colors.BRIGHT_GREEN) + f"\n")
-
-            except subprocess.CalledProcessError as e:
-                error_msg = e.stderr.strip() if e.stderr else str(e)
-
-                if error_msg:
-                    error_table = Table(title="Error Output", style="red")
-                    error_table.add_column("Error Message", style="red")
-                    error_table.add_row(error_msg)
-                    console.print(error_table)      
-                # Generate AI explanation
-                prompt = f"""
-                You are an AI assistant that explains shell command errors in **simple terms** for a user.
-                - Error Message: "{error_msg}"
-                - Explain the error clearly and provide potential fixes.
-                - Format the response in a short and concise way.
-                """
-                url = f"{backend_url}/api/error"
-
-
-                # Parameters
-                params = {
-                    "error_msg": error_msg,
-                }
-
-                response = requests.get(url, params=params)
-                if response.status_code != 200:
-                    print(f"Error: {response.status_code}")
-                    print(response.result)
-                    return None
-                data = response.json()
-        
+            status = "✅" if result.ok else f"❌ exit {result.returncode}"
+        console.print(Panel(
+            body,
+            title=f"[{step.index + 1}] {step.command}",
+            subtitle=f"{status} in {result.duration:.1f}s",
+            border_style="green" if result.ok else "red",
+            expand=False,
+        ))
+
+    results = run_plan(steps, shell, jobs=jobs, on_start=on_start, on_done=on_done)
+
+    failures = [results[i] for i in sorted(results) if not results[i].ok and not results[i].cancelled]
+    if entry is not None:
+        entry.end(failures[0].returncode if failures else 0)
+    if failures:
+        explain_error(failures[0].error_text())
+        raise typer.Exit(1)
+    skipped = len(steps) - len(results)
+    if skipped:
+        typer.echo(f"{skipped} command(s) were not run.", err=True)
+        raise typer.Exit(1)
+    typer.echo(typer.style(" >_ All commands executed successfully ✅", fg=typer.colors.BRIGHT_GREEN))
 
-    
-                # Display error explanation
-                explanation_table = Table(title="Error Explanation")
-                explanation_table.add_column("AI Assistant Explanation", style="yellow")
-                explanation_table.add_row(str(data['result']))
-                console.print(explanation_table)
 
+def execute_command(commands: List[str], query: str, session: bool = False, shell_session=None,
+                    entry=None, speculation=None, tty: bool = True) -> None:
+    """Execute command(s) and display output in tables.
+
+    A caller-owned `shell_session` (as in `termai shell --session`) is used
+    and left open; with `session=True` one is opened for these commands only.
+    A history `entry` gets the exit code and duration of the run. With a
+    `speculation` already running the commands, its buffered output is shown
+    instead of running them again. Interactive programs (top, editors,
+    prompting installers) get the terminal itself unless `tty` is False.
+    """
+    from src.executor import needs_terminal, render_line, run_in_terminal, stream_command
+
+    console = get_console()
+    shell = detect_shell()
+    executed_commands = []
+
+    owns_session = shell_session is None
+    if session and shell_session is None:
+        from src.session import ShellSession, session_supported
+        if session_supported(shell):
+            shell_session = ShellSession(shell)
+        else:
+            typer.echo(f"Persistent sessions are not supported for {shell}; running each command separately.", err=True)
+
+    tty = tty and os.getenv("TERMAI_TTY", "1") != "0" and sys.stdin.isatty() and sys.stdout.isatty()
+    replay = None
+    if speculation is not None and shell_session is None:
+        replay = speculation.take(lambda stream, line: render_line(console, stream, line))
+
+    if entry is not None:
+        entry.begin()
+    try:
+        for cmd in commands:
+            cmd = cmd.strip()
+            executed_commands.append(cmd)
+
+            typer.echo(typer.style("\n >_ Executing", fg=typer.colors.BRIGHT_YELLOW) + f": {cmd}\n")
+            
+            verdict = validate_command(cmd, shell)
+            if not verdict:
+                typer.echo(f"Error: Generated command failed safety validation [{verdict.reason}]", err=True)
                 raise typer.Exit(1)
-        console.print("-" * 60, style="magenta")
 
-    
+            if shell_session is not None:
+                # The session shell handles cd, exports and sourcing itself
+                with profiling.span("execute", "exec", command=cmd, session=True) as current:
+                    result = shell_session.run(cmd, on_line=lambda stream, line: render_line(console, stream, line))
+                    current.set(returncode=result.returncode)
+            elif cmd.lower().startswith('cd '):
+                # Handle cd command
+                path = cmd[3:].strip()
+                try:
+                    os.chdir(path)
+                except Exception as e:
+                    typer.echo(f"Error changing directory: {str(e)}", err=True)
+                    if entry is not None:
+                        entry.end(1)
+                    raise typer.Exit(1)
+                console.print("-" * 60, style="magenta")
+                continue
+            elif tty and needs_terminal(cmd, shell):
+                # Full-screen or prompting program: give it the terminal, nothing is captured
+                if replay is not None:
+                    # The replay is matched to commands by position; once a
+                    # command runs for real, the rest do too
+                    speculation.discard()
+                    replay = None
+                with profiling.span("execute", "exec", command=cmd, terminal=True) as current:
+                    result = run_in_terminal(cmd, shell)
+                    current.set(returncode=result.returncode)
+            else:
+                # Handle other commands, streaming their output as it arrives
+                with profiling.span("execute", "exec", command=cmd) as current:
+                    result = next(replay, None) if replay is not None else None
+                    if result is not None:
+                        current.set(speculative=True)
+                    else:
+                        replay = None
+                        result = stream_command(cmd, shell, console=console)
+                    current.set(returncode=result.returncode)
+
+            if not result.ok:
+                if entry is not None:
+                    entry.end(result.returncode)
+                explain_error(result.error_text())
+                raise typer.Exit(1)
+
+            typer.echo(typer.style(" >_ Command executed successfully ✅", fg=typer.colors.BRIGHT_GREEN) + f"\n")
+            console.print("-" * 60, style="magenta")
+        if entry is not None:
+            entry.end(0)
+    finally:
+        if shell_session is not None and owns_session:
+            shell_session.close()
+        if speculation is not None:
+            speculation.discard()
+
 
 @app.command()
 def run(
     instruction: str = typer.Argument(..., help="Natural language instruction to convert to shell command"),
     execute: bool = typer.Option(False, "--execute", "-e", help="Actually execute the command"),
-    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show detailed output")
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show detailed output"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Skip the local command cache"),
+    no_local: bool = typer.Option(False, "--no-local", help="Always ask the backend, even for common instructions answered locally"),
+    revalidate: bool = typer.Option(False, "--revalidate", help="Refresh cached commands from the backend in the background"),
+    session: bool = typer.Option(False, "--session", help="Run all commands in one persistent shell so cd, exports and venvs carry over"),
+    parallel: bool = typer.Option(False, "--parallel", help="Run independent commands concurrently"),
+    jobs: int = typer.Option(4, "--jobs", "-j", help="Maximum number of commands to run at once with --parallel"),
+    no_speculate: bool = typer.Option(False, "--no-speculate", help="Don't start read-only commands before you confirm"),
+    no_tty: bool = typer.Option(False, "--no-tty", help="Capture the output of interactive programs too, instead of giving them the terminal"),
+    profile: bool = typer.Option(False, "--profile", help="Print where the time went (startup, detection, backend, execution)"),
+    profile_trace: Optional[str] = typer.Option(None, "--profile-trace", help="Also write the timings to this file as a Chrome trace (JSON)")
 ):
     """Convert natural language instructions into shell commands and optionally execute them."""
+    if profile or profile_trace:
+        profiling.enable()
+        profiling.record("import src.cli", profiling.STARTED, _IMPORTED, "import")
     if verbose:
         typer.echo(f"Processing instruction: {instruction}")
     
+    speculation = None
     try:
-        command = get_shell_command(instruction)
+        command = get_shell_command(instruction, use_cache=not no_cache, revalidate=revalidate, use_local=not no_local)
 
         
         if not command:
             typer.echo("Error: No command was generated", err=True)
             raise typer.Exit(1)
+
+        from src import history
+        entry = history.record(instruction, command, detect_shell())
         
         # typer.echo(f"\nGenerated command: {command}")
         
         if execute:
-            confirmation = typer.prompt("Do you want to execute the commands ? (y/n)", default="y")
+            if not (session or parallel or no_speculate):
+                from src.speculation import speculate
+                speculation = speculate(command, detect_shell())
+            from src.backend import prewarm_client
+            # Commands may have come from the cache: open the connection for
+            # a possible error explanation while the user reads the plan
+            prewarm_client()
+            with profiling.span("confirmation prompt", "wait"):
+                confirmation = typer.prompt("Do you want to execute the commands ? (y/n)", default="y")
             if confirmation.lower() != "y":
                 typer.echo("Execution aborted.")
                 raise typer.Exit(0)
-            execute_command(command , instruction)
+            if parallel:
+                execute_parallel(command, jobs, entry=entry)
+            else:
+                execute_command(command , instruction, session=session, entry=entry, speculation=speculation,
+                                tty=not no_tty)
         else:
             typer.echo("\nUse --execute or -e flag to run the command")
+
+        if verbose:
+            from src.backend import get_client
+            for timing in get_client().timings:
+                ttfb = f", ttfb {timing['ttfb'] * 1000:.0f} ms" if timing["ttfb"] is not None else ""
+                typer.echo(f"{timing['path']}: {timing['total'] * 1000:.0f} ms{ttfb}, {timing['attempts']} attempt(s)")
             
+    except typer.Exit:
+        raise
     except Exception as e:
         print(e)
         typer.echo(f"Error: {str(e)}", err=True)
         raise typer.Exit(1)
+    finally:
+        if speculation is not None:
+            # Answered "n" or interrupted: stop whatever is still running
+            speculation.discard()
+        if profiling.enabled():
+            write_profile(profile_trace)
+
+
+def write_profile(trace_path: Optional[str]) -> None:
+    """Print the --profile breakdown and write the Chrome trace, if one was asked for."""
+    total = time.perf_counter() - profiling.STARTED
+    profiling.report(get_console(), total)
+    if trace_path:
+        from src.utils import detect_environment
+
+        environment = detect_environment()
+        profiling.write_trace(trace_path, {
+            "total_ms": round(total * 1000, 1),
+            "os": environment["os"],
+            "shell": environment["shell"],
+            "python": platform.python_version(),
+        })
+        typer.echo(f"Profile trace written to {trace_path}", err=True)
+
+REPL_EXIT = {"exit", "quit", ":q"}
+
+
+@app.command()
+def shell(
+    no_cache: bool = typer.Option(False, "--no-cache", help="Skip the local command cache"),
+    no_local: bool = typer.Option(False, "--no-local", help="Always ask the backend, even for common instructions answered locally"),
+    session: bool = typer.Option(False, "--session", help="Run everything in one persistent shell so cd, exports and venvs carry over between instructions")
+):
+    """Interactive mode: type instructions, review the commands, run them. One warm process for the whole session."""
+    try:
+        import readline  # noqa: F401  (line editing and history for input())
+    except ImportError:
+        pass
+    from src import history
+    from src.backend import prewarm_client
+    from src.speculation import speculate
+
+    shell_type = detect_shell()
+    prewarm_client()
+    shell_session = None
+    if session:
+        from src.session import ShellSession, session_supported
+        if session_supported(shell_type):
+            shell_session = ShellSession(shell_type)
+        else:
+            typer.echo(f"Persistent sessions are not supported for {shell_type}; running each command separately.", err=True)
+    typer.echo(f"termai shell ({shell_type}). Type an instruction, or exit to quit.")
+
+    try:
+        while True:
+            try:
+                instruction = input("termai> ").strip()
+            except (EOFError, KeyboardInterrupt):
+                typer.echo()
+                break
+            if not instruction:
+                continue
+            if instruction.lower() in REPL_EXIT:
+                break
+
+            started = time.perf_counter()
+            try:
+                commands = get_shell_command(instruction, use_cache=not no_cache, use_local=not no_local,
+                                             use_daemon=False, show_shell=False)
+            except Exception as e:
+                typer.echo(f"Error: {e}", err=True)
+                continue
+            typer.echo(typer.style(f"({(time.perf_counter() - started) * 1000:.0f} ms)", dim=True))
+            if not commands:
+                continue
+            entry = history.record(instruction, commands, shell_type)
+            speculation = speculate(commands, shell_type) if shell_session is None else None
+            try:
+                if typer.prompt("Execute? (y/n)", default="y").lower() == "y":
+                    execute_command(commands, instruction, shell_session=shell_session, entry=entry,
+                                    speculation=speculation)
+            except typer.Exit:
+                # A failed command ends `termai run`, not the interactive session
+                pass
+            except (typer.Abort, KeyboardInterrupt):
+                typer.echo()
+            finally:
+                if speculation is not None:
+                    speculation.discard()
+            # Written between instructions, once the output is on screen
+            history.flush()
+    finally:
+        if shell_session is not None:
+            shell_session.close()
+
+
+def read_instructions(source: str) -> List[str]:
+    """Read one instruction per line from a file or stdin ("-"), skipping blank lines and # comments."""
+    if source == "-":
+        text = sys.stdin.read()
+    else:
+        with open(source, encoding="utf-8") as f:
+            text = f.read()
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.strip().startswith("#")]
+
+
+@app.command()
+def batch(
+    source: str = typer.Argument(..., help="File with one instruction per line, or - to read stdin"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Write the JSONL results to this file instead of stdout"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Skip the local command cache"),
+    no_local: bool = typer.Option(False, "--no-local", help="Send common instructions to the backend too instead of answering them locally")
+):
+    """Generate commands for many instructions at once, streaming results as JSONL."""
+    from src.backend import BackendError
+    from src.cache import CommandCache
+    from src.intents import match_intent
+
+    instructions = read_instructions(source)
+    if not instructions:
+        typer.echo("Error: No instructions given", err=True)
+        raise typer.Exit(1)
+
+    system_info = "windows" if platform.system().lower() == "windows" else "unix"
+    shell_type = detect_shell()
+    cache = None if no_cache else CommandCache()
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    started = time.perf_counter()
+    generated = failed = 0
+
+    def emit(item: dict) -> None:
+        out.write(json.dumps(item) + "\n")
+        out.flush()
+
+    try:
+        pending = []
+        for index, instruction in enumerate(instructions):
+            local = None if no_local else match_intent(instruction, shell_type)
+            if local is not None:
+                generated += 1
+                emit({"index": index, "instruction": instruction, "result": local.commands, "local": True})
+                continue
+            cmds = cache.get(instruction, shell_type, system_info) if cache is not None else None
+            if cmds is None:
+                pending.append(index)
+            else:
+                generated += 1
+                emit({"index": index, "instruction": instruction, "result": cmds, "cached": True})
+
+        for item in fetch_batch([instructions[i] for i in pending], shell_type, system_info):
+            item["index"] = pending[item["index"]]
+            if item.get("result"):
+                generated += 1
+                if cache is not None:
+                    # Pre-generated runbooks make later `termai run` calls instant
+                    cache.put(item["instruction"], shell_type, system_info, item["result"])
+            else:
+                failed += 1
+            emit(item)
+    except BackendError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+        if output:
+            out.close()
+
+    typer.echo(f"Generated commands for {generated}/{len(instructions)} instructions "
+               f"({len(instructions) - len(pending)} local or cached) in {time.perf_counter() - started:.1f}s", err=True)
+    if failed:
+        raise typer.Exit(1)
+
+
+@app.command()
+def ping():
+    """Measure latency to the backend per phase (DNS, connect, TLS, first byte)."""
+    from rich.table import Table
+    from src.backend import get_client, measure_phases
+
+    client = get_client()
+    table = Table(title=f"Backend latency: {client.base_url}")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Time (ms)", style="bright_yellow", justify="right")
+    for phase, seconds in measure_phases(client.base_url).items():
+        table.add_row(phase, f"{seconds * 1000:.1f}")
+
+    # Two requests over the pooled session: the second reuses the connection
+    for label in ("pooled request (cold)", "pooled request (warm)"):
+        started = time.perf_counter()
+        client.get("/")
+        table.add_row(label, f"{(time.perf_counter() - started) * 1000:.1f}")
+    if client.http2:
+        table.caption = "HTTP/2"
+    get_console().print(table)
+
+
+cache_app = typer.Typer(help="Inspect or clear the local command cache.")
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("stats")
+def cache_stats():
+    """Show local command cache statistics."""
+    from rich.table import Table
+    from src.cache import CommandCache
+
+    cache = CommandCache()
+    stats = cache.stats()
+    cache.close()
+
+    table = Table(title="Command Cache")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="bright_yellow")
+    for name, value in stats.items():
+        table.add_row(name, str(value))
+    get_console().print(table)
+
+
+@cache_app.command("clear")
+def cache_clear():
+    """Remove every entry from the local command cache."""
+    from src.cache import CommandCache
+
+    cache = CommandCache()
+    removed = cache.clear()
+    cache.close()
+    typer.echo(f"Removed {removed} cached entries.")
+
+history_app = typer.Typer(help="Search and rerun past instructions and their commands.")
+app.add_typer(history_app, name="history")
+
+
+def history_status(entry) -> str:
+    if not entry.executed:
+        return "not run"
+    if entry.exit_code is None:
+        return "interrupted"
+    duration = f" in {entry.duration:.1f}s" if entry.duration is not None else ""
+    return f"✅{duration}" if entry.exit_code == 0 else f"❌ exit {entry.exit_code}{duration}"
+
+
+@history_app.command("search")
+def history_search(
+    terms: Optional[List[str]] = typer.Argument(None, help="Words to look for in instructions and commands; omit to list the latest entries"),
+    limit: int = typer.Option(20, "--limit", "-n", help="Show at most this many entries")
+):
+    """Find past instructions and commands by full-text search."""
+    from rich.table import Table
+    from rich.text import Text
+    from src.history import History
+
+    store = History()
+    entries = store.search(terms or [], limit=limit)
+    store.close()
+    if not entries:
+        typer.echo("No matching history entries.")
+        raise typer.Exit(1)
+
+    table = Table(title="termai history")
+    table.add_column("#", style="cyan", justify="right")
+    table.add_column("When", style="dim")
+    table.add_column("Instruction", style="bright_yellow")
+    table.add_column("Commands", style="bright_green")
+    table.add_column("Result")
+    for entry in entries:
+        table.add_row(str(entry.id), time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.created_at)),
+                      Text(entry.instruction), Text("\n".join(entry.commands)), history_status(entry))
+    get_console().print(table)
+    typer.echo("Run one again with `termai history rerun <#>`.")
+
+
+@history_app.command("rerun")
+def history_rerun(
+    entry_id: int = typer.Argument(..., help="Entry number, as shown by `termai history search`"),
+    yes: bool = typer.Option(False, "--yes", "-y", help="Run without asking for confirmation"),
+    session: bool = typer.Option(False, "--session", help="Run all commands in one persistent shell so cd, exports and venvs carry over"),
+    parallel: bool = typer.Option(False, "--parallel", help="Run independent commands concurrently"),
+    jobs: int = typer.Option(4, "--jobs", "-j", help="Maximum number of commands to run at once with --parallel")
+):
+    """Run the commands of a history entry again, without asking the backend."""
+    from rich.markup import escape
+    from src import history
+
+    store = history.History()
+    previous = store.get(entry_id)
+    store.close()
+    if previous is None:
+        typer.echo(f"Error: No history entry #{entry_id}", err=True)
+        raise typer.Exit(1)
+
+    shell_type = detect_shell()
+    if previous.shell != shell_type:
+        typer.echo(f"Warning: these commands were generated for {previous.shell}, and this shell is {shell_type}.", err=True)
+    if previous.cwd != os.getcwd():
+        typer.echo(f"They were run in {previous.cwd}.", err=True)
+    get_console().print(commands_panel(previous.commands, f"#{entry_id}: {escape(previous.instruction)}"))
+    if not yes and typer.prompt("Do you want to execute the commands ? (y/n)", default="y").lower() != "y":
+        typer.echo("Execution aborted.")
+        raise typer.Exit(0)
+
+    entry = history.record(previous.instruction, previous.commands, shell_type)
+    if parallel:
+        execute_parallel(previous.commands, jobs, entry=entry)
+    else:
+        execute_command(previous.commands, previous.instruction, session=session, entry=entry)
+
+daemon_app = typer.Typer(help="Run a resident termai process that `termai run` forwards instructions to.")
+app.add_typer(daemon_app, name="daemon")
+
+
+@daemon_app.command("start")
+def daemon_start(
+    foreground: bool = typer.Option(False, "--foreground", help="Serve in this process instead of in the background")
+):
+    """Start the daemon: one warm process holding the backend connection, caches and shell profile."""
+    from src import daemon
+
+    if not daemon.supported():
+        typer.echo("Error: The daemon needs Unix domain sockets, which this platform does not provide.", err=True)
+        raise typer.Exit(1)
+    try:
+        if foreground:
+            daemon.serve()
+            return
+        pid = daemon.start_background()
+    except (RuntimeError, daemon.DaemonUnavailable) as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(1)
+    typer.echo(f"termai daemon running (pid {pid}) on {daemon.socket_path()}")
+
+
+@daemon_app.command("stop")
+def daemon_stop():
+    """Stop the running daemon."""
+    from src import daemon
+
+    try:
+        for event in daemon.request("stop"):
+            typer.echo(f"Stopped termai daemon (pid {event['pid']}).")
+            return
+    except daemon.DaemonUnavailable:
+        pass
+    typer.echo("No termai daemon is running.")
+
+
+@daemon_app.command("status")
+def daemon_status():
+    """Show whether the daemon is running and what it has served."""
+    from rich.table import Table
+    from src import daemon
+
+    try:
+        stats = next(daemon.request("stats"))
+    except daemon.DaemonUnavailable:
+        typer.echo("No termai daemon is running.")
+        raise typer.Exit(1)
+    stats.pop("type", None)
+    table = Table(title="termai daemon")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="bright_yellow")
+    for name, value in stats.items():
+        table.add_row(name, str(value))
+    get_console().print(table)
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -0,0 +1,296 @@
+"""Resident `termai` process serving instructions over a Unix socket.
+
+`termai daemon start` keeps one warm process around: modules imported, the
+shell profile and intent packs loaded, and the pooled keep-alive connection
+to the backend open. `termai run` notices the socket and forwards the
+instruction to the daemon instead of doing that work itself; the commands
+still run in the caller's own shell.
+
+The protocol is newline-delimited JSON. A request is one line such as
+{"op": "query", "instruction": ..., "shell_type": ..., "system_info": ...};
+a query is answered with the same `command`/`done`/`error` events as the
+backend's streaming endpoint, with `source` (local, cached or backend) on
+`done`.
+"""
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Iterator, Optional
+
+from src.utils import termai_home
+
+CONNECT_TIMEOUT = 0.5
+READ_TIMEOUT = 120
+IDLE_TIMEOUT = float(os.getenv("TERMAI_DAEMON_IDLE_TIMEOUT", 60 * 60))
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no daemon is listening on the socket."""
+
+
+def socket_path() -> str:
+    return os.getenv("TERMAI_DAEMON_SOCKET") or os.path.join(termai_home(), "daemon.sock")
+
+
+def supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def enabled() -> bool:
+    """Whether `termai run` should look for a daemon (TERMAI_DAEMON=0 turns it off)."""
+    return supported() and os.getenv("TERMAI_DAEMON", "1") != "0" and os.path.exists(socket_path())
+
+
+def connect(timeout: float = CONNECT_TIMEOUT) -> socket.socket:
+    if not supported():
+        raise DaemonUnavailable("Unix sockets are not available on this platform")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path())
+    except OSError as e:
+        sock.close()
+        raise DaemonUnavailable(f"No termai daemon at {socket_path()}") from e
+    return sock
+
+
+def send(sock: socket.socket, request: dict) -> Iterator[dict]:
+    """Send one request on a connected socket and yield the reply events."""
+    sock.settimeout(READ_TIMEOUT)
+    try:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        sock.close()
+
+
+def request(op: str, **fields) -> Iterator[dict]:
+    return send(connect(), dict(fields, op=op))
+
+
+class Daemon:
+    """The warm state and request handling behind the socket."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.last_request = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.sources = {"local": 0, "cached": 0, "backend": 0}
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        """Do the work a cold `termai run` pays for before the first request arrives."""
+        from src.backend import get_client
+        from src.intents import get_engine
+        from src.utils import detect_environment
+
+        detect_environment()
+        get_engine()
+        get_client().prewarm()
+
+    def handle(self, message: dict, emit) -> None:
+        op = message.get("op")
+        if op == "query":
+            self.query(message, emit)
+        elif op == "stats":
+            emit(dict(self.stats(), type="stats"))
+        elif op == "ping":
+            emit({"type": "pong", "pid": os.getpid()})
+        else:
+            emit({"type": "error", "status": 400, "detail": f"Unknown op {op!r}"})
+
+    def query(self, message: dict, emit) -> None:
+        started = time.perf_counter()
+        source = None
+        try:
+            source = self._query(message, emit)
+        except Exception as e:
+            emit({"type": "error", "status": getattr(e, "status", None) or 502, "detail": str(e)})
+        finally:
+            with self._lock:
+                self.requests += 1
+                self.last_request = time.time()
+                self.busy_seconds += time.perf_counter() - started
+                if source is None:
+                    self.errors += 1
+                else:
+                    self.sources[source] += 1
+
+    def _query(self, message: dict, emit) -> Optional[str]:
+        from src.backend import BackendError, get_client
+        from src.cache import CommandCache
+        from src.intents import match_intent
+        from src.utils import detect_environment
+
+        instruction = message["instruction"]
+        shell_type = message["shell_type"]
+        system_info = message["system_info"]
+
+        if message.get("use_local", True):
+            local = match_intent(instruction, shell_type)
+            if local is not None:
+                emit({"type": "done", "result": local.commands, "source": "local"})
+                return "local"
+
+        cache = CommandCache() if message.get("use_cache", True) else None
+        try:
+            cmds = cache.get(instruction, shell_type, system_info) if cache is not None else None
+            if cmds is not None:
+                emit({"type": "done", "result": cmds, "source": "cached"})
+                return "cached"
+
+            params = {
+                "instruction": instruction,
+                "shell_type": shell_type,
+                "system_info": system_info,
+                "tools": ",".join(detect_environment()["tools"]),
+            }
+            try:
+                for line in get_client().stream_lines("/api/query/stream", params=params):
+                    event = json.loads(line)
+                    if event.get("type") == "done":
+                        cmds = event["result"]
+                    elif event.get("type") == "error":
+                        emit(event)
+                        return None
+                    else:
+                        emit(event)
+            except BackendError as e:
+                if e.status != 404:
+                    raise
+                # Backend without streaming endpoints
+                response = get_client().get("/api/query", params=params)
+                if response.status_code != 200:
+                    emit({"type": "error", "status": response.status_code, "detail": response.text})
+                    return None
+                cmds = response.json().get("result", [])
+
+            if cmds and cache is not None:
+                cache.put(instruction, shell_type, system_info, cmds)
+            emit({"type": "done", "result": cmds or [], "source": "backend"})
+            return "backend"
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def stats(self) -> dict:
+        from src.backend import get_client
+
+        client = get_client()
+        with self._lock:
+            served = self.requests
+            return {
+                "pid": os.getpid(),
+                "socket": socket_path(),
+                "uptime_s": round(time.time() - self.started, 1),
+                "requests": served,
+                "errors": self.errors,
+                **{f"{source}_answers": count for source, count in self.sources.items()},
+                "mean_request_ms": round(self.busy_seconds / served * 1000, 2) if served else 0.0,
+                "backend": client.base_url,
+                "backend_requests": client.requests_made,
+                "http2": client.http2,
+                "idle_timeout_s": IDLE_TIMEOUT,
+            }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line.strip():
+            return
+
+        def emit(event: dict) -> None:
+            self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            message = json.loads(line)
+        except ValueError:
+            emit({"type": "error", "status": 400, "detail": "Requests are one JSON object per line"})
+            return
+        if message.get("op") == "stop":
+            emit({"type": "done", "pid": os.getpid()})
+            # shutdown() waits for serve_forever to return, so not from its own thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        self.server.state.handle(message, emit)
+
+
+def _remove_stale_socket(path: str) -> None:
+    if not os.path.exists(path):
+        return
+    try:
+        connect().close()
+    except DaemonUnavailable:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"A termai daemon is already running on {path}")
+
+
+def serve() -> None:
+    """Run the daemon in the foreground until stopped or idle for IDLE_TIMEOUT seconds."""
+    path = socket_path()
+    _remove_stale_socket(path)
+    daemon = Daemon()
+    server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    server.daemon_threads = True
+    server.state = daemon
+    os.chmod(path, 0o600)
+
+    def watch_idle():
+        while True:
+            time.sleep(min(IDLE_TIMEOUT, 30))
+            with daemon._lock:
+                idle = time.time() - daemon.last_request
+            if idle >= IDLE_TIMEOUT:
+                server.shutdown()
+                return
+
+    daemon.warm()
+    threading.Thread(target=watch_idle, daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def running_pid() -> Optional[int]:
+    try:
+        for event in request("ping"):
+            return event["pid"]
+    except DaemonUnavailable:
+        return None
+
+
+def start_background(timeout: float = 10) -> int:
+    """Start the daemon as a detached process (unless one is running) and wait until it answers; returns its pid."""
+    import subprocess
+
+    pid = running_pid()
+    if pid is not None:
+        return pid
+    with open(os.path.join(termai_home(), "daemon.log"), "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "src.cli", "daemon", "start", "--foreground"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pid = running_pid()
+        if pid is not None:
+            return pid
+        time.sleep(0.05)
+    raise DaemonUnavailable(f"The daemon did not start; see {os.path.join(termai_home(), 'daemon.log')}")
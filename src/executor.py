@@ -0,0 +1,235 @@
+import os
+import platform
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+# Bounds for what we keep in memory per command; everything else is only
+# rendered and then dropped.
+TAIL_LINES = int(os.getenv("TERMAI_OUTPUT_TAIL_LINES", 200))
+MAX_LINE_BYTES = 8192
+# Lines in flight between the pipe readers and the renderer. When it is full
+# the readers block, the pipes fill up and the command itself is paused, so a
+# fast producer can't outrun the terminal into unbounded memory.
+QUEUE_LINES = 1024
+
+# Programs that need the user's terminal: full-screen UIs, pagers, editors and prompts
+FULL_SCREEN = {"top", "htop", "btop", "atop", "glances", "nmon", "iotop", "vim", "vi", "nvim", "nano", "emacs",
+               "less", "more", "most", "man", "watch", "tmux", "screen", "ssh", "telnet", "ftp", "sftp", "passwd",
+               "mc", "ranger", "nnn", "fzf", "k9s", "lazygit", "lazydocker"}
+# Interpreters and clients that start an interactive session when given no
+# script or command to run
+REPLS = {"python", "python3", "node", "irb", "ghci", "lua", "php", "bash", "zsh", "sh", "fish", "pwsh",
+         "powershell", "mysql", "psql", "sqlite3", "redis-cli", "mongo", "mongosh"}
+SCRIPT_FLAGS = {"-c", "-e", "-m", "-f", "--command", "--execute", "--eval", "--file", "--version", "-V", "-v"}
+SCAFFOLDERS = {"npx", "npm", "yarn", "pnpm", "bunx", "bun"}
+
+
+class CommandResult:
+    """Outcome of a streamed command: exit status plus the tail of its output."""
+
+    def __init__(self, command: str, returncode: int, stdout_tail: List[str], stderr_tail: List[str],
+                 duration: float, dropped_lines: int = 0, cancelled: bool = False):
+        self.command = command
+        self.returncode = returncode
+        self.stdout_tail = stdout_tail
+        self.stderr_tail = stderr_tail
+        self.duration = duration
+        self.dropped_lines = dropped_lines
+        self.cancelled = cancelled
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    def error_text(self) -> str:
+        """Text to explain on failure: the stderr tail, or a generic exit message."""
+        text = "\n".join(self.stderr_tail).strip()
+        return text or f"Command '{self.command}' returned non-zero exit status {self.returncode}."
+
+
+def build_command(cmd: str, shell: str):
+    """Return (args, use_shell) for running `cmd` under the detected shell."""
+    if platform.system().lower() == "windows":
+        if shell == "powershell":
+            return ['powershell', '-Command', cmd], False
+        return ['cmd', '/c', cmd], False
+    return cmd, True
+
+
+def _interactive(program: str, args: List[str]) -> bool:
+    if program in FULL_SCREEN:
+        return True
+    if program in REPLS:
+        positional = [arg for arg in args if not arg.startswith("-")]
+        database_client = program in ("mysql", "psql", "sqlite3", "redis-cli", "mongo", "mongosh")
+        return not (SCRIPT_FLAGS & set(args)) and (database_client or not positional)
+    if program in ("docker", "podman", "kubectl"):
+        return any(arg in ("-it", "-ti", "-i", "-t", "--interactive", "--tty", "--stdin") for arg in args)
+    if program in SCAFFOLDERS:
+        scaffold = args[:1] in (["create"], ["init"]) or any(arg.startswith("create-") for arg in args[:2])
+        return scaffold and not {"-y", "--yes"} & set(args)
+    if program in ("apt", "apt-get", "dnf", "yum", "pacman"):
+        return not {"-y", "--yes", "--assume-yes", "--noconfirm"} & set(args) and bool(
+            {"install", "remove", "upgrade", "-S", "-Syu"} & set(args))
+    if program == "git":
+        if args[:1] == ["commit"]:
+            return not any(arg in ("-m", "-F", "--file", "--no-edit", "-C") or arg.startswith(("-m", "--message"))
+                           for arg in args)
+        # `git add -p` and `git rebase -i` prompt; `git log -p` only prints a patch
+        interactive = {"add", "checkout", "reset", "restore", "stash", "rebase", "clean"}
+        return args[:1] != [] and args[0] in interactive and bool({"-i", "--interactive", "-p", "--patch"} & set(args))
+    return program == "crontab" and "-e" in args
+
+
+def needs_terminal(cmd: str, shell: str) -> bool:
+    """Whether any program in `cmd` is interactive and would break with its output piped."""
+    from src.validation import SEPARATORS, tokenize
+
+    tokens = tokenize(cmd, shell)
+    if not tokens:
+        return False
+    words: List[str] = []
+    for token in tokens + [";"]:
+        if token not in SEPARATORS:
+            words.append(token)
+            continue
+        if words:
+            program = os.path.basename(words[0]).lower()
+            if program.endswith(".exe"):
+                program = program[:-4]
+            if _interactive(program, words[1:]):
+                return True
+        words = []
+    return False
+
+
+def run_in_terminal(cmd: str, shell: str, cwd: Optional[str] = None) -> CommandResult:
+    """Run `cmd` attached to the user's terminal, for full-screen and prompting programs.
+
+    Its output goes straight to the terminal, so nothing is captured and the
+    result has empty tails.
+    """
+    args, use_shell = build_command(cmd, shell)
+    started = time.perf_counter()
+    process = subprocess.Popen(args, shell=use_shell, cwd=cwd)
+    try:
+        returncode = process.wait()
+    except KeyboardInterrupt:
+        # Ctrl-C reached the command too, as it shares our terminal
+        returncode = process.wait()
+    return CommandResult(cmd, returncode, [], [], time.perf_counter() - started)
+
+
+def _pump(pipe, name: str, lines: "queue.Queue") -> None:
+    """Read a pipe line by line (bounded line length) and hand lines to the consumer."""
+    try:
+        for raw in iter(lambda: pipe.readline(MAX_LINE_BYTES), b""):
+            lines.put((name, raw.decode("utf-8", errors="replace").rstrip("\r\n")))
+    finally:
+        pipe.close()
+        lines.put((name, None))
+
+
+def _kill(process) -> None:
+    """Kill the process, and its whole process group when it leads one."""
+    if process.poll() is not None:
+        return
+    if platform.system().lower() != "windows":
+        try:
+            os.killpg(process.pid, 9)
+            return
+        except OSError:
+            pass
+    process.kill()
+
+
+def render_line(console, stream: str, line: str) -> None:
+    """Default live renderer: stdout as-is, stderr in red."""
+    if stream == "stderr":
+        console.print(line, style="red", markup=False, highlight=False, soft_wrap=True)
+    else:
+        console.print(line, markup=False, highlight=False, soft_wrap=True)
+
+
+def stream_command(cmd: str, shell: str, console=None, cwd: Optional[str] = None,
+                   on_line: Optional[Callable[[str, str], None]] = None,
+                   tail_lines: int = TAIL_LINES, stdin=None,
+                   cancel: Optional[threading.Event] = None) -> CommandResult:
+    """Run `cmd`, reading stdout and stderr concurrently and rendering lines as they arrive.
+
+    Only the last `tail_lines` lines of each stream are retained, so commands
+    with unbounded output run in constant memory. Setting `cancel` kills the
+    process.
+    """
+    if on_line is None and console is not None:
+        on_line = lambda stream, line: render_line(console, stream, line)
+
+    args, use_shell = build_command(cmd, shell)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        args,
+        shell=use_shell,
+        cwd=cwd,
+        stdin=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # A cancellable command gets its own process group so that children
+        # spawned by the shell die with it
+        start_new_session=cancel is not None and platform.system().lower() != "windows",
+    )
+
+    lines: "queue.Queue" = queue.Queue(maxsize=QUEUE_LINES)
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, "stdout", lines), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, "stderr", lines), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    tails = {"stdout": deque(maxlen=tail_lines), "stderr": deque(maxlen=tail_lines)}
+    total = 0
+    open_streams = 2
+    cancelled = False
+    try:
+        while open_streams:
+            try:
+                stream, line = lines.get(timeout=0.1 if cancel is not None else None)
+            except queue.Empty:
+                if cancel.is_set() and not cancelled:
+                    cancelled = True
+                    _kill(process)
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+            total += 1
+            tails[stream].append(line)
+            if on_line is not None:
+                on_line(stream, line)
+        returncode = process.wait()
+    except BaseException:
+        _kill(process)
+        process.wait()
+        # Unblock readers waiting on a full queue so they see EOF and exit
+        deadline = time.monotonic() + 1
+        while any(reader.is_alive() for reader in readers) and time.monotonic() < deadline:
+            try:
+                lines.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise
+
+    kept = len(tails["stdout"]) + len(tails["stderr"])
+    return CommandResult(
+        cmd,
+        returncode,
+        list(tails["stdout"]),
+        list(tails["stderr"]),
+        time.perf_counter() - started,
+        dropped_lines=total - kept,
+        cancelled=cancelled,
+    )
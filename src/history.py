@@ -0,0 +1,185 @@
+"""Local history of instructions, generated commands and how their runs went.
+
+Entries live in `~/.termai/history.sqlite3` with an FTS5 index over the
+instruction and commands, so `termai history search` finds old answers in
+milliseconds and `termai history rerun` runs them again without asking the
+backend.
+
+Recording stays off the hot path: `record()` only appends to an in-memory
+list (sqlite3 is not even imported), and `flush()` writes everything pending in one WAL-mode transaction
+once the output has been shown (at exit, or between instructions in
+`termai shell`). The oldest entries beyond TERMAI_HISTORY_MAX_ENTRIES are
+dropped on write; TERMAI_HISTORY=0 turns recording off.
+"""
+import atexit
+import json
+import os
+import time
+from typing import List, Optional
+
+from src.utils import termai_home
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " id INTEGER PRIMARY KEY,"
+    " instruction TEXT NOT NULL,"
+    " commands TEXT NOT NULL,"
+    " shell TEXT NOT NULL,"
+    " cwd TEXT NOT NULL,"
+    " created_at REAL NOT NULL,"
+    " executed INTEGER NOT NULL DEFAULT 0,"
+    " exit_code INTEGER,"
+    " duration REAL)",
+]
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5("
+    " instruction, commands, content='runs', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS runs_ai AFTER INSERT ON runs BEGIN"
+    " INSERT INTO runs_fts (rowid, instruction, commands) VALUES (new.id, new.instruction, new.commands); END",
+    "CREATE TRIGGER IF NOT EXISTS runs_ad AFTER DELETE ON runs BEGIN"
+    " INSERT INTO runs_fts (runs_fts, rowid, instruction, commands)"
+    " VALUES ('delete', old.id, old.instruction, old.commands); END",
+]
+COLUMNS = "id, instruction, commands, shell, cwd, created_at, executed, exit_code, duration"
+RUN_COLUMNS = ", ".join(f"runs.{column}" for column in COLUMNS.split(", "))
+
+
+def enabled() -> bool:
+    return os.getenv("TERMAI_HISTORY", "1") != "0"
+
+
+class Entry:
+    """One instruction and its commands; execution fills in the exit code and duration."""
+
+    def __init__(self, instruction: str, commands: List[str], shell: str, cwd: Optional[str] = None,
+                 created_at: Optional[float] = None, executed: bool = False, exit_code: Optional[int] = None,
+                 duration: Optional[float] = None, id: Optional[int] = None):
+        self.id = id
+        self.instruction = instruction
+        self.commands = commands
+        self.shell = shell
+        self.cwd = cwd or os.getcwd()
+        self.created_at = created_at or time.time()
+        self.executed = executed
+        self.exit_code = exit_code
+        self.duration = duration
+        self._started = None
+
+    def begin(self) -> None:
+        self.executed = True
+        self._started = time.perf_counter()
+
+    def end(self, exit_code: int) -> None:
+        self.exit_code = exit_code
+        if self._started is not None:
+            self.duration = time.perf_counter() - self._started
+
+    @classmethod
+    def from_row(cls, row) -> "Entry":
+        entry_id, instruction, commands, shell, cwd, created_at, executed, exit_code, duration = row
+        return cls(instruction, json.loads(commands), shell, cwd, created_at, bool(executed), exit_code,
+                   duration, id=entry_id)
+
+
+def _match_query(terms: List[str]) -> str:
+    """FTS5 query matching every term as a prefix; quoting keeps `-`, `.` and `*` literal."""
+    words = " ".join(terms).split()
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+class History:
+    """The on-disk history store."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        import sqlite3
+
+        self.path = path or os.path.join(termai_home(), "history.sqlite3")
+        self.max_entries = max_entries or int(os.getenv("TERMAI_HISTORY_MAX_ENTRIES", 10000))
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        # WAL: appends don't block readers, and NORMAL only syncs at checkpoints
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        try:
+            for statement in FTS_SCHEMA:
+                self._conn.execute(statement)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: searches fall back to LIKE
+            self.fts = False
+
+    def add(self, entries: List[Entry]) -> None:
+        """Write entries in one transaction and drop the oldest beyond `max_entries`."""
+        if not entries:
+            return
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for entry in entries:
+                cursor = self._conn.execute(
+                    "INSERT INTO runs (instruction, commands, shell, cwd, created_at, executed, exit_code, duration) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (entry.instruction, json.dumps(entry.commands), entry.shell, entry.cwd, entry.created_at,
+                     int(entry.executed), entry.exit_code, entry.duration),
+                )
+                entry.id = cursor.lastrowid
+            # ids only grow, so this is a range delete on the primary key
+            self._conn.execute("DELETE FROM runs WHERE id <= ?", (entries[-1].id - self.max_entries,))
+
+    def get(self, entry_id: int) -> Optional[Entry]:
+        row = self._conn.execute(f"SELECT {COLUMNS} FROM runs WHERE id = ?", (entry_id,)).fetchone()
+        return Entry.from_row(row) if row is not None else None
+
+    def search(self, terms: List[str], limit: int = 20) -> List[Entry]:
+        """Entries whose instruction or commands contain every term (as a word prefix), best match first."""
+        query = _match_query(terms)
+        if not query:
+            rows = self._conn.execute(f"SELECT {COLUMNS} FROM runs ORDER BY id DESC LIMIT ?", (limit,))
+        elif self.fts:
+            rows = self._conn.execute(
+                f"SELECT {RUN_COLUMNS} FROM runs_fts JOIN runs ON runs.id = runs_fts.rowid "
+                "WHERE runs_fts MATCH ? ORDER BY runs_fts.rank, runs.id DESC LIMIT ?",
+                (query, limit),
+            )
+        else:
+            words = " ".join(terms).split()
+            where = " AND ".join("(instruction LIKE ? OR commands LIKE ?)" for _ in words)
+            params = [f"%{word}%" for word in words for _ in range(2)]
+            rows = self._conn.execute(f"SELECT {COLUMNS} FROM runs WHERE {where} ORDER BY id DESC LIMIT ?",
+                                      (*params, limit))
+        return [Entry.from_row(row) for row in rows.fetchall()]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_pending: List[Entry] = []
+
+
+def record(instruction: str, commands: List[str], shell: str) -> Entry:
+    """Queue an entry for the next flush(); execution details can still be filled in until then."""
+    entry = Entry(instruction, list(commands), shell)
+    if enabled():
+        if not _pending:
+            atexit.register(flush)
+        _pending.append(entry)
+    return entry
+
+
+def flush() -> None:
+    """Write queued entries. History is best effort: a locked or unwritable store never fails a command."""
+    if not _pending:
+        return
+    import sqlite3
+
+    entries = _pending[:]
+    del _pending[:]
+    atexit.unregister(flush)
+    try:
+        history = History()
+        try:
+            history.add(entries)
+        finally:
+            history.close()
+    except (sqlite3.Error, OSError):
+        pass
@@ -0,0 +1,292 @@
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from glob import glob
+from typing import Dict, List, NamedTuple, Optional
+
+# Common instructions answered locally, without a backend round trip.
+#
+# An intent pack is a JSON file {"intents": [...]}; each intent has
+#   id        - unique name; a user intent replaces a built-in with the same id
+#   keywords  - words that must appear for the intent to be considered
+#   patterns  - regexes matched against the *whole* normalized instruction
+#               (lower-case, single spaces, no trailing punctuation or
+#               "please"/"can you" fillers); {show} expands to an optional
+#               "show me the" / "list all" / "what is" style prefix
+#   commands  - templates per shell (bash, zsh, powershell, cmd, ...),
+#               platform (linux, darwin), family (unix) or "*"; named groups
+#               in the pattern fill {placeholders} (double any literal
+#               braces in templates that use placeholders); a match where a
+#               named group is empty or has shell metacharacters is left to
+#               the backend
+# Packs are loaded from ~/.termai/intents/*.json ahead of the built-ins.
+BUILTIN_INTENTS: List[dict] = [
+    {"id": "disk-usage", "keywords": ["disk", "storage", "space", "df"],
+     "patterns": [r"{show}(?:disk|storage) (?:usage|space)(?: left| free| available)?",
+                  r"how much (?:disk |storage )?space (?:is |do i have )?(?:left|free|available)(?: on (?:my |the )?disk)?",
+                  r"{show}(?:free|available) (?:disk|storage) space", r"df(?: -h)?"],
+     "commands": {"unix": ["df -h"],
+                  "powershell": ["Get-CimInstance Win32_LogicalDisk | Select-Object DeviceID,Size,FreeSpace | Format-Table"],
+                  "cmd": ["wmic logicaldisk get caption,size,freespace"]}},
+    {"id": "memory", "keywords": ["memory", "ram"],
+     "patterns": [r"{show}(?:memory|ram)(?: usage| info(?:rmation)?| details| stats)?",
+                  r"how much (?:memory|ram)(?: is (?:free|used|available|left)| do i have)?",
+                  r"{show}(?:free|available|used) (?:memory|ram)"],
+     "commands": {"linux": ["free -h"], "darwin": ["vm_stat"],
+                  "powershell": ["Get-CimInstance Win32_OperatingSystem | Select-Object TotalVisibleMemorySize,FreePhysicalMemory | Format-List"],
+                  "cmd": ['systeminfo | findstr /C:"Memory"']}},
+    {"id": "find-by-extension", "keywords": ["find", "list", "show", "files"],
+     "patterns": [r"(?:find|list|show|search for)(?: me)?(?: all)?(?: the)? \*?\.(?P<ext>[a-z0-9]{1,10}) files"
+                  r"(?: in (?:this|the current) (?:directory|folder)(?: and (?:all )?subdirectories)?| recursively)?"],
+     "commands": {"unix": ["find . -type f -name '*.{ext}'"],
+                  "powershell": ["Get-ChildItem -Recurse -File -Filter *.{ext}"],
+                  "cmd": ["dir /s /b *.{ext}"]}},
+    {"id": "largest-files", "keywords": ["largest", "biggest"],
+     "patterns": [r"{show}(?:largest|biggest) (?:files|directories|folders)(?: in (?:this|the current) (?:directory|folder))?"],
+     "commands": {"unix": ["du -ah . | sort -rh | head -n 20"],
+                  "powershell": ["Get-ChildItem -Recurse -File | Sort-Object Length -Descending | Select-Object -First 20 FullName,Length"]}},
+    {"id": "directory-size", "keywords": ["size", "big"],
+     "patterns": [r"{show}size of (?:this|the current) (?:directory|folder)",
+                  r"{show}(?:current )?(?:directory|folder) size", r"how big is (?:this|the current) (?:directory|folder)"],
+     "commands": {"unix": ["du -sh ."],
+                  "powershell": ["(Get-ChildItem -Recurse -File | Measure-Object -Property Length -Sum).Sum / 1MB"]}},
+    {"id": "list-files", "keywords": ["files", "contents", "ls", "dir", "directory", "folder"],
+     "patterns": [r"{show}(?:files|contents)(?: in (?:this|the current) (?:directory|folder))?",
+                  r"{show}(?:current )?(?:directory|folder) contents",
+                  r"{show}contents of (?:this|the current) (?:directory|folder)", r"ls(?: -la)?", r"dir"],
+     "commands": {"unix": ["ls -la"], "powershell": ["Get-ChildItem -Force"], "cmd": ["dir"]}},
+    {"id": "current-directory", "keywords": ["directory", "folder", "where", "pwd", "path"],
+     "patterns": [r"pwd", r"{show}(?:current|working|present) (?:working )?(?:directory|folder|path)",
+                  r"where am i", r"which (?:directory|folder) am i in"],
+     "commands": {"unix": ["pwd"], "powershell": ["Get-Location"], "cmd": ["cd"]}},
+    {"id": "git-status", "keywords": ["git", "status", "changes", "changed"],
+     "patterns": [r"git status", r"{show}git status",
+                  r"{show}(?:uncommitted |unstaged |pending |local )?changes(?: in (?:this |the )?repo(?:sitory)?)?",
+                  r"what(?: files)? (?:has |have )?changed"],
+     "commands": {"*": ["git status"]}},
+    {"id": "git-log", "keywords": ["log", "history", "commits", "commit"],
+     # A bare "show log"/"show history" could be any log or the shell history
+     "patterns": [r"git log", r"{show}(?:git (?:log|history|commit history|commit log)|commit (?:history|log))",
+                  r"{show}(?:last|recent|latest) (?:few )?commits"],
+     "commands": {"*": ["git log --oneline -n 20"]}},
+    {"id": "git-current-branch", "keywords": ["branch"],
+     "patterns": [r"what (?:git )?branch am i on", r"{show}(?:current|active) (?:git )?branch",
+                  r"which (?:git )?branch am i on"],
+     "commands": {"*": ["git branch --show-current"]}},
+    {"id": "git-branches", "keywords": ["branches", "branch"],
+     "patterns": [r"git branch(?: -a)?", r"{show}(?:git |local |remote )?branch(?:es)?"],
+     "commands": {"*": ["git branch -a"]}},
+    {"id": "cpu-usage", "keywords": ["cpu", "processor", "load"],
+     "patterns": [r"{show}(?:cpu|processor) (?:usage|load|utili[sz]ation)", r"{show}(?:system )?load(?: average)?"],
+     "commands": {"linux": ["top -bn1 | head -n 15"], "darwin": ["top -l 1 | head -n 10"],
+                  "powershell": ["Get-Counter '\\Processor(_Total)\\% Processor Time'"],
+                  "cmd": ["wmic cpu get loadpercentage"]}},
+    {"id": "cpu-info", "keywords": ["cpu", "processor"],
+     "patterns": [r"{show}(?:cpu|processor)(?: info(?:rmation)?| details| model| specs)?",
+                  r"what (?:cpu|processor) do i have", r"lscpu"],
+     "commands": {"linux": ["lscpu"], "darwin": ["sysctl -n machdep.cpu.brand_string", "sysctl -n hw.ncpu"],
+                  "powershell": ["Get-CimInstance Win32_Processor | Select-Object Name,NumberOfCores,NumberOfLogicalProcessors,MaxClockSpeed"],
+                  "cmd": ["wmic cpu get name,numberofcores,numberoflogicalprocessors,maxclockspeed"]}},
+    {"id": "gpu-info", "keywords": ["gpu", "graphics", "video"],
+     "patterns": [r"{show}(?:gpu|graphics card|video card|graphics)(?: info(?:rmation)?| details)?",
+                  r"what (?:gpu|graphics card|video card) do i have"],
+     "commands": {"linux": ["lspci | grep -i -E 'vga|3d|display'"], "darwin": ["system_profiler SPDisplaysDataType"],
+                  "powershell": ["Get-CimInstance Win32_VideoController | Select-Object Name,AdapterRAM,DriverVersion"],
+                  "cmd": ["wmic path win32_videocontroller get name,driverversion"]}},
+    {"id": "os-info", "keywords": ["os", "operating", "kernel", "uname"],
+     "patterns": [r"{show}(?:os|operating system|kernel)(?: version| info(?:rmation)?| details| name)?",
+                  r"what (?:os|operating system|kernel)(?: version)? (?:am i (?:on|running|using)|is this|do i have)",
+                  r"uname(?: -a)?"],
+     "commands": {"linux": ["uname -a", "cat /etc/os-release"], "darwin": ["sw_vers", "uname -a"],
+                  "powershell": ["Get-CimInstance Win32_OperatingSystem | Select-Object Caption,Version,OSArchitecture"],
+                  "cmd": ["ver"]}},
+    {"id": "system-overview", "keywords": ["system", "hardware", "machine", "computer", "specs"],
+     "patterns": [r"{show}(?:system|hardware|machine|computer) (?:info(?:rmation)?|overview|details|specs|summary)",
+                  r"{show}(?:system |hardware |machine )?specs"],
+     "commands": {"linux": ["hostnamectl"], "darwin": ["system_profiler SPHardwareDataType"],
+                  "powershell": ["Get-CimInstance Win32_ComputerSystem | Select-Object Manufacturer,Model,SystemType,TotalPhysicalMemory"],
+                  "cmd": ["systeminfo"]}},
+    {"id": "processes", "keywords": ["processes", "tasks", "running", "ps"],
+     "patterns": [r"{show}(?:running |active )?(?:processes|tasks)(?: running)?", r"what processes are running", r"ps(?: aux)?"],
+     "commands": {"unix": ["ps aux"], "powershell": ["Get-Process"], "cmd": ["tasklist"]}},
+    {"id": "docker-containers-all", "keywords": ["containers"],
+     "patterns": [r"(?:show|list|display|get)(?: me)? all (?:the )?(?:docker )?containers(?: including stopped(?: ones)?)?",
+                  r"docker ps -a"],
+     "commands": {"*": ["docker ps -a"]}},
+    {"id": "docker-containers", "keywords": ["containers", "docker"],
+     "patterns": [r"{show}(?:running |active )?(?:docker )?containers(?: running)?", r"docker ps",
+                  r"what (?:docker )?containers are running"],
+     "commands": {"*": ["docker ps"]}},
+    {"id": "docker-images", "keywords": ["images", "docker"],
+     "patterns": [r"{show}(?:local )?docker images", r"docker images"],
+     "commands": {"*": ["docker images"]}},
+    {"id": "ip-address", "keywords": ["ip"],
+     "patterns": [r"{show}(?:local |private )?ip(?: address(?:es)?)?", r"what(?: is|'s) my (?:local |private )?ip(?: address)?"],
+     "commands": {"linux": ["ip -brief address"], "darwin": ["ifconfig | grep 'inet '"],
+                  "powershell": ["Get-NetIPAddress -AddressFamily IPv4 | Select-Object InterfaceAlias,IPAddress"],
+                  "cmd": ["ipconfig"]}},
+    {"id": "network-interfaces", "keywords": ["network", "interfaces", "adapters"],
+     "patterns": [r"{show}network (?:interfaces|adapters|stats|statistics)"],
+     "commands": {"unix": ["netstat -i"], "powershell": ["Get-NetAdapter"], "cmd": ["ipconfig /all"]}},
+    {"id": "listening-ports", "keywords": ["ports", "port", "listening"],
+     "patterns": [r"{show}(?:open |listening |used )?ports(?: in use)?", r"what ports are (?:open|listening|in use)"],
+     "commands": {"linux": ["ss -tulpn"], "darwin": ["lsof -iTCP -sTCP:LISTEN -n -P"],
+                  "powershell": ["Get-NetTCPConnection -State Listen"], "cmd": ["netstat -ano | findstr LISTENING"]}},
+    {"id": "uptime", "keywords": ["uptime", "long"],
+     "patterns": [r"{show}(?:system )?uptime", r"uptime",
+                  r"how long (?:has )?(?:the |this |my )?(?:system|machine|computer) been (?:up|running|on)"],
+     "commands": {"unix": ["uptime"],
+                  "powershell": ["(Get-Date) - (Get-CimInstance Win32_OperatingSystem).LastBootUpTime"],
+                  "cmd": ['net statistics workstation | findstr /C:"since"']}},
+    {"id": "whoami", "keywords": ["who", "whoami", "user", "username"],
+     "patterns": [r"who am i", r"whoami", r"{show}(?:current |logged in )?(?:user|username|user name)",
+                  r"what(?: is|'s) my (?:user ?name|user)"],
+     "commands": {"*": ["whoami"]}},
+    {"id": "hostname", "keywords": ["hostname", "host", "computer", "machine"],
+     "patterns": [r"hostname", r"{show}(?:host ?name|computer name|machine name)",
+                  r"what(?: is|'s) (?:my |the |this )?(?:host ?name|computer name|machine name)"],
+     "commands": {"*": ["hostname"]}},
+    {"id": "date-time", "keywords": ["date", "time", "day"],
+     "patterns": [r"{show}(?:current )?(?:date|time|date and time)", r"date",
+                  r"what(?: is|'s) the (?:date|time)(?: today| now)?", r"what (?:day|time) is (?:it|today)(?: now)?"],
+     "commands": {"unix": ["date"], "powershell": ["Get-Date"], "cmd": ["echo %date% %time%"]}},
+    {"id": "environment-variables", "keywords": ["environment", "env", "variables", "printenv"],
+     "patterns": [r"{show}(?:environment|env) variables", r"env", r"printenv"],
+     "commands": {"unix": ["env"], "powershell": ["Get-ChildItem Env:"], "cmd": ["set"]}},
+    {"id": "tool-version", "keywords": ["version", "--version", "-v"],
+     "patterns": [r"(?:{show}|which |what )?(?:version of )?(?P<tool>node|python3?|docker|git|npm|java|rustc|cargo|flutter|pip3?)"
+                  r"(?: version| --version| -v)?(?: (?:is )?installed| do i have)?"],
+     "commands": {"*": ["{tool} --version"]}},
+    {"id": "go-version", "keywords": ["go", "golang"],
+     "patterns": [r"(?:{show}|which |what )?(?:version of )?(?:go|golang) version(?: (?:is )?installed| do i have)?",
+                  r"(?:{show}|which |what )?version of (?:go|golang)(?: (?:is )?installed| do i have)?"],
+     "commands": {"*": ["go version"]}},
+    {"id": "kubectl-version", "keywords": ["kubectl"],
+     "patterns": [r"(?:{show}|which |what )?(?:version of )?kubectl(?: version)?(?: (?:is )?installed| do i have)?"],
+     "commands": {"*": ["kubectl version --client"]}},
+]
+
+MACROS = {
+    "{show}": r"(?:(?:show|list|display|get|print|check|view|see|give|tell)(?: me)? |what(?: is|'s| are) )?"
+              r"(?:the |my |all (?:the |my )?)?",
+}
+FILLER_RE = re.compile(
+    r"^(?:(?:please|pls|can you|could you|would you|will you|how (?:do|can) i|how to|i want to|i'd like to|help me)\s+)+"
+)
+TRAILING_RE = re.compile(r"(?:\s+please)?[\s?.!]*$")
+PARAM_VALUE_RE = re.compile(r"^[\w.@%+=:,/-]+$")
+WINDOWS_SHELLS = {"cmd", "powershell"}
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    commands: List[str]
+
+
+def normalize(instruction: str) -> str:
+    text = " ".join(instruction.lower().split())
+    text = TRAILING_RE.sub("", text)
+    return FILLER_RE.sub("", text)
+
+
+def _expand(pattern: str) -> str:
+    for macro, replacement in MACROS.items():
+        pattern = pattern.replace(macro, replacement)
+    return pattern
+
+
+def _template_keys(shell: str, platform: str) -> List[str]:
+    if shell in WINDOWS_SHELLS:
+        return [shell, "*"]
+    keys = [shell]
+    if platform.startswith("linux"):
+        keys.append("linux")
+    elif platform == "darwin":
+        keys.append("darwin")
+    return keys + ["unix", "*"]
+
+
+class IntentEngine:
+    """Keyword -> intents index so only plausible intents are tried.
+
+    An intent's patterns are compiled the first time one of its keywords
+    shows up, so a CLI run only pays for the few it actually tries.
+    """
+
+    def __init__(self, intents: List[dict]):
+        self.intents = intents
+        self._compiled: Dict[int, list] = {}
+        self._index: Dict[str, List[int]] = {}
+        for position, intent in enumerate(intents):
+            for keyword in intent["keywords"]:
+                self._index.setdefault(keyword.lower(), []).append(position)
+
+    def _patterns(self, position: int) -> list:
+        patterns = self._compiled.get(position)
+        if patterns is None:
+            patterns = self._compiled[position] = [re.compile(_expand(p)) for p in self.intents[position]["patterns"]]
+        return patterns
+
+    def match(self, instruction: str, shell: str, platform: str = sys.platform) -> Optional[IntentMatch]:
+        text = normalize(instruction)
+        positions = set()
+        for word in text.split():
+            positions.update(self._index.get(word, ()))
+        keys = _template_keys(shell.lower(), platform)
+        for position in sorted(positions):
+            intent = self.intents[position]
+            for pattern in self._patterns(position):
+                found = pattern.fullmatch(text)
+                if found:
+                    break
+            else:
+                continue
+            templates = next((intent["commands"][key] for key in keys if key in intent["commands"]), None)
+            if templates is None:
+                # Nothing for this shell; the backend will answer
+                return None
+            params = found.groupdict()
+            if not all(value and PARAM_VALUE_RE.match(value) for value in params.values()):
+                return None
+            return IntentMatch(intent["id"], [template.format(**params) if params else template for template in templates])
+        return None
+
+
+def load_packs(directory: Optional[str] = None) -> List[dict]:
+    """Read user intent packs (~/.termai/intents/*.json); invalid packs are skipped with a warning."""
+    if directory is None:
+        from src.utils import termai_home
+        directory = os.path.join(termai_home(), "intents")
+    intents = []
+    for path in sorted(glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                pack = json.load(f)["intents"]
+            for intent in pack:
+                if not intent["keywords"] or not intent["commands"]:
+                    raise ValueError(f"intent {intent.get('id')!r} needs keywords and commands")
+                for pattern in intent["patterns"]:
+                    names = re.compile(_expand(pattern)).groupindex
+                    if names:
+                        for templates in intent["commands"].values():
+                            for template in templates:
+                                template.format(**{name: "x" for name in names})
+        except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+            print(f"Ignoring intent pack {path}: {e}", file=sys.stderr)
+            continue
+        intents.extend(pack)
+    return intents
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> IntentEngine:
+    user = load_packs()
+    overridden = {intent["id"] for intent in user}
+    return IntentEngine(user + [intent for intent in BUILTIN_INTENTS if intent["id"] not in overridden])
+
+
+def match_intent(instruction: str, shell: str) -> Optional[IntentMatch]:
+    """Answer a common instruction locally; None means ask the backend."""
+    return get_engine().match(instruction, shell)
@@ -0,0 +1,222 @@
+import os
+import re
+import shlex
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set
+
+from src.executor import CommandResult, stream_command
+
+# Tools that share lock files or global state; commands of the same family
+# never run concurrently.
+LOCK_FAMILIES = {
+    "npm": "node", "npx": "node", "yarn": "node", "pnpm": "node", "bun": "node",
+    "pip": "python", "pip3": "python", "poetry": "python", "pipenv": "python", "uv": "python", "conda": "python",
+    "apt": "apt", "apt-get": "apt", "dpkg": "apt",
+    "brew": "brew", "cargo": "cargo", "go": "go", "gem": "ruby", "bundle": "ruby",
+    "composer": "php", "choco": "windows", "winget": "windows",
+}
+
+# Commands that change the state of the shell itself or otherwise can't be
+# analysed; they act as barriers between everything before and after them.
+BARRIER_WORDS = {"export", "source", ".", "set", "unset", "alias", "pushd", "popd", "set-location", "sl", "env"}
+
+# Tools whose first argument is a subcommand rather than a path
+SUBCOMMAND_TOOLS = {
+    "git", "docker", "docker-compose", "kubectl", "helm", "npm", "npx", "yarn", "pnpm", "bun", "pip", "pip3",
+    "poetry", "uv", "apt", "apt-get", "brew", "cargo", "go", "gem", "bundle", "composer", "conda",
+    "choco", "winget", "systemctl", "gh", "terraform", "flutter", "dotnet",
+}
+
+# Options taking a value that come before the subcommand (`git -C repo status`)
+VALUE_FLAGS = {
+    "git": {"-C", "-c", "--git-dir", "--work-tree", "--namespace"},
+    "docker": {"-H", "--host", "-c", "--context", "--config", "-l", "--log-level"},
+    "docker-compose": {"-f", "--file", "-p", "--project-name", "--project-directory", "--env-file"},
+    "kubectl": {"-n", "--namespace", "--context", "--kubeconfig", "--cluster", "--user", "-s", "--server"},
+    "helm": {"-n", "--namespace", "--kube-context", "--kubeconfig"},
+    "npm": {"--prefix", "-w", "--workspace"}, "yarn": {"--cwd"}, "pnpm": {"-C", "--dir", "-F", "--filter"},
+    "poetry": {"-C", "--directory", "-P", "--project"}, "uv": {"--directory", "--project"},
+    "cargo": {"-C", "--manifest-path", "--config", "-Z"}, "go": {"-C"}, "gh": {"-R", "--repo"},
+    "systemctl": {"-H", "--host", "-M", "--machine"},
+}
+
+SEPARATORS = {"&&", "||", ";", "|", "&", ";;"}
+
+NUMERIC_RE = re.compile(r"^[\d.:x%+-]+$")
+
+
+class Step:
+    """One command of a plan with what we could infer about its side effects."""
+
+    def __init__(self, index: int, command: str, cwd: str):
+        self.index = index
+        self.command = command
+        self.cwd = cwd
+        self.paths: Set[str] = set()
+        self.locks: Set[str] = set()
+        self.barrier = False
+        self.chdir: Optional[str] = None
+        self.deps: Set[int] = set()
+
+
+def _is_within(path: str, other: str) -> bool:
+    return path == other or path.startswith(other.rstrip(os.sep) + os.sep)
+
+
+def _conflicts(a: Step, b: Step) -> bool:
+    if a.barrier or b.barrier or a.locks & b.locks:
+        return True
+    for p in a.paths:
+        for q in b.paths:
+            if _is_within(p, q) or _is_within(q, p):
+                return True
+    # Arguments naming a step's working directory itself (`git add .`)
+    # conflict with anything running there
+    return a.cwd in b.paths or b.cwd in a.paths
+
+
+def _analyze(step: Step) -> None:
+    try:
+        lexer = shlex.shlex(step.command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        tokens = list(lexer)
+    except ValueError:
+        step.barrier = True
+        return
+
+    at_program = True
+    expect_subcommand = False
+    expect_value = skip_next = False
+    value_flags: Set[str] = set()
+    for token in tokens:
+        if token in SEPARATORS or set(token) <= set("<>&|;()"):
+            # The word after a redirection is a file (or a heredoc delimiter),
+            # not the next program
+            at_program = not set(token) & set("<>")
+            skip_next = token == "<<"
+            expect_value = False
+            continue
+        if skip_next:
+            skip_next = False
+            continue
+        if at_program:
+            name = os.path.basename(token).lower()
+            if name.endswith(".exe"):
+                name = name[:-4]
+            if name in BARRIER_WORDS or ("=" in token and not token.startswith("=")):
+                step.barrier = True
+            if name in LOCK_FAMILIES:
+                step.locks.add(LOCK_FAMILIES[name])
+            expect_subcommand = name in SUBCOMMAND_TOOLS
+            value_flags = VALUE_FLAGS.get(name, set())
+            at_program = False
+            if os.sep not in token and "/" not in token:
+                continue
+            # A program given by path (`.venv/bin/pip`, `./build.sh`) depends on
+            # whatever creates it
+        elif expect_value:
+            expect_value = False
+        elif token.startswith("-"):
+            if "=" not in token:
+                expect_value = expect_subcommand and token in value_flags
+                continue
+            token = token.split("=", 1)[1]
+        elif expect_subcommand:
+            expect_subcommand = False
+            continue
+        # Anything else may name a file or directory; numbers, URLs and
+        # variables can't
+        if not token or NUMERIC_RE.match(token) or "://" in token or token.startswith("$"):
+            continue
+        step.paths.add(os.path.normpath(os.path.join(step.cwd, os.path.expanduser(token))))
+
+
+def build_plan(commands: List[str], cwd: Optional[str] = None) -> List[Step]:
+    """Turn a command list into steps with dependency edges.
+
+    A later step depends on an earlier one when they touch overlapping paths,
+    share a package-manager lock, or either is a barrier. A bare `cd DIR` is
+    not run as a process: it waits for every earlier step (which may create
+    DIR) and moves the working directory of the steps after it, which then
+    depend on it.
+    """
+    cwd = os.path.abspath(cwd or os.getcwd())
+    steps: List[Step] = []
+    last_cd: Optional[int] = None
+
+    for index, command in enumerate(commands):
+        command = command.strip()
+        step = Step(index, command, cwd)
+        parts = command.split(None, 1)
+        if parts and parts[0].lower() == "cd" and len(parts) == 2 and not any(c in parts[1] for c in "&|;"):
+            target = os.path.normpath(os.path.join(cwd, os.path.expanduser(parts[1].strip().strip("'\""))))
+            step.chdir = target
+            step.deps.update(earlier.index for earlier in steps)
+            cwd = target
+        else:
+            _analyze(step)
+            if last_cd is not None:
+                step.deps.add(last_cd)
+
+        for earlier in steps:
+            if _conflicts(step, earlier):
+                step.deps.add(earlier.index)
+        if step.chdir is not None:
+            last_cd = index
+        steps.append(step)
+
+    return steps
+
+
+def run_plan(steps: List[Step], shell: str, jobs: int = 4,
+             on_start: Optional[Callable[[Step], None]] = None,
+             on_done: Optional[Callable[[Step, CommandResult], None]] = None) -> Dict[int, CommandResult]:
+    """Run steps on a bounded worker pool as soon as their dependencies finish.
+
+    Stops scheduling on the first failure and kills the steps still running.
+    Returns the results of every step that ran.
+    """
+    cancel = threading.Event()
+    results: Dict[int, CommandResult] = {}
+    pending = {step.index: step for step in steps}
+    failed = False
+
+    def run_step(step: Step) -> CommandResult:
+        if step.chdir is not None:
+            ok = os.path.isdir(step.chdir)
+            error = [] if ok else [f"cd: {step.chdir}: No such file or directory"]
+            return CommandResult(step.command, 0 if ok else 1, [], error, 0.0)
+        return stream_command(step.command, shell, cwd=step.cwd, cancel=cancel)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        running = {}
+        try:
+            while pending or running:
+                if not failed:
+                    for index in sorted(pending):
+                        step = pending[index]
+                        if len(running) >= jobs:
+                            break
+                        if step.deps <= results.keys() and all(results[d].ok for d in step.deps):
+                            del pending[index]
+                            if on_start is not None:
+                                on_start(step)
+                            running[pool.submit(run_step, step)] = step
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    result = future.result()
+                    results[step.index] = result
+                    if on_done is not None:
+                        on_done(step, result)
+                    if not result.ok and not failed:
+                        failed = True
+                        cancel.set()
+        except BaseException:
+            cancel.set()
+            raise
+
+    return results
@@ -0,0 +1,152 @@
+"""Lightweight timing spans for the CLI hot path.
+
+Disabled by default: `span()` then returns a shared no-op context manager,
+so instrumented code pays one function call and a flag check. `termai run
+--profile` turns recording on and prints a breakdown table at the end;
+`--profile-trace FILE` also writes the spans in the Chrome trace event
+format (open in chrome://tracing or https://ui.perfetto.dev).
+"""
+import os
+import threading
+import time
+from typing import List, Optional
+
+_enabled = False
+_spans: List["Span"] = []
+_local = threading.local()
+_lock = threading.Lock()
+# Time this module was imported, which is close to CLI startup
+STARTED = time.perf_counter()
+
+
+class Span:
+    __slots__ = ("name", "category", "args", "start", "end", "depth", "thread")
+
+    def __init__(self, name: str, category: str, args: dict):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = self.end = 0.0
+        self.depth = 0
+        self.thread = threading.get_ident()
+
+    def set(self, **args) -> None:
+        """Attach extra details (status codes, counts, ...) to the span."""
+        self.args.update(args)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def __enter__(self) -> "Span":
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        _local.stack.pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        with _lock:
+            _spans.append(self)
+
+
+class _NullSpan:
+    def set(self, **args) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, category: str = "cli", **args):
+    """Time the enclosed block when profiling is on; a no-op otherwise."""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def record(name: str, start: float, end: float, category: str = "cli", **args) -> None:
+    """Add a span measured before profiling was turned on (perf_counter timestamps)."""
+    if not _enabled:
+        return
+    recorded = Span(name, category, args)
+    recorded.start, recorded.end = start, end
+    with _lock:
+        _spans.append(recorded)
+
+
+def spans() -> List[Span]:
+    with _lock:
+        return sorted(_spans, key=lambda s: (s.start, s.depth))
+
+
+def report(console, total: Optional[float] = None) -> None:
+    """Print every span in start order, nested spans indented, with its share of the run."""
+    from rich.table import Table
+
+    recorded = spans()
+    if total is None:
+        total = time.perf_counter() - STARTED
+    table = Table(title="termai profile")
+    table.add_column("Span", style="cyan")
+    table.add_column("Start (ms)", justify="right", style="dim")
+    table.add_column("Time (ms)", justify="right", style="bright_yellow")
+    table.add_column("%", justify="right")
+    table.add_column("Details", style="dim")
+    for item in recorded:
+        details = ", ".join(f"{key}={value}" for key, value in item.args.items())
+        table.add_row(
+            "  " * item.depth + item.name,
+            f"{(item.start - STARTED) * 1000:.1f}",
+            f"{item.duration * 1000:.1f}",
+            f"{item.duration / total * 100:.0f}" if total else "",
+            details,
+        )
+    table.caption = f"total {total * 1000:.1f} ms since startup"
+    console.print(table)
+
+
+def write_trace(path: str, metadata: Optional[dict] = None) -> None:
+    """Write the spans as a Chrome trace (JSON object format, complete "X" events)."""
+    import json
+
+    pid = os.getpid()
+    threads = {}
+    events = []
+    for item in spans():
+        # Small stable thread ids read better in trace viewers than raw idents
+        tid = threads.setdefault(item.thread, len(threads) + 1)
+        events.append({
+            "name": item.name,
+            "cat": item.category,
+            "ph": "X",
+            "ts": round((item.start - STARTED) * 1e6, 1),
+            "dur": round(item.duration * 1e6, 1),
+            "pid": pid,
+            "tid": tid,
+            "args": {key: str(value) for key, value in item.args.items()},
+        })
+    trace = {"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata or {}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(trace, f)
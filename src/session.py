@@ -0,0 +1,159 @@
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Optional
+
+from src.executor import CommandResult, MAX_LINE_BYTES, QUEUE_LINES, TAIL_LINES, _pump
+
+
+class SessionError(Exception):
+    """Raised when the long-lived shell dies or cannot be started."""
+
+
+def _quote_powershell(cmd: str) -> str:
+    return "'" + cmd.replace("'", "''") + "'"
+
+
+# Per shell: how to launch it non-interactively reading commands from stdin,
+# how to quote a command, and how to wrap it so it reports its exit status on
+# a sentinel line. Commands go through eval/Invoke-Expression as a single
+# quoted argument, so an unbalanced quote in one command is a syntax error for
+# that command instead of swallowing the rest of the session's input.
+POSIX_TEMPLATE = (
+    "eval {cmd} < /dev/null\n"
+    "__termai_rc=$?\n"
+    "printf '\\n{marker}:%s\\n' \"$__termai_rc\"\n"
+    "printf '\\n{marker}\\n' >&2\n"
+)
+
+SHELLS = {
+    "bash": (["bash", "--noprofile", "--norc", "-s"], POSIX_TEMPLATE, shlex.quote),
+    "zsh": (["zsh", "-f", "-s"], POSIX_TEMPLATE, shlex.quote),
+    "sh": (["sh", "-s"], POSIX_TEMPLATE, shlex.quote),
+    "powershell": (
+        ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"],
+        "$global:LASTEXITCODE = 0\n"
+        "try {{ Invoke-Expression {cmd}; $c = if ($?) {{ $global:LASTEXITCODE }} else {{ 1 }} }} catch {{ Write-Error $_; $c = 1 }}\n"
+        "Write-Output \"`n{marker}:$c\"\n"
+        "[Console]::Error.WriteLine(\"`n{marker}\")\n",
+        _quote_powershell,
+    ),
+}
+
+
+def session_supported(shell: str) -> bool:
+    """Whether a persistent session can be used for the detected shell."""
+    return shell in SHELLS and shutil.which(SHELLS[shell][0][0]) is not None
+
+
+class ShellSession:
+    """One long-lived shell process that runs commands in sequence and keeps its state.
+
+    Each command is followed by a sentinel line carrying its exit status, so
+    `cd`, exported variables, `source`d files and activated virtualenvs carry
+    over between steps without paying shell startup for every command.
+    """
+
+    def __init__(self, shell: str, cwd: Optional[str] = None):
+        if shell not in SHELLS:
+            raise SessionError(f"Persistent sessions are not supported for {shell}")
+        self.shell = shell
+        argv, self._template, self._quote = SHELLS[shell]
+        self._marker = f"__TERMAI_DONE_{uuid.uuid4().hex}"
+        self._process = subprocess.Popen(
+            argv,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._lines: "queue.Queue" = queue.Queue(maxsize=QUEUE_LINES)
+        for pipe, name in ((self._process.stdout, "stdout"), (self._process.stderr, "stderr")):
+            threading.Thread(target=_pump, args=(pipe, name, self._lines), daemon=True).start()
+
+    def run(self, cmd: str, on_line: Optional[Callable[[str, str], None]] = None,
+            tail_lines: int = TAIL_LINES) -> CommandResult:
+        """Send one command to the shell and stream its output until the sentinel arrives."""
+        if self._process.poll() is not None:
+            raise SessionError(f"{self.shell} session exited with status {self._process.returncode}")
+
+        started = time.perf_counter()
+        script = self._template.format(cmd=self._quote(cmd), marker=self._marker)
+        try:
+            self._process.stdin.write(script.encode("utf-8"))
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise SessionError(f"{self.shell} session is not accepting input: {e}")
+
+        tails = {"stdout": deque(maxlen=tail_lines), "stderr": deque(maxlen=tail_lines)}
+        total = 0
+        returncode = None
+        # The sentinels are written to both streams, each preceded by a newline
+        # in case the command's output didn't end with one; blank lines are held
+        # back until we know whether a sentinel follows them.
+        pending_blank = {"stdout": False, "stderr": False}
+        done = {"stdout": False, "stderr": False}
+        while not (done["stdout"] and done["stderr"]):
+            stream, line = self._lines.get()
+            if line is None:
+                raise SessionError(f"{self.shell} session exited while running: {cmd}")
+            if line.startswith(self._marker):
+                done[stream] = True
+                pending_blank[stream] = False
+                if stream == "stdout":
+                    returncode = int(line.rsplit(":", 1)[1] or 1)
+                continue
+            if pending_blank[stream]:
+                self._emit(stream, "", tails, on_line)
+                total += 1
+                pending_blank[stream] = False
+            if line == "":
+                pending_blank[stream] = True
+                continue
+            self._emit(stream, line, tails, on_line)
+            total += 1
+
+        kept = len(tails["stdout"]) + len(tails["stderr"])
+        return CommandResult(
+            cmd,
+            returncode,
+            list(tails["stdout"]),
+            list(tails["stderr"]),
+            time.perf_counter() - started,
+            dropped_lines=max(total - kept, 0),
+        )
+
+    @staticmethod
+    def _emit(stream, line, tails, on_line) -> None:
+        tails[stream].append(line[:MAX_LINE_BYTES])
+        if on_line is not None:
+            on_line(stream, line)
+
+    def cwd(self) -> Optional[str]:
+        """Best-effort working directory of the shell (Linux only)."""
+        try:
+            return os.readlink(f"/proc/{self._process.pid}/cwd")
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        if self._process.poll() is None:
+            try:
+                self._process.stdin.write(b"exit\n")
+                self._process.stdin.close()
+                self._process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+                self._process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
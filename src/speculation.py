@@ -0,0 +1,309 @@
+"""Speculative execution of read-only plans while the user confirms.
+
+`termai run -e` shows the commands and waits for "y". When every command
+in the plan provably only reads (`ls`, `df -h`, `docker ps`, `git status`,
+hardware queries, ...), it is started in the background straight away with
+its output buffered; "y" replays the buffer, and anything still running
+carries on live, so inspection queries appear to finish instantly. "n"
+kills the commands and drops the output.
+
+The classifier is deliberately conservative: a command must pass
+`validate_command` and then consist only of allowlisted programs (with
+subcommand and flag checks for the likes of git, docker and find), with no
+redirections other than to /dev/null, no background jobs, substitutions,
+variable assignments, line breaks or `cd`. Filters such as `grep` or `head` must be given
+a file or read from a pipe, since speculative commands get no terminal
+input. Anything else simply runs after confirmation as before.
+"""
+import os
+import re
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, Iterator, List, Optional
+
+from src.utils import validate_command
+
+MAX_BUFFER_BYTES = int(os.getenv("TERMAI_SPECULATE_MAX_BYTES", 1024 * 1024))
+
+READ_ONLY = {
+    # files and directories
+    "ls", "dir", "pwd", "tree", "stat", "file", "du", "df", "realpath", "readlink", "basename", "dirname",
+    "find", "locate", "which", "whereis", "type",
+    # system and hardware
+    "whoami", "id", "groups", "uname", "uptime", "free", "nproc", "lscpu", "lsblk", "lsusb", "lspci",
+    "lsmem", "vm_stat", "sw_vers", "system_profiler", "arch", "getconf", "w", "who", "date",
+    # processes and network
+    "ps", "pgrep", "lsof", "ss", "netstat",
+    # text
+    "echo", "printf", "printenv", "cat", "head", "tail", "wc", "grep", "egrep", "fgrep", "rg", "sort",
+    "uniq", "cut", "tr", "nl", "column", "jq",
+    # Windows
+    "get-childitem", "gci", "get-process", "gps", "get-service", "get-psdrive", "get-volume", "get-disk",
+    "get-computerinfo", "get-ciminstance", "get-wmiobject", "get-netipaddress", "get-nettcpconnection",
+    "get-location", "get-content", "get-item", "get-date", "format-table", "ft", "format-list", "fl",
+    "select-object", "select", "sort-object", "measure-object", "out-string", "systeminfo", "tasklist",
+    "ver", "where", "hostname", "ipconfig", "sysctl", "wmic", "journalctl",
+}
+# Programs whose subcommands decide whether they write. A nested dict names
+# the allowed next word; None allows any remaining arguments.
+SUBCOMMANDS = {
+    "git": {
+        "status": None, "log": None, "diff": None, "show": None, "ls-files": None, "blame": None,
+        "shortlog": None, "describe": None, "rev-parse": None, "branch": None, "remote": None, "tag": None,
+        "config": None,
+    },
+    "docker": {
+        "ps": None, "images": None, "version": None, "info": None, "inspect": None, "logs": None,
+        "stats": None, "top": None, "port": None, "history": None,
+        "image": {"ls": None, "list": None, "inspect": None, "history": None},
+        "container": {"ls": None, "list": None, "inspect": None, "logs": None, "top": None, "port": None},
+        "network": {"ls": None, "inspect": None},
+        "volume": {"ls": None, "inspect": None},
+        "system": {"df": None, "info": None},
+        "compose": {"ps": None, "ls": None, "config": None, "logs": None, "images": None, "top": None},
+    },
+    "kubectl": {
+        "get": None, "describe": None, "version": None, "top": None, "logs": None, "explain": None,
+        "api-resources": None, "cluster-info": None,
+        "config": {"view": None, "get-contexts": None, "current-context": None},
+    },
+    "systemctl": {
+        "status": None, "list-units": None, "list-unit-files": None, "list-timers": None, "is-active": None,
+        "is-enabled": None, "is-failed": None, "show": None,
+    },
+    "npm": {"ls": None, "list": None, "view": None, "outdated": None},
+    "pip": {"list": None, "show": None, "freeze": None, "check": None},
+    "pip3": {"list": None, "show": None, "freeze": None, "check": None},
+    "brew": {"list": None, "info": None, "outdated": None, "config": None},
+    "apt": {"list": None, "show": None, "policy": None},
+    "apt-cache": {"search": None, "show": None, "policy": None},
+    "ip": {
+        name: {"": None, "show": None, "list": None}
+        for name in ("a", "addr", "address", "r", "route", "l", "link", "n", "neigh")
+    },
+}
+# Arguments that make an otherwise read-only command write, or never finish
+DENIED_ARGS = {
+    "find": {"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls"},
+    "tail": {"-f", "-F", "--follow", "--retry"},
+    "journalctl": {"-f", "--follow", "--rotate", "--flush", "--vacuum-size", "--vacuum-time", "--vacuum-files"},
+    "sort": {"-o", "--output"},
+    "tree": {"-o"},
+    "date": {"-s", "--set"},
+    "sysctl": {"-w", "--write", "-p", "--load", "--system"},
+    "get-content": {"-wait", "-tail"},
+    "git": {"--output", "--set-upstream-to", "--unset-upstream", "--edit-description", "-e", "--edit"},
+    "docker": {"-f", "--follow"},
+    "kubectl": {"-f", "--follow", "-w", "--watch"},
+}
+# Programs that only take flags: a positional argument changes state
+# (`hostname box`, `ipconfig /release`)
+NO_POSITIONAL = {"hostname", "uname", "whoami", "nproc", "free", "uptime", "lscpu", "arch", "vm_stat", "sw_vers",
+                 "systeminfo", "ver", "ipconfig"}
+# Positional arguments a filter needs to read a file rather than stdin
+FILE_ARGS = {"cat": 1, "head": 1, "tail": 1, "wc": 1, "sort": 1, "uniq": 1, "cut": 1, "nl": 1, "column": 1,
+             "jq": 2, "grep": 2, "egrep": 2, "fgrep": 2, "rg": 2, "tr": None}
+# Flags of those filters that take the next word as their value
+VALUE_FLAGS = {"-n", "-c", "-e", "-f", "-m", "-A", "-B", "-C", "-k", "-t", "-d", "-s", "-w", "-g", "--max-count",
+               "--regexp", "--file", "--glob", "--type", "-T"}
+VERSION_ARGS = (["--version"], ["-v"], ["-V"], ["version"])
+VERSION_PROGRAMS = {"node", "npm", "python", "python3", "pip", "pip3", "go", "java", "rustc", "cargo", "docker",
+                    "git", "kubectl", "gcc", "clang", "make", "ruby", "php", "dotnet", "terraform", "deno", "bun"}
+ALLOWED_OPERATORS = {";", "&&", "||", "|", "|&", "(", ")"}
+
+# Redirections that write nowhere: fd duplication and /dev/null
+HARMLESS_REDIRECT_RE = re.compile(r"(?<!\S)\d?>&[12](?!\S)|(?<!\S)\d?>>?\s*/dev/null(?!\S)")
+
+
+def _flag_forms(arg: str) -> set:
+    forms = {arg.split("=", 1)[0].lower() if arg.startswith("--") else arg}
+    if arg.startswith("-") and not arg.startswith("--"):
+        forms.update(f"-{c}" for c in arg[1:] if c.isalpha())
+        forms.add(arg.lower())
+    return forms
+
+
+def _subcommand_ok(tree: dict, args: List[str]) -> bool:
+    positional = [arg for arg in args if not arg.startswith("-")]
+    if not positional:
+        return "" in tree
+    if positional[0] not in tree:
+        return False
+    rest = tree[positional[0]]
+    return rest is None or _subcommand_ok(rest, args[args.index(positional[0]) + 1:])
+
+
+def _reads_file(program: str, args: List[str]) -> bool:
+    """Whether a filter is given enough positional arguments to read files instead of stdin."""
+    needed = FILE_ARGS[program]
+    if needed is None:
+        return False
+    positional, skip = 0, False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in VALUE_FLAGS:
+            skip = True
+        elif not arg.startswith("-"):
+            positional += 1
+    if program in ("grep", "egrep", "fgrep") and any({"-r", "-R", "--recursive"} & _flag_forms(arg) for arg in args):
+        positional += 1
+    return positional >= needed
+
+
+def _command_read_only(words: List[str], piped: bool) -> bool:
+    program, args = words[0].lower(), words[1:]
+    if "/" in program or "\\" in program or "=" in program:
+        # Scripts, explicit paths and variable assignments
+        return False
+    if program in VERSION_PROGRAMS and args in VERSION_ARGS:
+        return True
+    if program not in READ_ONLY and program not in SUBCOMMANDS:
+        return False
+    denied = DENIED_ARGS.get(program, set())
+    if any(_flag_forms(arg) & denied for arg in args):
+        return False
+    if program in SUBCOMMANDS and not _subcommand_ok(SUBCOMMANDS[program], args):
+        return False
+    if program in NO_POSITIONAL and any(not arg.startswith("-") and arg.lower() != "/all" for arg in args):
+        return False
+    if program in FILE_ARGS and not piped and not _reads_file(program, args):
+        return False
+    if program == "date" and any(not arg.startswith(("-", "+")) for arg in args):
+        return False
+    if program == "sysctl" and any("=" in arg for arg in args):
+        return False
+    if program == "wmic" and ({"call", "set", "delete", "create"} & {arg.lower() for arg in args}
+                              or not {"get", "list"} & {arg.lower() for arg in args}):
+        return False
+    if program == "git" and args[:1] in (["branch"], ["tag"], ["remote"]) and any(
+            not arg.startswith("-") for arg in args[1:]):
+        # `git branch name`, `git tag v1`, `git remote add` create things
+        return False
+    if program == "git" and args[:1] == ["config"] and not {"--get", "--get-all", "--get-regexp", "--list", "-l"} & set(args):
+        return False
+    if program == "uniq" and sum(not arg.startswith("-") for arg in args) > 1:
+        # The second operand is an output file
+        return False
+    return True
+
+
+def is_read_only(command: str, shell: Optional[str] = None) -> bool:
+    """Whether a command line provably only reads; False when in any doubt."""
+    from src.validation import tokenize
+
+    if "\n" in command or "\r" in command:
+        # Each line is a command of its own; multi-line plans always wait for confirmation
+        return False
+    if not validate_command(command, shell) or "$(" in command or "`" in command:
+        return False
+    tokens = tokenize(HARMLESS_REDIRECT_RE.sub(" ", command), shell)
+    if not tokens:
+        return False
+    words: List[str] = []
+    piped = False
+    for token in tokens + [";"]:
+        if token in ALLOWED_OPERATORS:
+            if words and not _command_read_only(words, piped):
+                return False
+            piped = token in ("|", "|&")
+            words = []
+        elif token in ("&", ";;") or "<" in token or ">" in token:
+            return False
+        else:
+            words.append(token)
+    return True
+
+
+class Speculation:
+    """Commands running ahead of confirmation, their output held in a bounded buffer.
+
+    Buffered output beyond `max_bytes` cancels the run, and the commands are
+    then simply executed again after confirmation.
+    """
+
+    def __init__(self, commands: List[str], shell: str, max_bytes: int = MAX_BUFFER_BYTES):
+        self.commands = commands
+        self.shell = shell
+        self.max_bytes = max_bytes
+        self.overflowed = False
+        self._events = deque()
+        self._bytes = 0
+        self._taken = False
+        self._cancel = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _push(self, event: tuple, size: int = 0) -> None:
+        with self._cond:
+            self._events.append(event)
+            self._bytes += size
+            if not self._taken and self._bytes > self.max_bytes and not self.overflowed:
+                self.overflowed = True
+                self._cancel.set()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        from src.executor import stream_command
+
+        try:
+            for cmd in self.commands:
+                if self._cancel.is_set():
+                    break
+                result = stream_command(
+                    cmd.strip(), self.shell, stdin=subprocess.DEVNULL, cancel=self._cancel,
+                    on_line=lambda stream, line: self._push(("line", stream, line), len(line) + 1),
+                )
+                self._push(("done", result))
+                if not result.ok:
+                    break
+        finally:
+            self._push(("end",))
+
+    def take(self, on_line: Callable[[str, str], None]) -> Optional[Iterator]:
+        """Claim the output: an iterator that replays each command's lines through `on_line` and yields its result.
+
+        Returns None if the buffer overflowed, in which case nothing was shown.
+        """
+        with self._cond:
+            if self.overflowed:
+                return None
+            self._taken = True
+        return self._replay(on_line)
+
+    def _replay(self, on_line: Callable[[str, str], None]) -> Iterator:
+        while True:
+            with self._cond:
+                while not self._events:
+                    self._cond.wait()
+                event = self._events.popleft()
+            if event[0] == "line":
+                on_line(event[1], event[2])
+            elif event[0] == "done":
+                yield event[1]
+            else:
+                return
+
+    def discard(self) -> None:
+        """Kill whatever is still running; the buffered output is dropped."""
+        self._cancel.set()
+
+
+def enabled() -> bool:
+    return os.getenv("TERMAI_SPECULATE", "1") != "0"
+
+
+def speculate(commands: List[str], shell: str) -> Optional[Speculation]:
+    """Start running a plan if every command in it is read-only; None otherwise."""
+    if not enabled() or not commands or any(cmd.strip().lower().startswith("cd ") for cmd in commands):
+        return None
+    if not all(is_read_only(cmd.strip(), shell) for cmd in commands):
+        return None
+    from src.executor import needs_terminal
+
+    if any(needs_terminal(cmd.strip(), shell) for cmd in commands):
+        # Those run on the terminal after confirmation, which the replay can't stand in for
+        return None
+    return Speculation(commands, shell)
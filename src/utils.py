@@ -1,40 +1,126 @@
 import os
 import platform
-import subprocess
+from typing import Optional
 
+from src import profiling
+
+
+def validate_command(command: str, shell: Optional[str] = None):
+    """Safety validation of the generated command.
+
+    Returns a `Verdict` that is truthy when the command is allowed and
+    otherwise names the rule and token that blocked it.
+    """
+    from src.validation import check_command
+    return check_command(command, shell)
+
+def termai_home() -> str:
+    """Return the per-user TermAI data directory, creating it if needed."""
+    path = os.getenv("TERMAI_HOME") or os.path.join(os.path.expanduser("~"), ".termai")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+PROFILE_VERSION = 1
+
+# Tools worth telling the backend about; looked up on PATH without running them
+KNOWN_TOOLS = [
+    "git", "docker", "podman", "kubectl", "helm", "node", "npm", "npx", "yarn", "pnpm", "python", "python3",
+    "pip", "go", "cargo", "java", "dotnet", "flutter", "brew", "apt", "dnf", "pacman", "winget", "choco",
+    "psql", "mysql", "redis-cli", "terraform", "aws", "gcloud", "az",
+]
+
+
+def _environment_fingerprint() -> str:
+    """Hash of everything the probe depends on; a change invalidates the saved profile."""
+    import hashlib
+    parts = [
+        str(PROFILE_VERSION),
+        platform.system(),
+        platform.release(),
+        os.environ.get("SHELL", ""),
+        os.environ.get("PATH", ""),
+        os.environ.get("PSModulePath", ""),
+        os.environ.get("TERMAI_SHELL", ""),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _probe_shell() -> str:
+    override = os.environ.get("TERMAI_SHELL")
+    if override:
+        return override.lower()
+    if platform.system().lower() == "windows":
+        # PowerShell prepends the per-user module directory to PSModulePath,
+        # so inside PowerShell it has three or more entries; cmd.exe only
+        # inherits the system-wide ones.
+        module_path = os.environ.get("PSModulePath", "")
+        if len([p for p in module_path.split(os.pathsep) if p]) >= 3:
+            return "powershell"
+        return "cmd"
+    # Check for bash/other shells on Unix
+    shell = os.environ.get('SHELL', '')
+    if 'bash' in shell.lower():
+        return "bash"
+    elif 'zsh' in shell.lower():
+        return "zsh"
+    return "sh"  # default to sh
+
+
+def _probe_environment(fingerprint: str) -> dict:
+    import shutil
+    return {
+        "fingerprint": fingerprint,
+        "shell": _probe_shell(),
+        "shell_path": os.environ.get("SHELL") or os.environ.get("COMSPEC"),
+        "os": platform.system().lower(),
+        "os_release": platform.release(),
+        "machine": platform.machine(),
+        "tools": [tool for tool in KNOWN_TOOLS if shutil.which(tool)],
+    }
+
+
+_environment = None
+
+
+def _load_environment() -> tuple:
+    """Return (profile, reused) from ~/.termai/profile.json, probing again when it is stale."""
+    import json
+    fingerprint = _environment_fingerprint()
+    path = os.path.join(termai_home(), "profile.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+        if profile.get("fingerprint") == fingerprint:
+            return profile, True
+    except (OSError, ValueError):
+        pass
+
+    profile = _probe_environment(fingerprint)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+    except OSError:
+        pass
+    return profile, False
+
+
+def detect_environment() -> dict:
+    """Shell, OS and available tools, probed once and cached in ~/.termai/profile.json.
+
+    The saved profile is reused until $SHELL, PATH or the OS changes, so
+    repeat invocations run no subprocesses and do no PATH lookups.
+    """
+    global _environment
+    if _environment is None:
+        with profiling.span("detect environment", "detect") as current:
+            _environment, reused = _load_environment()
+            current.set(profile="reused" if reused else "probed")
+    return _environment
 
-def validate_command(command: str) -> bool:
-    """Basic safety validation of the generated command."""
-    dangerous_commands = ['rm -rf', 'mkfs', ':(){:|:&};:', '> /dev/sda',
-                        'dd if=/dev/zero', 'chmod -R 777', '$(', '`',
-                        'eval', 'exec', 'del /f', 'deltree']
-    
-    return not any(dangerous in command.lower() for dangerous in dangerous_commands)
 
 def detect_shell() -> str:
     """Detect which shell is being used."""
-    if platform.system().lower() == "windows":
-        # Check if PowerShell is being used
-        try:
-            result = subprocess.run(
-                ['echo', '$PSVersionTable'],
-                shell=True,
-                text=True,
-                capture_output=True
-            )
-            if result.returncode == 0 and 'PSVersion' in result.stdout:
-                return "powershell"
-            return "cmd"
-        except:
-            return "cmd"
-    else:
-        # Check for bash/other shells on Unix
-        shell = os.environ.get('SHELL', '')
-        if 'bash' in shell.lower():
-            return "bash"
-        elif 'zsh' in shell.lower():
-            return "zsh"
-        return "sh"  # default to sh
+    return detect_environment()["shell"]
 
 
 # def split_commands(command_string: str) -> List[str]:
@@ -0,0 +1,372 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Rules are data so they can be extended or disabled from a policy file.
+# Kinds:
+#   regex    - matched against the raw command text (all regex rules are
+#              compiled into one alternation)
+#   programs - the program of any simple command in the line is one of these
+#   flags    - with `programs`: every group in `flags` has a member present
+#              ("-r" short flag, "--recursive" long flag, "-recurse"
+#              PowerShell parameter, "/s" cmd.exe switch)
+#   args     - with `programs`: any argument matches this regex
+DEFAULT_RULES: List[dict] = [
+    {"id": "fork-bomb", "regex": r":\s*\(\s*\)\s*\{\s*:\s*\|\s*:\s*&\s*\}\s*;\s*:", "description": "fork bomb"},
+    {"id": "block-device-write", "regex": r">\s*/dev/(?:sd|hd|vd|xvd|nvme|mmcblk|disk)\w*", "description": "redirect onto a block device"},
+    {"id": "pipe-to-shell", "regex": r"\|\s*(?:sudo\s+)?(?:ba|z|da|k)?sh\b", "description": "piping downloaded content into a shell"},
+    {"id": "pipe-to-iex", "regex": r"\|\s*(?i:iex|invoke-expression)\b", "description": "piping content into Invoke-Expression"},
+    {"id": "rm-recursive-force", "programs": ["rm"], "flags": [["-r", "-R", "--recursive"], ["-f", "--force"]],
+     "description": "recursive forced delete"},
+    {"id": "remove-item-recurse-force", "programs": ["remove-item", "ri", "rm", "rmdir", "del", "erase", "rd"],
+     "flags": [["-recurse"], ["-force"]], "description": "recursive forced delete"},
+    {"id": "del-force", "programs": ["del", "erase"], "flags": [["/f", "/s"]], "description": "forced or recursive delete"},
+    {"id": "rd-recursive", "programs": ["rd", "rmdir"], "flags": [["/s"]], "description": "recursive directory removal"},
+    {"id": "chmod-777-recursive", "programs": ["chmod"], "flags": [["-R", "--recursive"]], "args": r"^0?777$",
+     "description": "recursive world-writable permissions"},
+    {"id": "dd-device", "programs": ["dd"], "args": r"^(?:if=/dev/(?:zero|u?random)|of=/dev/)",
+     "description": "dd from a zero/random device or onto a device"},
+    {"id": "mkfs", "programs": ["mkfs", "mke2fs", "mkswap", "wipefs", "format", "format-volume", "clear-disk", "diskpart"],
+     "description": "formats a filesystem"},
+    {"id": "privilege-escalation", "programs": ["sudo", "su", "doas", "pkexec", "runas"],
+     "description": "runs with elevated privileges"},
+    {"id": "dynamic-eval", "programs": ["eval", "exec", "iex", "invoke-expression"],
+     "description": "evaluates dynamically built code"},
+    {"id": "power-state", "programs": ["shutdown", "reboot", "halt", "poweroff", "init", "stop-computer", "restart-computer"],
+     "description": "changes the machine's power state"},
+    {"id": "deltree", "programs": ["deltree"], "description": "recursive delete"},
+]
+
+SEPARATORS = {";", "&&", "||", "|", "&", "\n", ";;", "|&", "(", ")", "{", "}"}
+
+# A word is a run of escaped chars, plain chars and quoted strings; anything
+# else is a control operator. Much faster than shlex for this purpose.
+# Newlines separate commands, so only blanks (and backslash-newline line
+# continuations) are skipped between tokens.
+TOKEN_RE = re.compile(
+    r"""(?:[ \t\r\f\v]|\\\n)*(?:((?:\\.|[^\s'"&|;()\\]+|'[^']*'|"(?:[^"\\]|\\.)*")+)|(&&|\|\||;;|\|&|[;&|()\n]))"""
+)
+# Escapes, and quoted strings whose contents are kept as they are (apart
+# from escapes inside double quotes), so nested quotes survive for `bash -c`
+QUOTES_RE = re.compile(r"""\\.|'[^']*'|"(?:[^"\\]|\\.)*["]""")
+ESCAPE_RE = re.compile(r"\\(.)")
+# PowerShell escapes with a backtick; a backslash is an ordinary path character
+PS_TOKEN_RE = re.compile(
+    r"""(?:[ \t\r\f\v]|`\n)*(?:((?:`.|[^\s'"&|;()`]+|'[^']*'|"(?:[^"`]|`.)*")+)|(&&|\|\||\|&|[;&|()\n]))"""
+)
+PS_QUOTES_RE = re.compile(r"""`.|'[^']*'|"(?:[^"`]|`.)*["]""")
+PS_ESCAPE_RE = re.compile(r"`(.)")
+# cmd.exe only knows double quotes and ^ escapes
+CMD_TOKEN_RE = re.compile(
+    r"""(?:[ \t\r\f\v]|\^\n)*(?:((?:\^.|[^\s"&|()^]+|"[^"]*")+)|(&&|\|\||[&|()\n]))"""
+)
+CMD_QUOTES_RE = re.compile(r'\^.|"[^"]*"')
+DIALECTS = {
+    "powershell": (PS_TOKEN_RE, PS_QUOTES_RE, PS_ESCAPE_RE),
+    "pwsh": (PS_TOKEN_RE, PS_QUOTES_RE, PS_ESCAPE_RE),
+    "cmd": (CMD_TOKEN_RE, CMD_QUOTES_RE, None),
+}
+# Escapes and single-quoted strings are consumed so only live `$(` / backticks match
+SUBSTITUTION_RE = re.compile(r"\\.|'[^']*'|(\$\(|`)")
+PS_SUBSTITUTION_RE = re.compile(r"'[^']*'|(\$\()")
+
+# Programs that run their arguments as another command
+WRAPPERS = {"env", "nohup", "time", "nice", "ionice", "command", "builtin", "xargs", "timeout", "stdbuf", "watch",
+            "busybox"}
+FIND_EXEC = {"-exec", "-execdir", "-ok", "-okdir"}
+# Shells whose command-string argument is validated as a command line of its own
+POSIX_SHELLS = {"sh", "bash", "zsh", "dash", "ksh", "ash", "fish"}
+POWERSHELLS = {"powershell", "pwsh"}
+# PowerShell host parameters that take a value (full names; any prefix is accepted)
+PS_VALUE_PARAMS = ["-executionpolicy", "-windowstyle", "-inputformat", "-outputformat", "-configurationname",
+                   "-psconsolefile", "-version", "-workingdirectory", "-settingsfile", "-ep", "-wd"]
+
+
+class Verdict:
+    """Result of validating a command; truthy when the command is allowed."""
+
+    def __init__(self, allowed: bool, rule: Optional[str] = None, token: Optional[str] = None,
+                 description: Optional[str] = None):
+        self.allowed = allowed
+        self.rule = rule
+        self.token = token
+        self.description = description
+
+    def __bool__(self) -> bool:
+        return self.allowed
+
+    @property
+    def reason(self) -> str:
+        if self.allowed:
+            return "allowed"
+        reason = f"{self.rule}: {self.description}" if self.description else str(self.rule)
+        return f"{reason} (at '{self.token}')" if self.token else reason
+
+    def to_dict(self) -> dict:
+        return {"allowed": self.allowed, "rule": self.rule, "token": self.token, "description": self.description}
+
+    def __repr__(self) -> str:
+        return f"Verdict({self.reason})"
+
+
+ALLOWED = Verdict(True)
+
+
+def _program_name(token: str) -> str:
+    name = re.split(r"[\\/]", token)[-1].lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+
+def _flag_forms(token: str) -> set:
+    """All flag spellings a token could stand for, e.g. -rf -> {-r, -f, -rf}."""
+    forms = set()
+    if token.startswith("--"):
+        forms.add(token.split("=", 1)[0].lower())
+    elif token.startswith("-") and len(token) > 1:
+        forms.add(token.lower())
+        forms.update(f"-{c}" for c in token[1:] if c.isalpha())
+    elif token.startswith("/") and 1 < len(token) <= 3:
+        forms.add(token.lower())
+    return forms
+
+
+def _tokenize(command: str, shell: Optional[str] = None) -> Optional[List[str]]:
+    """Split a command line into unquoted words and control operators; None if quotes don't balance.
+
+    Quoting and escapes follow the shell: POSIX backslashes, PowerShell
+    backticks, cmd.exe carets.
+    """
+    token_re, quotes_re, escape_re = DIALECTS.get(shell, (TOKEN_RE, QUOTES_RE, ESCAPE_RE))
+
+    def unquote(match):
+        text = match.group(0)
+        if text[0] == "'" or (text[0] == '"' and escape_re is None):
+            return text[1:-1]
+        if text[0] == '"':
+            return escape_re.sub(r"\1", text[1:-1])
+        return text[1]
+
+    tokens = []
+    pos = 0
+    end = len(command.rstrip())
+    while pos < end:
+        match = token_re.match(command, pos)
+        if not match or match.end() == pos:
+            return None
+        word, operator = match.groups()
+        tokens.append(quotes_re.sub(unquote, word) if word is not None else operator)
+        pos = match.end()
+    return tokens
+
+
+def tokenize(command: str, shell: Optional[str] = None) -> Optional[List[str]]:
+    """Words (quotes removed) and control operators of a command line, as the validator sees them."""
+    return _tokenize(command, shell)
+
+
+def _simple_commands(tokens: List[str]) -> Iterable[List[str]]:
+    """Split a token stream into simple commands at control operators."""
+    current: List[str] = []
+    for token in tokens:
+        if token in SEPARATORS:
+            if current:
+                yield current
+            current = []
+        else:
+            current.append(token)
+    if current:
+        yield current
+
+
+def _programs(words: List[str]) -> Iterable[tuple]:
+    """Yield (program, args) for a simple command and any command it wraps."""
+    i = 0
+    # Leading variable assignments (FOO=bar cmd)
+    while i < len(words) and re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", words[i]):
+        i += 1
+    while i < len(words):
+        program = _program_name(words[i])
+        args = words[i + 1:]
+        yield program, args
+        if program in WRAPPERS:
+            # Skip the wrapper's own options/assignments to find the wrapped program
+            i += 1
+            while i < len(words) and (words[i].startswith("-") or "=" in words[i] or re.match(r"^\d+[smhd]?$", words[i])):
+                i += 1
+            continue
+        for j, arg in enumerate(args):
+            if arg in FIND_EXEC and j + 1 < len(args):
+                yield from _programs(args[j + 1:])
+                break
+        return
+
+
+def _shell_payload(program: str, args: List[str]) -> Optional[tuple]:
+    """The (command string, shell) a shell invocation runs: `bash -c "..."`, `powershell -Command ...`, `cmd /c ...`."""
+    if program in POSIX_SHELLS:
+        skip = False
+        for i, arg in enumerate(args):
+            if skip:
+                skip = False
+            elif arg in ("-o", "+o", "-O", "+O"):
+                skip = True
+            elif arg.startswith("-") and not arg.startswith("--") and "c" in arg[1:]:
+                return (args[i + 1], "bash") if i + 1 < len(args) else None
+            elif not arg.startswith(("-", "+")):
+                return None
+    elif program in POWERSHELLS:
+        skip = False
+        for i, arg in enumerate(args):
+            name = arg.lower()
+            if skip:
+                skip = False
+            elif len(name) > 1 and "-command".startswith(name):
+                return " ".join(args[i + 1:]), "powershell"
+            elif len(name) > 2 and "-file".startswith(name):
+                return None
+            elif any(len(name) > 2 and param.startswith(name) for param in PS_VALUE_PARAMS):
+                skip = True
+            elif not name.startswith("-"):
+                # A bare argument starts the command
+                return " ".join(args[i:]), "powershell"
+    elif program == "cmd":
+        for i, arg in enumerate(args):
+            if arg.lower() in ("/c", "/k", "/r"):
+                return " ".join(args[i + 1:]), "cmd"
+    return None
+
+
+def _encoded_command(program: str, args: List[str]) -> Optional[str]:
+    """A PowerShell -EncodedCommand argument, whose payload can't be inspected."""
+    if program in POWERSHELLS:
+        for arg in args:
+            name = arg.lower()
+            if len(name) > 2 and ("-encodedcommand".startswith(name) or name == "-ec"):
+                return arg
+            if not name.startswith("-"):
+                break
+    return None
+
+
+def _has_substitution(command: str, powershell: bool) -> Optional[str]:
+    """Find `$(` or a backtick outside single quotes."""
+    if "$(" not in command and "`" not in command:
+        return None
+    pattern = PS_SUBSTITUTION_RE if powershell else SUBSTITUTION_RE
+    for match in pattern.finditer(command):
+        if match.group(1):
+            return match.group(1)
+    return None
+
+
+class Validator:
+    """Rule set compiled once: one combined regex plus a program -> rules index."""
+
+    def __init__(self, rules: List[dict], substitution: bool = True):
+        self.rules = rules
+        self.substitution = substitution
+        patterns = []
+        self._regex_rules: Dict[str, dict] = {}
+        self._program_rules: Dict[str, List[dict]] = {}
+        for index, rule in enumerate(rules):
+            if "regex" in rule:
+                group = f"r{index}"
+                patterns.append(f"(?P<{group}>{rule['regex']})")
+                self._regex_rules[group] = rule
+            for program in rule.get("programs", []):
+                compiled = dict(rule)
+                if isinstance(rule.get("args"), str):
+                    compiled["args_re"] = re.compile(rule["args"])
+                compiled["flag_groups"] = [{f if f.startswith("-") and len(f) == 2 else f.lower() for f in group}
+                                           for group in rule.get("flags", [])]
+                self._program_rules.setdefault(program.lower(), []).append(compiled)
+        self._combined = re.compile("|".join(patterns)) if patterns else None
+
+    def check(self, command: str, shell: Optional[str] = None) -> Verdict:
+        if self._combined is not None:
+            match = self._combined.search(command)
+            if match:
+                rule = self._regex_rules[match.lastgroup]
+                return Verdict(False, rule["id"], match.group(0), rule.get("description"))
+
+        powershell = shell in POWERSHELLS
+        if self.substitution:
+            found = _has_substitution(command, powershell)
+            if found:
+                return Verdict(False, "command-substitution", found, "runs a dynamically built command")
+
+        tokens = _tokenize(command, shell)
+        if tokens is None:
+            return Verdict(False, "unparseable", None, "unbalanced quotes")
+
+        for words in _simple_commands(tokens):
+            for program, args in _programs(words):
+                # mkfs.ext4 and friends are looked up as mkfs too
+                base = program.split(".", 1)[0]
+                rules = self._program_rules.get(program, [])
+                if base and base != program:
+                    rules = rules + self._program_rules.get(base, [])
+                for rule in rules:
+                    verdict = self._match_rule(rule, program, args, powershell)
+                    if verdict is not None:
+                        return verdict
+                encoded = _encoded_command(program, args)
+                if encoded is not None:
+                    return Verdict(False, "encoded-command", encoded, "runs a command that can't be inspected")
+                payload = _shell_payload(program, args)
+                if payload is not None:
+                    # The payload is shorter than the line, so this terminates
+                    verdict = self.check(*payload)
+                    if not verdict:
+                        return verdict
+        return ALLOWED
+
+    @staticmethod
+    def _match_rule(rule: dict, program: str, args: List[str], powershell: bool = False) -> Optional[Verdict]:
+        if rule["flag_groups"]:
+            present = set()
+            for arg in args:
+                present |= _flag_forms(arg)
+            # PowerShell accepts any prefix of a parameter name (-r, -Rec, -fo)
+            prefixes = [arg.split(":", 1)[0].lower() for arg in args
+                        if powershell and len(arg) > 1 and arg[0] == "-" and arg[1] != "-"]
+            if not all(group & present or any(flag.startswith(prefix) for flag in group for prefix in prefixes)
+                       for group in rule["flag_groups"]):
+                return None
+        if "args_re" in rule:
+            hit = next((arg for arg in args if rule["args_re"].search(arg)), None)
+            if hit is None:
+                return None
+            return Verdict(False, rule["id"], hit, rule.get("description"))
+        return Verdict(False, rule["id"], program, rule.get("description"))
+
+
+def load_policy(path: Optional[str] = None) -> dict:
+    """Read the policy file (TERMAI_POLICY or ~/.termai/policy.json) if there is one.
+
+    Format: {"disable": ["rule-id", ...], "rules": [{...}, ...], "substitution": true}
+    """
+    if path is None:
+        path = os.getenv("TERMAI_POLICY")
+        if path is None:
+            from src.utils import termai_home
+            path = os.path.join(termai_home(), "policy.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def get_validator() -> Validator:
+    policy = load_policy()
+    disabled = set(policy.get("disable", []))
+    rules = [rule for rule in DEFAULT_RULES if rule["id"] not in disabled] + policy.get("rules", [])
+    return Validator(rules, substitution="command-substitution" not in disabled and policy.get("substitution", True))
+
+
+def check_command(command: str, shell: Optional[str] = None) -> Verdict:
+    """Validate one command line against the active policy."""
+    return get_validator().check(command, shell)
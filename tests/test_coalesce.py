@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+from coalesce import SingleFlight  # noqa: E402
+from providers import FakeLLM, FakeLLMError  # noqa: E402
+
+PROMPT = '**Instruction:** "list files"'
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def collect(flight, llm, key="k"):
+    return [chunk.content async for chunk in flight.stream(key, lambda: llm.astream(PROMPT))]
+
+
+def test_do_shares_one_call():
+    async def main():
+        flight, llm = SingleFlight(), FakeLLM(latency=0.05)
+        replies = await asyncio.gather(*(flight.do("k", lambda: llm.ainvoke(PROMPT)) for _ in range(5)))
+        return flight, llm, replies
+
+    flight, llm, replies = run(main())
+    assert llm.calls == 1
+    assert len({reply.content for reply in replies}) == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_do_error_reaches_every_waiter():
+    async def main():
+        flight, llm = SingleFlight(), FakeLLM(latency=0.05, failure_rate=1.0)
+        return await asyncio.gather(*(flight.do("k", lambda: llm.ainvoke(PROMPT)) for _ in range(3)),
+                                    return_exceptions=True), llm
+
+    results, llm = run(main())
+    assert llm.calls == 1
+    assert all(isinstance(result, FakeLLMError) for result in results)
+
+
+def test_do_cancels_upstream_when_sole_waiter_leaves():
+    cancelled = []
+
+    async def upstream():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        flight = SingleFlight()
+        waiter = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        return flight
+
+    flight = run(main())
+    assert cancelled == [True]
+    assert flight.stats()["cancelled"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_do_keeps_upstream_for_remaining_waiters():
+    async def main():
+        flight, llm = SingleFlight(), FakeLLM(latency=0.05)
+        first = asyncio.ensure_future(flight.do("k", lambda: llm.ainvoke(PROMPT)))
+        second = asyncio.ensure_future(flight.do("k", lambda: llm.ainvoke(PROMPT)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return flight, await second
+
+    flight, reply = run(main())
+    assert "list files" in reply.content
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_stream_late_joiner_replays_earlier_items():
+    async def main():
+        flight, llm = SingleFlight(), FakeLLM(latency=0.1, chunk_size=4)
+        early = asyncio.ensure_future(collect(flight, llm))
+        await asyncio.sleep(0.05)
+        late = await collect(flight, llm)
+        return await early, late, llm, flight
+
+    early, late, llm, flight = run(main())
+    assert llm.calls == 1
+    assert flight.stats()["coalesced"] == 1
+    assert late == early
+    assert "list files" in "".join(early)
+
+
+def test_stream_error_reaches_every_subscriber():
+    async def main():
+        flight, llm = SingleFlight(), FakeLLM(latency=0.05, failure_rate=1.0, chunk_size=4)
+        return await asyncio.gather(collect(flight, llm), collect(flight, llm), return_exceptions=True), llm
+
+    results, llm = run(main())
+    assert llm.calls == 1
+    assert all(isinstance(result, FakeLLMError) for result in results)
+
+
+def test_stream_cancels_upstream_when_sole_subscriber_leaves():
+    closed = []
+
+    async def upstream():
+        try:
+            for n in range(100):
+                await asyncio.sleep(0.01)
+                yield n
+        finally:
+            closed.append(True)
+
+    async def main():
+        flight = SingleFlight()
+        items = flight.stream("k", upstream)
+        assert await items.__anext__() == 0
+        await items.aclose()
+        await asyncio.sleep(0.01)
+        return flight
+
+    flight = run(main())
+    assert closed == [True]
+    assert flight.stats()["cancelled"] == 1
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,30 @@
+import pytest
+
+from src.executor import needs_terminal, stream_command
+
+
+@pytest.mark.parametrize("command", [
+    "top", "htop -d 5", "vim notes.txt", "ls | less", "python", "psql mydb", "npx create-next-app my-app",
+    "npm init", "docker run -it ubuntu bash", "git commit", "apt install nginx", "git add -p", "git rebase -i HEAD~3",
+])
+def test_needs_terminal(command):
+    assert needs_terminal(command, "bash")
+
+
+@pytest.mark.parametrize("command", [
+    "ls -la", "python build.py", "psql -c 'select 1'", "npx create-next-app my-app --yes", "docker ps",
+    "git commit -m wip", "apt install -y nginx", "node -v", "php -v", "git log -p -1", "git diff --patch",
+])
+def test_pipes_output(command):
+    assert not needs_terminal(command, "bash")
+
+
+def test_stream_command_keeps_tails():
+    lines = []
+    result = stream_command("seq 5000; echo oops >&2", "bash", tail_lines=10,
+                            on_line=lambda stream, line: lines.append(line))
+    assert result.ok
+    assert len(lines) == 5001
+    assert result.stdout_tail == [str(n) for n in range(4991, 5001)]
+    assert result.stderr_tail == ["oops"]
+    assert result.dropped_lines == 4990
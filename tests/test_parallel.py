@@ -0,0 +1,31 @@
+import pytest
+
+from src.parallel import build_plan
+
+
+@pytest.mark.parametrize("commands", [
+    ["echo hi > out.txt", "wc -l < out.txt"],
+    ["mkdir a", "echo hi > a/f.txt"],
+    ["python3 -m venv .venv", ".venv/bin/pip install requests"],
+    ["git clone https://example.com/repo.git repo", "git -C repo status"],
+    ["npm install", "npx tsc"],
+    ["mkdir app", "cd app", "ls"],
+])
+def test_dependent_steps(commands, tmp_path):
+    steps = build_plan(commands, str(tmp_path))
+    assert steps[-1].deps
+
+
+@pytest.mark.parametrize("commands", [
+    ["mkdir a", "mkdir b"],
+    ["git -C repo status", "ls other"],
+    ["docker pull postgres", "pip install requests"],
+])
+def test_independent_steps(commands, tmp_path):
+    steps = build_plan(commands, str(tmp_path))
+    assert not steps[-1].deps
+
+
+def test_value_flags_are_not_subcommands(tmp_path):
+    step = build_plan(["git -C repo status"], str(tmp_path))[0]
+    assert step.paths == {str(tmp_path / "repo")}
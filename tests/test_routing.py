@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+from providers import FakeLLM  # noqa: E402
+from routing import FAST, STRONG, Router  # noqa: E402
+
+PROMPT = '**Instruction:** "list files"'
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def router(llm, **options):
+    options.setdefault("initial", 0.05)
+    options.setdefault("floor", 0.01)
+    return Router({STRONG: llm, FAST: llm}, **options)
+
+
+def test_fast_call_is_not_hedged():
+    llm = FakeLLM(latency=0.01)
+    r = router(llm)
+    tier = r.tier(FAST)
+    reply = run(r.invoke(tier, PROMPT))
+    assert "list files" in reply.content
+    assert llm.calls == 1
+    assert tier.hedged == 0
+
+
+def test_hedge_wins_over_straggler():
+    # With seed 5 the first call for PROMPT is a 1s straggler and the second is not
+    llm = FakeLLM(latency=0.01, tail_rate=0.5, tail_latency=1.0, seed=5)
+    r = router(llm)
+    tier = r.tier(FAST)
+    started = time.perf_counter()
+    reply = run(r.invoke(tier, PROMPT))
+    assert time.perf_counter() - started < 0.5
+    assert "list files" in reply.content
+    assert llm.calls == 2
+    assert (tier.hedged, tier.hedge_wins) == (1, 1)
+
+
+def test_stream_hedge_wins_over_straggler():
+    llm = FakeLLM(latency=0.01, tail_rate=0.5, tail_latency=1.0, seed=5)
+    r = router(llm)
+    tier = r.tier(FAST)
+
+    async def main():
+        return "".join([chunk.content async for chunk in r.stream(tier, PROMPT)])
+
+    started = time.perf_counter()
+    reply = run(main())
+    assert time.perf_counter() - started < 0.5
+    assert "list files" in reply
+    assert (tier.hedged, tier.hedge_wins) == (1, 1)
+
+
+def test_hedge_budget():
+    llm = FakeLLM(latency=0.1)
+    r = router(llm, hedge_budget=0.5, initial=0.01)
+    tier = r.tier(FAST)
+
+    async def main():
+        for _ in range(6):
+            await r.invoke(tier, PROMPT)
+
+    run(main())
+    assert tier.calls == 6
+    assert tier.hedged == 3
+    assert llm.calls == 9
+
+
+def test_no_hedge_without_free_slot():
+    llm = FakeLLM(latency=0.1)
+    r = router(llm, initial=0.01)
+    tier = r.tier(FAST)
+
+    async def main():
+        slots = asyncio.Semaphore(1)
+        async with slots:
+            return await r.invoke(tier, PROMPT, slots)
+
+    run(main())
+    assert tier.hedged == 0
+    assert llm.calls == 1
+
+
+def test_hedging_off():
+    llm = FakeLLM(latency=0.1)
+    r = router(llm, hedging=False, initial=0.01)
+    run(r.invoke(r.tier(FAST), PROMPT))
+    assert llm.calls == 1
+
+
+def test_loser_is_discarded():
+    r = router(FakeLLM(), initial=0.01)
+    tier = r.tier(FAST)
+    discarded = []
+
+    async def main():
+        release = asyncio.Event()
+        attempts = iter(["primary", "backup"])
+
+        async def attempt():
+            name = next(attempts)
+            if name == "backup":
+                # Both attempts finish in the same loop iteration
+                release.set()
+            await release.wait()
+            return name
+
+        return await r._hedged(tier, attempt, tier.latency, None, discarded.append)
+
+    assert run(main()) == "primary"
+    assert discarded == ["backup"]
+    assert (tier.hedged, tier.hedge_wins) == (1, 0)
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from src.speculation import is_read_only, speculate
+
+
+@pytest.fixture(autouse=True)
+def no_policy(tmp_path, monkeypatch):
+    monkeypatch.setenv("TERMAI_POLICY", str(tmp_path / "policy.json"))
+    monkeypatch.setenv("TERMAI_SPECULATE", "1")
+
+
+@pytest.mark.parametrize("command", [
+    "ls -la",
+    "df -h",
+    "docker ps -a",
+    "git status",
+    "git branch -a",
+    "cat /proc/cpuinfo | grep 'model name' | head -n 1",
+    "du -sh * 2>/dev/null | sort -rh | head -n 10",
+    "uname -a && whoami",
+    "node --version",
+])
+def test_read_only(command):
+    assert is_read_only(command, "bash")
+
+
+@pytest.mark.parametrize("command", [
+    # Line breaks
+    "ls\ntouch /tmp/x",
+    "git status\ngit push --force",
+    "echo hi\nrm -rf build",
+    "ls\r\ntouch /tmp/x",
+    "ls \\\ntouch",
+    # Writes, state changes and commands that never finish
+    "touch /tmp/x",
+    "ls > files.txt",
+    "find . -delete",
+    "find . -exec rm {} +",
+    "git branch new",
+    "git config user.name x",
+    "git push",
+    "docker rm web",
+    "hostname box",
+    "tail -f app.log",
+    "sort -o out in",
+    "ls &",
+    "echo $(whoami)",
+    "FOO=1 ls",
+    "./script.sh",
+    "cd /tmp",
+    # Filters that would read the terminal
+    "grep foo",
+    "head -n 5",
+])
+def test_not_read_only(command):
+    assert not is_read_only(command, "bash")
+
+
+@pytest.mark.parametrize("command", ["ls\ntouch {marker}", "echo hi\ntouch {marker}", "ls; touch {marker}"])
+def test_speculate_does_not_run_writes(tmp_path, command):
+    marker = tmp_path / "marker"
+    assert speculate(["ls", command.format(marker=marker)], "bash") is None
+    assert not os.path.exists(marker)
+
+
+def test_speculate_replays_output():
+    speculation = speculate(["echo one", "echo two"], "bash")
+    assert speculation is not None
+    lines = []
+    results = list(speculation.take(lambda stream, line: lines.append(line)))
+    assert [result.returncode for result in results] == [0, 0]
+    assert lines == ["one", "two"]
+
+
+def test_speculate_skips_plans_that_need_the_terminal(monkeypatch):
+    # The replay is matched to commands by position, so a command that runs on
+    # the terminal instead would shift every later command's output
+    monkeypatch.setattr("src.executor.needs_terminal", lambda command, shell: command == "git status")
+    assert speculate(["git status", "echo SECOND"], "bash") is None
+
+
+def test_speculate_patch_output():
+    speculation = speculate(["git --no-pager log -p -1", "echo SECOND"], "bash")
+    assert speculation is not None
+    results = list(speculation.take(lambda stream, line: None))
+    assert [result.command for result in results] == ["git --no-pager log -p -1", "echo SECOND"]
+
+
+def test_speculation_disabled(monkeypatch):
+    monkeypatch.setenv("TERMAI_SPECULATE", "0")
+    assert speculate(["ls"], "bash") is None
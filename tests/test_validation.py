@@ -0,0 +1,79 @@
+import pytest
+
+from src.validation import DEFAULT_RULES, Validator, tokenize
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return Validator(DEFAULT_RULES)
+
+
+@pytest.mark.parametrize("command, shell, rule", [
+    # Newlines separate commands
+    ("echo hi\nrm -rf /", "bash", "rm-recursive-force"),
+    ("ls\nsudo reboot", "bash", "privilege-escalation"),
+    ("git status\r\nrm -rf ~", "bash", "rm-recursive-force"),
+    ("Get-ChildItem\nRemove-Item C:\\x -Recurse -Force", "powershell", "remove-item-recurse-force"),
+    ("dir\nrd /s C:\\x", "cmd", "rd-recursive"),
+    # Shell command strings are validated as command lines
+    ('bash -c "rm -rf ~"', "bash", "rm-recursive-force"),
+    ("sh -c 'rm -rf /'", "bash", "rm-recursive-force"),
+    ("zsh -lc 'sudo reboot'", "zsh", "privilege-escalation"),
+    ("bash -o pipefail -c 'rm -rf /'", "bash", "rm-recursive-force"),
+    ("bash -c \"bash -c 'rm -rf /'\"", "bash", "rm-recursive-force"),
+    ("env bash -c 'rm -rf /'", "bash", "rm-recursive-force"),
+    ('powershell -Command "Remove-Item C:\\x -Recurse -Force"', "powershell", "remove-item-recurse-force"),
+    ('pwsh -NoProfile -ExecutionPolicy Bypass "Remove-Item C:\\x -Recurse -Force"', "powershell",
+     "remove-item-recurse-force"),
+    ("powershell -EncodedCommand SQBFAFgA", "powershell", "encoded-command"),
+    # PowerShell parameter prefixes
+    ("Remove-Item C:\\x -r -fo", "powershell", "remove-item-recurse-force"),
+    ("ri C:\\x -Rec -Fo", "pwsh", "remove-item-recurse-force"),
+    ('powershell -Command "Remove-Item C:\\x -Recurse:$true -for"', "powershell", "remove-item-recurse-force"),
+    ('cmd /c "rd /s C:\\x"', "cmd", "rd-recursive"),
+    ('cmd /K "del /f C:\\x"', "cmd", "del-force"),
+    # Wrappers
+    ("busybox rm -rf /", "bash", "rm-recursive-force"),
+    ("nohup rm -rf /tmp/x", "bash", "rm-recursive-force"),
+    ("find . -exec rm -rf {} +", "bash", "rm-recursive-force"),
+    ("timeout 5 sudo ls", "bash", "privilege-escalation"),
+    # Substitution
+    ("echo $(whoami)", "bash", "command-substitution"),
+    ("echo `whoami`", "bash", "command-substitution"),
+])
+def test_blocks(validator, command, shell, rule):
+    verdict = validator.check(command, shell)
+    assert not verdict
+    assert verdict.rule == rule
+
+
+@pytest.mark.parametrize("command, shell", [
+    ('dir "C:\\Program Files\\"', "cmd"),
+    ('cd "C:\\Users\\me\\"', "cmd"),
+    ("echo it's done", "cmd"),
+    ('Get-ChildItem "C:\\Users\\"', "powershell"),
+    ('Get-ChildItem -Path "C:\\Program Files\\" -Recurse', "powershell"),
+    ('Write-Host "a`"b"', "powershell"),
+    ("Get-Process | Sort-Object CPU -Descending", "powershell"),
+    ("ls \\\n  -la", "bash"),
+    ("bash -c 'ls -la'", "bash"),
+    ("cmd /c dir", "cmd"),
+    ("powershell -File build.ps1", "powershell"),
+    ("Remove-Item C:\\x -Rec", "powershell"),
+    ("echo '$(not run)'", "bash"),
+    ("rm -r build", "bash"),
+    ("git status && git log -n 5", "bash"),
+])
+def test_allows(validator, command, shell):
+    assert validator.check(command, shell), validator.check(command, shell).reason
+
+
+def test_unbalanced_quotes(validator):
+    assert validator.check("echo 'oops", "bash").rule == "unparseable"
+
+
+def test_tokenize_dialects():
+    assert tokenize("ls\nrm x") == ["ls", "\n", "rm", "x"]
+    assert tokenize('dir "C:\\Program Files\\"', "cmd") == ["dir", "C:\\Program Files\\"]
+    assert tokenize("echo a` b", "powershell") == ["echo", "a b"]
+    assert tokenize("echo a\\ b") == ["echo", "a b"]